@@ -0,0 +1,184 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Optional, Union
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Minimum level written, e.g. DEBUG to include sampled payload dumps
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# "text" for one readable line per record, "json" for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Fraction of debug payload dumps (raw model responses) that are written, and how much of each
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+
+# Id of the HTTP request (or transcription job) the current code runs for
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(request_id: str):
+    """
+    Tag every record logged inside the block (including from asyncio.to_thread calls and
+    pipeline threads started inside it) with request_id.
+
+    Args:
+        request_id: Id of the request or job, e.g. from the X-Request-ID header
+    """
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the request id of the thread that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """One line per record: time, level, logger, request id, message, then extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with extra fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread. Records never leave the process, so only the message
+    and traceback are resolved here (they can refer to objects that change later); formatting
+    and writing happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Copied because other handlers on the root logger still see the original
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None, stream=None) -> QueueListener:
+    """
+    Route the root logger through a queue drained by a background thread, so logging calls on
+    request and worker threads never wait on stderr. Safe to call more than once; only the first
+    call installs the handler.
+
+    Args:
+        level: Minimum level (defaults to LOG_LEVEL)
+        log_format: 'text' or 'json' (defaults to LOG_FORMAT)
+        stream: Where records are written (defaults to stderr)
+
+    Returns:
+        The QueueListener writing the records
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_format = log_format or LOG_FORMAT
+    if log_format not in ("text", "json"):
+        raise ValueError(f"Unknown LOG_FORMAT '{log_format}', expected 'text' or 'json'")
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _InProcessQueueHandler(log_queue)
+    # Filters run on the thread that logs, where the request id context is set
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Union[str, Callable[[], str]],
+                sample_rate: Optional[float] = None, **fields) -> None:
+    """
+    Log a verbose payload (e.g. a raw model response) at DEBUG level for a sample of calls.
+    Returns before touching the payload when DEBUG is disabled, so callers can leave these
+    calls in hot paths.
+
+    Args:
+        logger: Logger to write to
+        message: Short description of the payload
+        payload: The text, or a function returning it (only called if the record is written)
+        sample_rate: Fraction of calls logged (defaults to LOG_PAYLOAD_SAMPLE_RATE)
+        **fields: Extra structured fields for the record
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= (LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate):
+        return
+    text = payload() if callable(payload) else str(payload)
+    logger.debug(message, extra={**fields, "payload": text[:LOG_PAYLOAD_MAX_CHARS], "payload_chars": len(text)})
@@ -0,0 +1,26 @@
+"""
+Synthetic audio files for the offline tests, generated with ffmpeg (must be on PATH).
+"""
+
+import subprocess
+from typing import Optional
+
+from pydub import AudioSegment
+
+
+def make_tone(path: str, seconds: int, channels: int = 2, sample_rate: int = 44100, bitrate: Optional[str] = None):
+    """
+    Write a 440 Hz sine tone to path, encoded by its extension.
+
+    Args:
+        path: Output file, e.g. tone.wav or talk.mp3
+        seconds: Duration of the tone
+        channels: Number of audio channels
+        sample_rate: Sample rate in Hz
+        bitrate: Encoder bitrate such as '32k', for compressed formats; the encoder default when None
+    """
+    command = [AudioSegment.converter, "-loglevel", "error", "-y", "-f", "lavfi",
+               "-i", f"sine=frequency=440:duration={seconds}", "-ac", str(channels), "-ar", str(sample_rate)]
+    if bitrate:
+        command += ["-b:a", bitrate]
+    subprocess.run(command + [path], check=True)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency, throughput, memory and temp-disk usage of the three API endpoints.
+
+Drives /video-transcript, /generate-ideas and /generate-content in-process (httpx over
+ASGI, with the app's lifespan running) against the fake Gemini backend, so runs need no
+network or quota and are reproducible (FAKE_GEMINI_SEED). Transcription uploads are
+synthetic recordings of controlled length generated with ffmpeg; every request gets
+distinct audio or text, so neither the upload reuse nor the response caches short-circuit
+the work.
+
+For each endpoint, audio length and concurrency level, it reports p50/p95/p99 latency,
+throughput, peak RSS of the process (sampled from /proc) and peak bytes under the temp
+directory (a fresh TMPDIR, so only the backend's spooled uploads and transcodes count).
+Results are written as JSON, tagged with the git commit, and can be compared with an
+earlier run:
+
+Usage: python benchmark_endpoints.py [--concurrency 1 4 8] [--requests 8] [--audio-seconds 60 600]
+                                     [--endpoints transcript ideas content] [--latency lognormal:1.0,0.3]
+                                     [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ENDPOINTS = ("transcript", "ideas", "content")
+SAMPLE_INTERVAL_SECONDS = 0.05
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Linear interpolation between the closest ranks."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Not Linux: fall back to the lifetime peak (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # Deleted while walking
+    return total
+
+
+class ResourceSampler:
+    """Samples RSS and temp directory size on a thread and keeps the peaks."""
+
+    def __init__(self, temp_dir: str):
+        self.temp_dir = temp_dir
+        self.peak_rss = 0
+        self.peak_temp = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            self.peak_temp = max(self.peak_temp, directory_bytes(self.temp_dir))
+            if self._stop.wait(SAMPLE_INTERVAL_SECONDS):
+                return
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def make_recording(path: str, seconds: int, index: int):
+    # A different tone per request, so every upload has distinct content
+    from pydub import AudioSegment
+    subprocess.run(
+        [AudioSegment.converter, "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency={200 + index * 7}:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.05:seed={index}",
+         "-filter_complex", "amix=inputs=2", "-ac", "2", "-ar", "44100", "-b:a", "128k", path],
+        check=True
+    )
+
+
+def make_transcript_items(index: int, count: int = 12) -> list:
+    return [
+        {
+            "timestamp": f"{(item * 15) // 60}:{(item * 15) % 60:02d}-{(item * 15 + 15) // 60}:{(item * 15 + 15) % 60:02d}",
+            "transcript": f"Yêu cầu {index} đoạn {item}: chúng ta sẽ thảo luận về kế hoạch phát triển sản phẩm trong quý tới",
+            "original_transcript": "",
+            "language": "vietnamese",
+            "remove": False
+        }
+        for item in range(count)
+    ]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def send_request(client, endpoint: str, index: int, recording: str = None):
+    if endpoint == "transcript":
+        with open(recording, "rb") as f:
+            return await client.post("/video-transcript", files={"file": (f"talk_{index}.mp3", f, "audio/mpeg")},
+                                     data={"language": "english"})
+    if endpoint == "ideas":
+        return await client.post("/generate-ideas", json={"data": make_transcript_items(index)})
+    return await client.post("/generate-content", json={
+        "format": ("video", "blog", "post", "infographic")[index % 4],
+        "idea_text": f"Ý tưởng số {index}: sống xanh trong thành phố"
+    })
+
+
+async def run_level(client, endpoint: str, concurrency: int, requests: int, first_index: int,
+                    recordings: list, temp_dir: str) -> dict:
+    latencies = []
+    errors = 0
+    next_index = iter(range(first_index, first_index + requests))
+
+    async def worker():
+        nonlocal errors
+        for index in next_index:
+            recording = recordings[index - first_index] if recordings else None
+            start = time.perf_counter()
+            response = await send_request(client, endpoint, index, recording)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+                print(f"  {endpoint} request {index} failed: {response.status_code} {response.text[:200]}")
+
+    with ResourceSampler(temp_dir) as sampler:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(requests / wall_seconds, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "mean": round(sum(latencies) / len(latencies), 1),
+            "max": round(latencies[-1], 1)
+        },
+        "peak_rss_mb": round(sampler.peak_rss / 1024 / 1024, 1),
+        "peak_temp_mb": round(sampler.peak_temp / 1024 / 1024, 2)
+    }
+
+
+async def run_benchmark(args, temp_dir: str, recordings_dir: str) -> list:
+    import httpx
+    import main
+
+    results = []
+    request_index = 0
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for endpoint in args.endpoints:
+                audio_lengths = args.audio_seconds if endpoint == "transcript" else [None]
+                for audio_seconds in audio_lengths:
+                    for concurrency in args.concurrency:
+                        print(f"Running {endpoint}" + (f" ({audio_seconds}s audio)" if audio_seconds else "") +
+                              f" at concurrency {concurrency}...")
+                        recordings = []
+                        if endpoint == "transcript":
+                            for offset in range(args.requests):
+                                path = os.path.join(recordings_dir, f"recording_{request_index + offset}.mp3")
+                                make_recording(path, audio_seconds, request_index + offset)
+                                recordings.append(path)
+
+                        level = await run_level(client, endpoint, concurrency, args.requests, request_index,
+                                                recordings, temp_dir)
+                        request_index += args.requests
+                        for path in recordings:
+                            os.unlink(path)
+
+                        result = {"endpoint": endpoint, "audio_seconds": audio_seconds, "concurrency": concurrency, **level}
+                        if audio_seconds:
+                            result["audio_seconds_per_second"] = round(audio_seconds * args.requests / level["wall_seconds"], 1)
+                        results.append(result)
+    return results
+
+
+def result_key(result: dict) -> tuple:
+    return result["endpoint"], result.get("audio_seconds"), result["concurrency"]
+
+
+def result_label(result: dict) -> str:
+    return result["endpoint"] + (f" {result['audio_seconds']}s" if result.get("audio_seconds") else "")
+
+
+def print_results(results: list):
+    print(f"{'Endpoint':<18} | {'Conc':>4} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'req/s':>7} | "
+          f"{'RSS MB':>7} | {'Tmp MB':>7} | {'Err':>3}")
+    print("-" * 96)
+    for result in results:
+        latency = result["latency_ms"]
+        print(f"{result_label(result):<18} | {result['concurrency']:>4} | {latency['p50']:>8.0f} | {latency['p95']:>8.0f} | "
+              f"{latency['p99']:>8.0f} | {result['throughput_rps']:>7.2f} | {result['peak_rss_mb']:>7.1f} | "
+              f"{result['peak_temp_mb']:>7.2f} | {result['errors']:>3}")
+
+
+def compare(results: list, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    previous_results = {result_key(result): result for result in previous.get("results", [])}
+    print(f"\nCompared with {previous_path} (commit {previous.get('commit', 'unknown')}):")
+    print(f"{'Endpoint':<18} | {'Conc':>4} | {'p50':>14} | {'p95':>14} | {'Throughput':>14}")
+    print("-" * 78)
+    for result in results:
+        before = previous_results.get(result_key(result))
+        if before is None:
+            continue
+
+        def change(new, old):
+            return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+        print(f"{result_label(result):<18} | {result['concurrency']:>4} | "
+              f"{change(result['latency_ms']['p50'], before['latency_ms']['p50']):>14} | "
+              f"{change(result['latency_ms']['p95'], before['latency_ms']['p95']):>14} | "
+              f"{change(result['throughput_rps'], before['throughput_rps']):>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="concurrent clients per level")
+    parser.add_argument("--requests", type=int, default=8, help="requests per endpoint and concurrency level")
+    parser.add_argument("--audio-seconds", type=int, nargs="+", default=[60, 600], help="lengths of the uploaded recordings")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--latency", help="fake Gemini latency spec (FAKE_GEMINI_LATENCY), e.g. fixed:0.5")
+    parser.add_argument("--output", help="JSON results file (default benchmark_endpoints_<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare with")
+    args = parser.parse_args()
+
+    # The backend reads its settings at import, so configure it before importing main
+    os.environ["GEMINI_BACKEND"] = "fake"
+    os.environ["TRANSCRIPTION_CACHE_ENABLED"] = "false"
+    if args.latency:
+        os.environ["FAKE_GEMINI_LATENCY"] = args.latency
+    commit = git_commit()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_tmp_") as temp_dir, \
+            tempfile.TemporaryDirectory(prefix="benchmark_audio_") as recordings_dir:
+        # Uploads and transcodes go to a temp directory that holds nothing else
+        os.environ["TMPDIR"] = temp_dir
+        tempfile.tempdir = temp_dir
+
+        results = asyncio.run(run_benchmark(args, temp_dir, recordings_dir))
+        tempfile.tempdir = None
+
+    print(f"\nCommit {commit}, {args.requests} requests per level, fake latency "
+          f"{os.getenv('FAKE_GEMINI_LATENCY', 'default')}")
+    print_results(results)
+
+    import main as app_module
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "settings": {
+            "requests_per_level": args.requests,
+            "fake_latency": os.getenv("FAKE_GEMINI_LATENCY"),
+            "fake_seed": os.getenv("FAKE_GEMINI_SEED", "0"),
+            "max_concurrent_transcriptions": app_module.MAX_CONCURRENT_TRANSCRIPTIONS,
+            "idea_generation_concurrency": app_module.IDEA_GENERATION_CONCURRENCY,
+            "idea_batch_size": app_module.IDEA_BATCH_SIZE,
+            "python": sys.version.split()[0]
+        },
+        "results": results
+    }
+    output = args.output or f"benchmark_endpoints_{commit}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
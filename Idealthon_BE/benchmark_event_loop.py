@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: health-check latency while several /video-transcript uploads are running.
+
+The transcriber is replaced with one that blocks for a fixed time (like pydub and the
+Gemini calls do), so the benchmark runs offline. With transcription on its own executor,
+GET / latency should stay flat no matter how many uploads are in flight.
+
+Usage: python benchmark_event_loop.py [uploads] [transcription_seconds]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+
+
+class BlockingTranscriber:
+    """Stand-in for AudioSegmentTranscriber that blocks its thread like the real pipeline."""
+
+    transcription_seconds = 2.0
+
+    def transcribe_file(self, audio_file_path, language='vietnamese', on_segment=None):
+        time.sleep(self.transcription_seconds)
+        text = "<remove>false</remove><time>0:00 - 0:10</time> Xin chào"
+        return text, text
+
+
+async def measure_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+        await asyncio.sleep(0.05)
+
+
+async def upload(client: httpx.AsyncClient, index: int):
+    files = {'file': (f'upload_{index}_vi.mp3', b'fake audio bytes', 'audio/mpeg')}
+    response = await client.post("/video-transcript", files=files, data={'language': 'vietnamese'})
+    assert response.status_code == 200
+
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"{label:<22} n={len(latencies):<4} p50={statistics.median(latencies):7.2f}ms "
+          f"p95={p95:7.2f}ms max={latencies[-1]:7.2f}ms")
+
+
+async def run_benchmark(uploads: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        # Baseline: health checks with no uploads in flight
+        idle_latencies = []
+        stop = asyncio.Event()
+        health_task = asyncio.create_task(measure_health(client, stop, idle_latencies))
+        await asyncio.sleep(1.0)
+        stop.set()
+        await health_task
+
+        # Health checks while uploads are being transcribed
+        busy_latencies = []
+        stop = asyncio.Event()
+        health_task = asyncio.create_task(measure_health(client, stop, busy_latencies))
+        start = time.perf_counter()
+        await asyncio.gather(*(upload(client, index) for index in range(uploads)))
+        upload_time = time.perf_counter() - start
+        stop.set()
+        await health_task
+
+    print(f"Uploads: {uploads}, max concurrent transcriptions: {main.MAX_CONCURRENT_TRANSCRIPTIONS}, "
+          f"transcription time: {BlockingTranscriber.transcription_seconds:.1f}s")
+    print(f"All uploads finished in {upload_time:.2f}s")
+    summarize("GET / (idle)", idle_latencies)
+    summarize("GET / (during uploads)", busy_latencies)
+
+
+if __name__ == "__main__":
+    upload_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    BlockingTranscriber.transcription_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    main.AudioSegmentTranscriber = BlockingTranscriber
+    asyncio.run(run_benchmark(upload_count))
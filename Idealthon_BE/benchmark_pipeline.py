@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: staged transcription pipeline vs the strictly sequential per-segment chain.
+
+Cutting, uploading, transcribing and translating are replaced with sleeps of a fixed
+length, so the benchmark runs offline. The sequential run performs encode -> upload ->
+transcribe -> translate for one segment before starting the next; the pipelined runs use
+AudioSegmentTranscriber.transcribe_file and print its per-stage counters.
+
+Usage: python benchmark_pipeline.py [segments] [encode_s] [upload_s] [transcribe_s] [translate_s]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cut_audio import AudioSegmentTranscriber
+
+
+class SimulatedTranscriber(AudioSegmentTranscriber):
+    """Transcriber whose stages block for fixed times instead of running ffmpeg and Gemini."""
+
+    def __init__(self, segments: int, latencies: dict, max_workers: int):
+        super().__init__(api_key="benchmark", max_workers=max_workers, transcode_profile="source", cache=False)
+        self.segments = segments
+        self.latencies = latencies
+
+    def plan_speech_segments(self, audio_file_path):
+        return [[(index * self.segment_duration_ms, (index + 1) * self.segment_duration_ms)]
+                for index in range(self.segments)]
+
+    def split_audio(self, audio_file_path, segment_plan=None):
+        for index in range(self.segments):
+            time.sleep(self.latencies["encode"])
+            yield index, index * self.segment_duration_ms
+
+    def upload_segment(self, audio_segment, audio_hash=None):
+        time.sleep(self.latencies["upload"])
+        return audio_segment
+
+    def release_segment(self, uploaded_file):
+        pass
+
+    def transcribe_uploaded(self, uploaded_file, language='vietnamese'):
+        time.sleep(self.latencies["transcribe"])
+        return f"<remove>false</remove><time>0:00 - 0:10</time> segment {uploaded_file}"
+
+    def translate_transcript(self, original_transcript, language='vietnamese'):
+        time.sleep(self.latencies["translate"])
+        return original_transcript
+
+
+def run_sequential(segments: int, latencies: dict) -> float:
+    transcriber = SimulatedTranscriber(segments, latencies, max_workers=1)
+    start = time.perf_counter()
+    for segment, _ in transcriber.split_audio(__file__):
+        uploaded = transcriber.upload_segment(segment)
+        original = transcriber.transcribe_uploaded(uploaded, 'english')
+        transcriber.translate_transcript(original, 'english')
+    return time.perf_counter() - start
+
+
+def run_pipelined(segments: int, latencies: dict, max_workers: int):
+    transcriber = SimulatedTranscriber(segments, latencies, max_workers=max_workers)
+    start = time.perf_counter()
+    transcriber.transcribe_file(__file__, 'english')
+    return time.perf_counter() - start, transcriber.last_pipeline_stats
+
+
+def main():
+    args = sys.argv[1:]
+    segments = int(args[0]) if args else 8
+    names = ("encode", "upload", "transcribe", "translate")
+    defaults = (0.3, 0.5, 1.0, 0.6)
+    latencies = {name: float(args[i + 1]) if len(args) > i + 1 else default
+                 for i, (name, default) in enumerate(zip(names, defaults))}
+
+    sequential_time = run_sequential(segments, latencies)
+    results = [(workers, *run_pipelined(segments, latencies, workers)) for workers in (1, 4)]
+
+    print(f"\nSegments: {segments}, stage latencies: {latencies}")
+    print(f"{'Mode':<30} | {'Wall clock':>10} | {'Speedup':>7}")
+    print("-" * 54)
+    print(f"{'sequential chain':<30} | {sequential_time:>9.2f}s | {1.0:>6.1f}x")
+    for workers, elapsed, _ in results:
+        label = f"pipelined, {workers} worker(s)/stage"
+        print(f"{label:<30} | {elapsed:>9.2f}s | {sequential_time / elapsed:>6.1f}x")
+
+    for workers, _, stats in results:
+        print(f"\nStage counters with {workers} worker(s)/stage:")
+        print(f"{'Stage':<11} | {'Items':>5} | {'Busy':>7} | {'Waiting':>7} | {'Blocked':>7} | {'Mean':>8}")
+        for name, counters in stats.items():
+            print(f"{name:<11} | {counters['items']:>5} | {counters['busy_seconds']:>6.2f}s | "
+                  f"{counters['wait_seconds']:>6.2f}s | {counters['blocked_seconds']:>6.2f}s | "
+                  f"{counters['mean_ms']:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes sent to Gemini and end-to-end latency per transcode profile.
+
+A synthetic stereo 44.1 kHz recording is generated with ffmpeg and run through
+AudioSegmentTranscriber.transcribe_file once per profile. Uploads go to a client that
+records their size and simulates the transfer time at the given bandwidth, so the
+comparison runs offline. Pass --live to use the real Gemini API instead (needs
+GOOGLE_API_KEY and spends quota).
+
+Usage: python benchmark_transcode_profiles.py [--minutes 20] [--upload-mbps 20] [--live]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from pydub import AudioSegment
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cut_audio import AudioSegmentTranscriber, TRANSCODE_PROFILES
+
+
+class SimulatedUploadClient:
+    """Records upload sizes and sleeps for the time the transfer would take."""
+
+    def __init__(self, upload_mbps: float):
+        self.bytes_per_second = upload_mbps * 1_000_000 / 8
+        self.uploaded_bytes = 0
+        self.files = SimpleNamespace(upload=self.upload, delete=self.delete)
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def upload(self, file, config=None):
+        size = os.path.getsize(file)
+        self.uploaded_bytes += size
+        time.sleep(size / self.bytes_per_second)
+        return SimpleNamespace(name=file)
+
+    def delete(self, name):
+        pass
+
+    def generate_content(self, model, contents):
+        return SimpleNamespace(text="<remove>false</remove><time>0:00 - 0:10</time> Xin chào")
+
+
+def make_recording(path: str, minutes: int):
+    # Tone plus light noise, stereo 44.1 kHz, encoded like a typical MP3 upload
+    seconds = minutes * 60
+    subprocess.run(
+        [AudioSegment.converter, "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.05",
+         "-filter_complex", "amix=inputs=2", "-ac", "2", "-ar", "44100", "-b:a", "128k", path],
+        check=True
+    )
+
+
+def run_profile(profile: str, source: str, upload_mbps: float, live: bool):
+    client = None if live else SimulatedUploadClient(upload_mbps)
+    transcriber = AudioSegmentTranscriber(transcode_profile=profile, client=client, cache=False)
+
+    start = time.perf_counter()
+    transcriber.transcribe_file(source, 'vietnamese')
+    elapsed = time.perf_counter() - start
+
+    if client is None:
+        # Live runs upload the same bytes the offline client would have counted
+        compact = transcriber.transcode_for_upload(source)
+        uploaded_bytes = os.path.getsize(compact or source)
+        if compact:
+            os.unlink(compact)
+    else:
+        uploaded_bytes = client.uploaded_bytes
+    return uploaded_bytes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=20, help="length of the synthetic recording")
+    parser.add_argument("--upload-mbps", type=float, default=20.0, help="simulated upload bandwidth")
+    parser.add_argument("--live", action="store_true", help="call the real Gemini API")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "recording.mp3")
+        make_recording(source, args.minutes)
+        print(f"Source: {args.minutes} min, {os.path.getsize(source) / 1024 / 1024:.1f} MB")
+        print(f"{'Profile':<12} | {'Bytes sent':>12} | {'Reduction':>9} | {'End-to-end':>10}")
+        print("-" * 54)
+
+        baseline = None
+        for profile in TRANSCODE_PROFILES:
+            uploaded_bytes, elapsed = run_profile(profile, source, args.upload_mbps, args.live)
+            baseline = baseline or uploaded_bytes
+            print(f"{profile:<12} | {uploaded_bytes / 1024 / 1024:>9.2f} MB | "
+                  f"{baseline / uploaded_bytes:>8.1f}x | {elapsed:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
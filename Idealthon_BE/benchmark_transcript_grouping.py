@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transcript grouping policies vs the previous group_transcript_segments.
+
+Builds a synthetic transcript of short segments with occasional pauses and groups it with
+each policy. The previous implementation re-joined the whole paragraph after every item to
+check its length, so its cost grows with the square of the paragraph size; it is kept here
+as legacy_group (with its 200-character threshold made a parameter) and checked to produce
+the same paragraphs as the "chars" policy.
+
+Usage: python benchmark_transcript_grouping.py [items] [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import TranscriptItem
+from transcript_grouping import group_segments, parse_grouping_policy
+
+WORDS = ("chúng ta sẽ thảo luận về dự án mới và kế hoạch phát triển sản phẩm trong quý tới "
+         "với đội ngũ kỹ thuật và khách hàng").split()
+
+
+def parse_timestamp_to_seconds(timestamp: str) -> int:
+    try:
+        start_time = timestamp.split('-')[0] if '-' in timestamp else timestamp
+        parts = start_time.split(':')
+        if len(parts) == 2:
+            minutes, seconds = map(int, parts)
+            return minutes * 60 + seconds
+        return 0
+    except:
+        return 0
+
+
+def legacy_group(transcript_items, max_characters: int = 200):
+    """group_transcript_segments before grouping policies."""
+    if not transcript_items:
+        return []
+
+    grouped_paragraphs = []
+    current_group = []
+    current_text = []
+    sorted_items = sorted(transcript_items, key=lambda x: parse_timestamp_to_seconds(x.timestamp))
+
+    for i, item in enumerate(sorted_items):
+        current_group.append(item)
+        current_text.append(item.transcript)
+        should_group = len(' '.join(current_text)) < max_characters and i < len(sorted_items) - 1
+
+        if not should_group or i == len(sorted_items) - 1:
+            if current_group:
+                start_timestamp = current_group[0].timestamp.split('-')[0] if '-' in current_group[0].timestamp else current_group[0].timestamp
+                end_timestamp = current_group[-1].timestamp.split('-')[1] if '-' in current_group[-1].timestamp else current_group[-1].timestamp
+                current_original_text = []
+                language = "vietnamese"
+                for group_item in current_group:
+                    if hasattr(group_item, 'original_transcript') and group_item.original_transcript:
+                        current_original_text.append(group_item.original_transcript)
+                        if hasattr(group_item, 'language'):
+                            language = group_item.language
+                grouped_paragraphs.append({
+                    'paragraph': ' '.join(current_text),
+                    'original_paragraph': ' '.join(current_original_text) if current_original_text else "",
+                    'language': language,
+                    'timestamp': f"{start_timestamp}-{end_timestamp}",
+                    'items': current_group
+                })
+            current_group = []
+            current_text = []
+
+    return grouped_paragraphs
+
+
+def make_items(count: int):
+    items = []
+    start = 0
+    for index in range(count):
+        # Segments of 2-6 seconds, with a 10 second pause every 25 segments
+        duration = 2 + index % 5
+        if index and index % 25 == 0:
+            start += 10
+        words = ' '.join(WORDS[(index + offset) % len(WORDS)] for offset in range(4 + index % 7))
+        items.append(TranscriptItem(
+            timestamp=f"{start // 60}:{start % 60:02d}-{(start + duration) // 60}:{(start + duration) % 60:02d}",
+            transcript=words,
+            original_transcript=f"words {index}",
+            language="english",
+            remove=False
+        ))
+        start += duration
+    return items
+
+
+def best_time(function, repeats: int, *args) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 50000
+    repeats = int(args[1]) if len(args) > 1 else 3
+    items = make_items(count)
+
+    print(f"Items: {count}, best of {repeats} runs")
+    print(f"{'Grouping':<36} | {'Paragraphs':>10} | {'Legacy':>9} | {'Policy':>8} | {'Speedup':>7}")
+    print("-" * 84)
+    for max_characters in (200, 2000, 8000):
+        spec = f"chars:{max_characters}"
+        policy = parse_grouping_policy(spec)
+        paragraphs = group_segments(items, policy)
+        legacy_paragraphs = legacy_group(items, max_characters)
+        assert [(p['paragraph'], p['timestamp'], p['original_paragraph']) for p in paragraphs] == \
+            [(p['paragraph'], p['timestamp'], p['original_paragraph']) for p in legacy_paragraphs], spec
+
+        legacy_time = best_time(legacy_group, repeats, items, max_characters)
+        policy_time = best_time(group_segments, repeats, items, policy)
+        print(f"{spec:<36} | {len(paragraphs):>10} | {legacy_time * 1000:>7.0f}ms | {policy_time * 1000:>6.0f}ms | "
+              f"{legacy_time / policy_time:>6.1f}x")
+
+    for spec in ("tokens:50", "gap:5", "segments:10", "chars:400,gap:5,segments:12", "tokens:80,gap:5"):
+        policy = parse_grouping_policy(spec)
+        paragraphs = group_segments(items, policy)
+        policy_time = best_time(group_segments, repeats, items, policy)
+        print(f"{spec:<36} | {len(paragraphs):>10} | {'-':>9} | {policy_time * 1000:>6.0f}ms |")
+
+
+if __name__ == "__main__":
+    main()
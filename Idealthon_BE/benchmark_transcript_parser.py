@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass transcript parser vs the previous regex-per-call parser.
+
+Builds synthetic transcripts with many segments (original language plus Vietnamese, in the
+current <remove> format and in the old <time>-only format) and times both parsers on them.
+The previous implementation is kept here verbatim as legacy_parse for comparison, and the
+two are checked to produce the same items. A translation with drifted timestamps shows how
+many segments exact-key pairing loses and overlap alignment recovers.
+
+Usage: python benchmark_transcript_parser.py [segments] [repeats]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_parser import align_original_text, parse_transcript_entries
+
+WORDS = ("chúng ta sẽ thảo luận về dự án mới và kế hoạch phát triển sản phẩm trong quý tới "
+         "với đội ngũ kỹ thuật và khách hàng").split()
+
+
+def legacy_parse(transcription_text: str, original_transcription_text: str = "", language: str = "vietnamese") -> list:
+    """parse_transcription_to_transcript_items before the single-pass parser, returning tuples."""
+    transcript_items = []
+
+    original_text_map = {}
+    if original_transcription_text and language != 'vietnamese':
+        original_pattern = r'<remove>(true|false)</remove><time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<remove>|\Z)'
+        original_matches = re.findall(original_pattern, original_transcription_text, re.DOTALL)
+        for _, start_time, end_time, text in original_matches:
+            original_text_map[f"{start_time}-{end_time}"] = ' '.join(text.strip().split())
+
+    pattern = r'<remove>(true|false)</remove><time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<remove>|\Z)'
+    for remove_flag, start_time, end_time, text in re.findall(pattern, transcription_text, re.DOTALL):
+        cleaned_vietnamese_text = ' '.join(text.strip().split())
+        if cleaned_vietnamese_text:
+            timestamp_key = f"{start_time}-{end_time}"
+            original_text = original_text_map.get(timestamp_key, "") if language != 'vietnamese' else ""
+            transcript_items.append((timestamp_key, cleaned_vietnamese_text, original_text, remove_flag.lower() == "true"))
+
+    if not transcript_items:
+        original_text_map_old = {}
+        if original_transcription_text and language != 'vietnamese':
+            old_original_pattern = r'<time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<time>|\Z)'
+            for start_time, end_time, text in re.findall(old_original_pattern, original_transcription_text, re.DOTALL):
+                original_text_map_old[f"{start_time}-{end_time}"] = ' '.join(text.strip().split())
+
+        old_pattern = r'<time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<time>|\Z)'
+        for start_time, end_time, text in re.findall(old_pattern, transcription_text, re.DOTALL):
+            cleaned_vietnamese_text = ' '.join(text.strip().split())
+            if cleaned_vietnamese_text:
+                timestamp_key = f"{start_time}-{end_time}"
+                original_text = original_text_map_old.get(timestamp_key, "") if language != 'vietnamese' else ""
+                transcript_items.append((timestamp_key, cleaned_vietnamese_text, original_text, False))
+
+    return transcript_items
+
+
+def single_pass_parse(transcription_text: str, original_transcription_text: str = "", language: str = "vietnamese") -> list:
+    """Same logic as main.parse_transcription_to_transcript_items, returning tuples."""
+    entries = parse_transcript_entries(transcription_text)
+    original_texts = [""] * len(entries)
+    if original_transcription_text and language != 'vietnamese':
+        original_texts, _ = align_original_text(entries, parse_transcript_entries(original_transcription_text))
+    return [
+        (timestamp_key, text, original_text, remove)
+        for (timestamp_key, remove, text), original_text in zip(entries, original_texts)
+    ]
+
+
+def make_transcript(segments: int, words_per_segment: int, with_remove: bool, vietnamese: bool, drift: int = 0) -> str:
+    lines = []
+    for index in range(segments):
+        # Every third segment is shifted by drift seconds, as a translation step might do
+        start = index * 15 + (drift if index % 3 == 0 else 0)
+        header = f"<time>{start // 60}:{start % 60:02d} - {(start + 15) // 60}:{(start + 15) % 60:02d}</time>"
+        if with_remove:
+            header = f"<remove>{'true' if index % 7 == 0 else 'false'}</remove>{header}"
+        words = [WORDS[(index + offset) % len(WORDS)] for offset in range(words_per_segment)]
+        text = ' '.join(words) if vietnamese else ' '.join(f"word{len(word)}" for word in words)
+        lines.append(f"{header} {text}")
+    return '\n'.join(lines)
+
+
+def time_parser(parser, repeats: int, *args) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parser(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = sys.argv[1:]
+    segments = int(args[0]) if args else 10000
+    repeats = int(args[1]) if len(args) > 1 else 3
+
+    cases = []
+    for label, with_remove in (("current format", True), ("old format (fallback)", False)):
+        for words_per_segment in (20, 200):
+            vietnamese_text = make_transcript(segments, words_per_segment, with_remove, vietnamese=True)
+            original_text = make_transcript(segments, words_per_segment, with_remove, vietnamese=False)
+            cases.append((f"{label}, {words_per_segment} words/seg", vietnamese_text, original_text))
+
+    print(f"Segments: {segments}, best of {repeats} runs")
+    print(f"{'Transcript':<38} | {'Size':>8} | {'Legacy':>9} | {'Single pass':>11} | {'Speedup':>7}")
+    print("-" * 86)
+    for label, vietnamese_text, original_text in cases:
+        legacy_items = legacy_parse(vietnamese_text, original_text, 'english')
+        new_items = single_pass_parse(vietnamese_text, original_text, 'english')
+        assert new_items == legacy_items, f"Parsers disagree on {label}"
+        assert len(new_items) == segments
+
+        legacy_time = time_parser(legacy_parse, repeats, vietnamese_text, original_text, 'english')
+        new_time = time_parser(single_pass_parse, repeats, vietnamese_text, original_text, 'english')
+        size_mb = (len(vietnamese_text) + len(original_text)) / (1024 * 1024)
+        print(f"{label:<38} | {size_mb:>6.1f}MB | {legacy_time * 1000:>7.0f}ms | {new_time * 1000:>9.0f}ms | "
+              f"{legacy_time / new_time:>6.1f}x")
+
+    # Translation whose timestamps drifted by a second on every third segment
+    vietnamese_text = make_transcript(segments, 20, True, vietnamese=True, drift=1)
+    original_text = make_transcript(segments, 20, True, vietnamese=False)
+    legacy_paired = sum(1 for item in legacy_parse(vietnamese_text, original_text, 'english') if item[2])
+    entries = parse_transcript_entries(vietnamese_text)
+    original_entries = parse_transcript_entries(original_text)
+    align_time = time_parser(align_original_text, repeats, entries, original_entries)
+    original_texts, stats = align_original_text(entries, original_entries)
+    print(f"\nDrifted translation ({segments} segments, every third shifted by 1s):")
+    print(f"  exact-key pairing: {legacy_paired}/{segments} segments paired")
+    print(f"  overlap alignment: {sum(1 for text in original_texts if text)}/{segments} segments paired "
+          f"in {align_time * 1000:.0f}ms, stats {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory while saving an upload to disk.
+
+Compares the old approach (await file.read() followed by one write) with
+spool_upload_to_disk for increasing upload sizes. Each save runs in a fresh
+subprocess, which reports its peak RSS (ru_maxrss) before and after the save, so
+C-level and file buffers are counted and earlier runs do not raise the peak.
+
+Usage: python benchmark_upload_memory.py [size_mb ...]
+"""
+
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastapi import UploadFile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import spool_upload_to_disk
+
+
+def make_upload(path: str) -> UploadFile:
+    return UploadFile(file=open(path, "rb"), filename=os.path.basename(path))
+
+
+async def save_with_full_read(file: UploadFile) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
+        content = await file.read()
+        temp_file.write(content)
+    return temp_file.name
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def measure_in_child(method: str, source_path: str, size_mb: int) -> dict:
+    """Runs in the subprocess: save the upload once and report peak RSS around it."""
+    if method == "read":
+        save = save_with_full_read
+    else:
+        save = lambda upload: spool_upload_to_disk(upload, suffix=".mp4", max_bytes=(size_mb + 1) * 1024 * 1024)
+
+    upload = make_upload(source_path)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    saved_path = await save(upload)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    upload.file.close()
+    os.unlink(saved_path)
+    return {"baseline_mb": baseline, "peak_mb": peak, "seconds": elapsed}
+
+
+def measure(method: str, source_path: str, size_mb: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", method, source_path, str(size_mb)],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes_mb):
+    print(f"{'Upload size':>12} | {'file.read() peak RSS':>21} | {'spooled peak RSS':>17} | {'spooled time':>12}")
+    print("-" * 72)
+    for size_mb in sizes_mb:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as source:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                source.write(block)
+            source_path = source.name
+
+        try:
+            full = measure("read", source_path, size_mb)
+            spooled = measure("spool", source_path, size_mb)
+        finally:
+            os.unlink(source_path)
+
+        # Growth over the RSS of the process after importing the app
+        full_growth = full["peak_mb"] - full["baseline_mb"]
+        spool_growth = spooled["peak_mb"] - spooled["baseline_mb"]
+        print(f"{size_mb:>9} MB | {full['peak_mb']:>8.1f} MB (+{full_growth:>6.1f}) | "
+              f"{spooled['peak_mb']:>6.1f} MB (+{spool_growth:>5.1f}) | {spooled['seconds']:>10.2f}s")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        method, source_path, size_mb = sys.argv[2], sys.argv[3], int(sys.argv[4])
+        print(json.dumps(asyncio.run(measure_in_child(method, source_path, size_mb))))
+    else:
+        sizes = [int(arg) for arg in sys.argv[1:]] or [16, 64, 256]
+        run_benchmark(sizes)
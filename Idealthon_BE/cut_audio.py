@@ -1,18 +1,35 @@
+import bisect
+import hashlib
+import json
+import logging
 import os
 import re
+import subprocess
 import tempfile
 import time
-from typing import List, Tuple, Optional
+from contextlib import nullcontext
+from typing import Callable, Iterator, List, Tuple, Optional, Union
 from pathlib import Path
 
 from dotenv import load_dotenv
 from google import genai
 from pydub import AudioSegment
+from pydub.utils import get_prober_name
+
+from app_logging import configure_logging
+from gemini_clients import get_gemini_clients
+from gemini_files import GeminiFileManager
+from gemini_scheduler import GeminiScheduler, get_gemini_scheduler
+from metrics import span
+from pipeline import StagePipeline
+from transcription_cache import TranscriptionCache, get_default_transcription_cache
 
 os.environ["PATH"] += os.pathsep + r"D:\ffmpeg-7.1.1-essentials_build\bin"
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # STEP 1: Direct transcription prompts (original language)
 TRANSCRIPTION_PROMPTS = {
     'vietnamese': """Please transcribe the Vietnamese audio file exactly as spoken with the following specifications:
@@ -250,6 +267,41 @@ Output:
 - Maintain exact formatting and structure"""
 }
 
+TRANSCRIPTION_MODEL = "gemini-2.0-flash-lite"
+
+# Pre-upload transcode profiles. Speech transcription does not need stereo 44.1 kHz audio,
+# so the speech profiles downmix to mono 16 kHz at a low bitrate once per file; segments
+# are then stream-copied out of the compact file. 'source' uploads the original encoding.
+TRANSCODE_PROFILES = {
+    'source': None,
+    'speech_mp3': {
+        'extension': '.mp3',
+        'args': ['-ac', '1', '-ar', '16000', '-c:a', 'libmp3lame', '-b:a', '32k']
+    },
+    'speech_opus': {
+        'extension': '.ogg',
+        'args': ['-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip']
+    }
+}
+
+# Formats whose segments are stream-copied instead of re-encoded
+STREAM_COPY_EXTENSIONS = ('.mp3', '.ogg')
+
+# Silence detection (ffmpeg silencedetect). Pauses shorter than the drop threshold are used
+# as cut points; longer ones are removed before upload, keeping a little context either side.
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_MS = 500
+SILENCE_PAD_MS = 500
+SILENCE_PATTERN = re.compile(r'silence_(start|end): (-?\d+(?:\.\d+)?)')
+
+# Maps a segment's local time to the source file: [(local_start_ms, source_start_ms), ...]
+OffsetMap = List[Tuple[int, int]]
+
+# Changes whenever a prompt or the model changes, so cached transcriptions are invalidated
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps([TRANSCRIPTION_MODEL, TRANSCRIPTION_PROMPTS, TRANSLATION_PROMPTS], sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
 
 class AudioSegmentTranscriber:
     """
@@ -257,113 +309,566 @@ class AudioSegmentTranscriber:
     Splits large MP3 files into 10-minute segments and transcribes each segment.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, max_workers: Optional[int] = None,
+                 cache: Union[TranscriptionCache, bool, None] = None, transcode_profile: Optional[str] = None,
+                 translate_workers: Optional[int] = None, client: Optional[genai.Client] = None,
+                 file_manager: Optional[GeminiFileManager] = None, scheduler: Optional[GeminiScheduler] = None):
         """
         Initialize the transcriber with Gemini API client.
         
         Args:
-            api_key: Google API key. If None, will use GOOGLE_API_KEY from environment.
+            api_key: Google API key for a dedicated client. If None, will use the shared client
+                     from gemini_clients (configured with GOOGLE_API_KEY from environment).
+            max_workers: Number of segments transcribed concurrently. If None, will use
+                         TRANSCRIBE_MAX_WORKERS from environment (default 4). Use 1 for serial processing.
+            cache: Cache for per-segment transcriptions. If None, will use the shared on-disk cache
+                   (disabled with TRANSCRIPTION_CACHE_ENABLED=false). False disables caching.
+            transcode_profile: Key of TRANSCODE_PROFILES applied before upload. If None, will use
+                               TRANSCODE_PROFILE from environment (default 'speech_mp3').
+            translate_workers: Number of segments translated concurrently. If None, will use
+                               TRANSLATE_MAX_WORKERS from environment (default max_workers).
+            client: Gemini client to use. If None, a dedicated client is created for api_key, or
+                    the shared pooled client is reused.
+            file_manager: Tracks, reuses and deletes uploaded segment files. If None, the shared
+                          manager is used with the shared client, otherwise one is created for client.
+            scheduler: Rate limits and retries the model calls. If None, will use the process-wide
+                       scheduler, so transcriptions share the quota with every other Gemini call.
         """
+        if client is not None:
+            self.client = client
+        elif api_key:
+            self.client = genai.Client(api_key=api_key)
+        else:
+            # Reuse the application-wide client and its keep-alive connection pool
+            shared_clients = get_gemini_clients()
+            self.client = shared_clients.client
+            file_manager = file_manager or shared_clients.files
+        self.scheduler = scheduler or get_gemini_scheduler()
+        self.file_manager = file_manager or GeminiFileManager(self.client, scheduler=self.scheduler)
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
-        if not self.api_key:
-            raise ValueError("Google API key is required. Set GOOGLE_API_KEY environment variable or pass api_key parameter.")
-        
-        self.client = genai.Client(api_key=self.api_key)
         self.segment_duration_ms = 10 * 60 * 1000  # 10 minutes in milliseconds
+        self.max_workers = max(1, max_workers or int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4")))
+        self.translate_workers = max(1, translate_workers or int(os.getenv("TRANSLATE_MAX_WORKERS", str(self.max_workers))))
+        if cache is False:
+            self.cache = None
+        else:
+            self.cache = cache if cache is not None else get_default_transcription_cache()
+
+        self.transcode_profile = transcode_profile or os.getenv("TRANSCODE_PROFILE", "speech_mp3")
+        if self.transcode_profile not in TRANSCODE_PROFILES:
+            raise ValueError(f"Unsupported transcode profile: {self.transcode_profile}. Supported: {list(TRANSCODE_PROFILES.keys())}")
+
+        # Silence-aware splitting: cuts snap to the latest pause within the window before each
+        # 10-minute mark, and silences of at least silence_drop_ms are not uploaded at all
+        self.silence_splitting = os.getenv("SILENCE_SPLITTING", "true").lower() not in ("0", "false", "no")
+        self.silence_drop_ms = int(os.getenv("SILENCE_DROP_MS", "10000"))
+        self.silence_snap_window_ms = 30 * 1000
+
+        # Per-stage counters of the most recent transcribe_file call
+        self.last_pipeline_stats = {}
     
-    def split_audio(self, audio_file_path: str) -> List[Tuple[AudioSegment, int]]:
+    def probe_duration_ms(self, audio_file_path: str) -> int:
         """
-        Split audio file into 10-minute segments.
-        
+        Read the duration of an audio/video file with ffprobe, without decoding it.
+
         Args:
-            audio_file_path: Path to the MP3 audio file
-            
+            audio_file_path: Path to the audio or video file
+
         Returns:
-            List of tuples containing (audio_segment, start_time_ms)
+            Duration in milliseconds
         """
-        try:
-            # Load the audio file
-            audio = AudioSegment.from_mp3(audio_file_path)
-            segments = []
-            
-            # Split into 10-minute chunks
-            for start_ms in range(0, len(audio), self.segment_duration_ms):
-                end_ms = min(start_ms + self.segment_duration_ms, len(audio))
-                segment = audio[start_ms:end_ms]
-                segments.append((segment, start_ms))
-            
-            return segments
-            
-        except Exception as e:
-            raise Exception(f"Error splitting audio file: {str(e)}")
-    
-    def transcribe_segment(self, audio_segment: AudioSegment, language: str = 'vietnamese') -> tuple[str, str]:
+        result = subprocess.run(
+            [get_prober_name(), "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", audio_file_path],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"ffprobe failed: {result.stderr.strip()}")
+        return int(float(result.stdout.strip()) * 1000)
+
+    def detect_silences(self, audio_file_path: str) -> List[Tuple[int, int]]:
+        """
+        Find silent stretches with ffmpeg's silencedetect filter.
+
+        The file is decoded in a streaming pass, so memory use does not depend on its duration.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+
+        Returns:
+            Sorted list of (start_ms, end_ms) tuples, one per silence of at least SILENCE_MIN_MS
+        """
+        command = [
+            AudioSegment.converter, "-hide_banner", "-nostats", "-i", audio_file_path, "-vn",
+            "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_MS / 1000}",
+            "-f", "null", "-"
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg silencedetect failed: {result.stderr.strip()[-500:]}")
+
+        silences = []
+        silence_start = None
+        for kind, seconds in SILENCE_PATTERN.findall(result.stderr):
+            milliseconds = max(0, int(float(seconds) * 1000))
+            if kind == 'start':
+                silence_start = milliseconds
+            elif silence_start is not None:
+                silences.append((silence_start, milliseconds))
+                silence_start = None
+
+        if silence_start is not None:
+            # The file ends in silence
+            silences.append((silence_start, self.probe_duration_ms(audio_file_path)))
+        return silences
+
+    def build_segment_plan(self, duration_ms: int, silences: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+        """
+        Group the audio into segments of at most segment_duration_ms of kept audio.
+
+        Silences of at least silence_drop_ms are left out (except SILENCE_PAD_MS at each edge),
+        so a segment can be made of several source ranges. Cuts snap to the latest pause within
+        silence_snap_window_ms before each segment limit, or to a dropped silence, instead of
+        landing mid-word.
+
+        Args:
+            duration_ms: Duration of the source file
+            silences: Sorted (start_ms, end_ms) silences from detect_silences
+
+        Returns:
+            List of segments, each a list of (source_start_ms, source_end_ms) pieces
+        """
+        # Source ranges that are kept after dropping long silences
+        kept_ranges = []
+        pauses = []
+        cursor = 0
+        for silence_start, silence_end in silences:
+            if silence_end - silence_start >= self.silence_drop_ms:
+                drop_start = silence_start + SILENCE_PAD_MS
+                if drop_start > cursor:
+                    kept_ranges.append((cursor, drop_start))
+                cursor = max(cursor, silence_end - SILENCE_PAD_MS)
+            else:
+                pauses.append((silence_start + silence_end) // 2)
+        if cursor < duration_ms:
+            kept_ranges.append((cursor, duration_ms))
+
+        segments = []
+        current = []
+        current_ms = 0
+        for range_start, range_end in kept_ranges:
+            start = range_start
+            while start < range_end:
+                room = self.segment_duration_ms - current_ms
+                if range_end - start <= room:
+                    current.append((start, range_end))
+                    current_ms += range_end - start
+                    break
+
+                # Latest pause inside the snap window before the segment limit
+                target = start + room
+                cut = None
+                index = bisect.bisect_right(pauses, target) - 1
+                if index >= 0 and pauses[index] > max(start, target - self.silence_snap_window_ms):
+                    cut = pauses[index]
+                elif current and room <= self.silence_snap_window_ms:
+                    # Close the segment at the silence dropped just before this range
+                    segments.append(current)
+                    current, current_ms = [], 0
+                    continue
+
+                if cut is None:
+                    cut = target
+                current.append((start, cut))
+                segments.append(current)
+                current, current_ms = [], 0
+                start = cut
+
+        if current:
+            segments.append(current)
+        return segments
+
+    def plan_speech_segments(self, audio_file_path: str) -> List[List[Tuple[int, int]]]:
+        """
+        Compute the source ranges of every segment, skipping long silences when enabled.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+
+        Returns:
+            List of segments, each a list of (source_start_ms, source_end_ms) pieces
+        """
+        duration_ms = self.probe_duration_ms(audio_file_path)
+        silences = self.detect_silences(audio_file_path) if self.silence_splitting else []
+        return self.build_segment_plan(duration_ms, silences)
+
+    def plan_segments(self, audio_file_path: str) -> List[Tuple[int, int]]:
+        """
+        Compute the time ranges the audio file will be split into.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+
+        Returns:
+            List of (start_ms, end_ms) tuples, the source span of each segment. Long silences
+            inside a span are not uploaded when silence splitting is enabled.
+        """
+        return [(pieces[0][0], pieces[-1][1]) for pieces in self.plan_speech_segments(audio_file_path)]
+
+    def transcode_for_upload(self, audio_file_path: str) -> Optional[str]:
+        """
+        Transcode the whole file once with the configured transcode profile.
+
+        ffmpeg streams the conversion, so memory use does not depend on the file duration.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+
+        Returns:
+            Path to the compact temporary file (the caller deletes it), or None for the 'source' profile
+        """
+        profile = TRANSCODE_PROFILES[self.transcode_profile]
+        if profile is None:
+            return None
+
+        with tempfile.NamedTemporaryFile(suffix=profile['extension'], delete=False) as temp_file:
+            compact_path = temp_file.name
+
+        command = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-y",
+            "-i", audio_file_path,
+            "-vn", "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:a", "+bitexact",
+            *profile['args'], compact_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            os.unlink(compact_path)
+            raise Exception(f"ffmpeg failed to transcode with profile '{self.transcode_profile}': {result.stderr.strip()}")
+        return compact_path
+
+    def cut_segment(self, audio_file_path: str, start_ms: int, end_ms: int) -> str:
+        """
+        Cut a time range out of the source file with ffmpeg input seeking.
+
+        MP3 and Ogg sources are stream-copied; other formats only have the requested range
+        decoded and re-encoded to MP3, so memory use does not depend on the file duration.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+            start_ms: Start of the range in milliseconds
+            end_ms: End of the range in milliseconds
+
+        Returns:
+            Path to a temporary audio file; the caller is responsible for deleting it
+        """
+        extension = os.path.splitext(audio_file_path)[1].lower()
+        if extension in STREAM_COPY_EXTENSIONS:
+            codec_args = ["-c:a", "copy"]
+        else:
+            extension = ".mp3"
+            codec_args = ["-c:a", "libmp3lame"]
+
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as temp_file:
+            segment_path = temp_file.name
+
+        command = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{start_ms / 1000:.3f}", "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+            "-i", audio_file_path,
+            "-vn", "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:a", "+bitexact",
+            *codec_args, segment_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            os.unlink(segment_path)
+            raise Exception(f"ffmpeg failed to cut {start_ms}-{end_ms}ms: {result.stderr.strip()}")
+        return segment_path
+
+    def cut_pieces(self, audio_file_path: str, pieces: List[Tuple[int, int]]) -> str:
+        """
+        Cut several source ranges into one segment file, leaving out the audio between them.
+
+        A single range is cut with cut_segment. Otherwise only the span from the first to the
+        last range is decoded, the gaps are removed with ffmpeg's aselect filter, and the result
+        is encoded with the transcode profile (MP3 for 'source').
+
+        Args:
+            audio_file_path: Path to the audio or video file
+            pieces: Sorted (start_ms, end_ms) source ranges
+
+        Returns:
+            Path to a temporary audio file; the caller is responsible for deleting it
+        """
+        if len(pieces) == 1:
+            return self.cut_segment(audio_file_path, *pieces[0])
+
+        span_start_ms, span_end_ms = pieces[0][0], pieces[-1][1]
+        selection = "+".join(
+            f"between(t,{(start_ms - span_start_ms) / 1000:.3f},{(end_ms - span_start_ms) / 1000:.3f})"
+            for start_ms, end_ms in pieces
+        )
+
+        profile = TRANSCODE_PROFILES[self.transcode_profile]
+        if profile is None:
+            extension, codec_args = ".mp3", ["-c:a", "libmp3lame"]
+        else:
+            extension, codec_args = profile['extension'], profile['args']
+
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as temp_file:
+            segment_path = temp_file.name
+
+        command = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{span_start_ms / 1000:.3f}", "-t", f"{(span_end_ms - span_start_ms) / 1000:.3f}",
+            "-i", audio_file_path,
+            "-vn", "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:a", "+bitexact",
+            "-af", f"aselect='{selection}',asetpts=N/SR/TB",
+            *codec_args, segment_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            os.unlink(segment_path)
+            raise Exception(f"ffmpeg failed to cut {len(pieces)} pieces from {span_start_ms}-{span_end_ms}ms: {result.stderr.strip()}")
+        return segment_path
+
+    def split_audio(self, audio_file_path: str,
+                    segment_plan: Optional[List[List[Tuple[int, int]]]] = None) -> Iterator[Tuple[str, OffsetMap]]:
+        """
+        Lazily split audio file into segments of up to 10 minutes of kept audio.
+
+        Segments are cut straight from the source file with ffmpeg as the generator is
+        advanced; the whole file is never decoded into memory.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+            segment_plan: Segments from plan_speech_segments; planned here when None
+
+        Yields:
+            Tuples of (segment_file_path, offset_map). The offset map lists (local_start_ms,
+            source_start_ms) for each piece of the segment. The caller deletes each segment file.
+        """
+        if segment_plan is None:
+            try:
+                segment_plan = self.plan_speech_segments(audio_file_path)
+            except Exception as e:
+                raise Exception(f"Error splitting audio file: {str(e)}")
+
+        for pieces in segment_plan:
+            try:
+                with span("export"):
+                    segment_path = self.cut_pieces(audio_file_path, pieces)
+            except Exception as e:
+                raise Exception(f"Error splitting audio file: {str(e)}")
+
+            offset_map = []
+            local_ms = 0
+            for start_ms, end_ms in pieces:
+                offset_map.append((local_ms, start_ms))
+                local_ms += end_ms - start_ms
+            yield segment_path, offset_map
+
+    @staticmethod
+    def hash_audio_segment(audio_segment: Union[AudioSegment, str]) -> str:
+        """
+        Hash the audio of a segment for use in cache keys.
+
+        Args:
+            audio_segment: Segment file path, or AudioSegment object
+
+        Returns:
+            Hex SHA-256 digest of the file bytes, or of the sample format and raw PCM data
+        """
+        if isinstance(audio_segment, str):
+            digest = hashlib.sha256()
+            with open(audio_segment, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+
+        digest = hashlib.sha256(
+            f"{audio_segment.frame_rate}:{audio_segment.channels}:{audio_segment.sample_width}:".encode("ascii")
+        )
+        digest.update(audio_segment.raw_data)
+        return digest.hexdigest()
+
+    def segment_cache_key(self, audio_segment: Union[AudioSegment, str], language: str,
+                          audio_hash: Optional[str] = None) -> str:
+        """
+        Build the transcription cache key for a segment.
+
+        Args:
+            audio_segment: Segment file path, or AudioSegment object
+            language: Language for transcription
+            audio_hash: Precomputed hash_audio_segment digest, if available
+
+        Returns:
+            Cache key from TranscriptionCache.make_key
+        """
+        return self.cache.make_key(
+            audio_hash or self.hash_audio_segment(audio_segment), language, self.segment_duration_ms, PROMPT_VERSION
+        )
+
+    def file_cache_key(self, audio_file_path: str, language: str) -> str:
+        """
+        Build the transcription cache key for a whole source file.
+
+        Covers everything that decides how the file is transcoded and split, so a hit can
+        skip transcoding, silence detection and cutting altogether.
+
+        Args:
+            audio_file_path: Path to the source audio or video file
+            language: Language for transcription
+
+        Returns:
+            Cache key from TranscriptionCache.make_key
+        """
+        split_settings = (
+            f"{self.transcode_profile}|{self.silence_splitting}|{self.silence_drop_ms}|"
+            f"{SILENCE_NOISE_DB}|{SILENCE_MIN_MS}|{SILENCE_PAD_MS}"
+        )
+        return self.cache.make_key(
+            f"file:{self.hash_audio_segment(audio_file_path)}", language, self.segment_duration_ms,
+            f"{PROMPT_VERSION}|{split_settings}"
+        )
+
+    def transcribe_segment(self, audio_segment: Union[AudioSegment, str], language: str = 'vietnamese') -> tuple[str, str]:
+        """
+        Transcribe a single audio segment, reusing the cached result for identical audio.
+
+        Args:
+            audio_segment: Segment file path from split_audio, or AudioSegment object to transcribe
+            language: Language for transcription ('vietnamese', 'english', 'japanese')
+
+        Returns:
+            Tuple of (original_transcript, vietnamese_transcript)
+        """
+        if self.cache is None:
+            return self.transcribe_segment_uncached(audio_segment, language)
+
+        cache_key = self.segment_cache_key(audio_segment, language)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Transcription cache hit, skipping Gemini calls")
+            return cached
+
+        original_transcript, vietnamese_transcript = self.transcribe_segment_uncached(audio_segment, language)
+        self.cache.put(cache_key, original_transcript, vietnamese_transcript)
+        return original_transcript, vietnamese_transcript
+
+    def transcribe_segment_uncached(self, audio_segment: Union[AudioSegment, str], language: str = 'vietnamese') -> tuple[str, str]:
         """
         Transcribe a single audio segment using two-step process: transcription then translation.
 
         Args:
-            audio_segment: AudioSegment object to transcribe
+            audio_segment: Segment file path from split_audio, or AudioSegment object to transcribe
             language: Language for transcription ('vietnamese', 'english', 'japanese')
 
         Returns:
             Tuple of (original_transcript, vietnamese_transcript)
         """
         try:
-            # Create a temporary file for the segment
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                audio_segment.export(temp_file.name, format="mp3")
-                temp_file_path = temp_file.name
-
+            uploaded_file = self.upload_segment(audio_segment)
             try:
-                # Upload the segment to Gemini
-                uploaded_file = self.client.files.upload(file=temp_file_path)
-
-                # STEP 1: Direct transcription in original language
-                transcription_prompt = TRANSCRIPTION_PROMPTS.get(language, TRANSCRIPTION_PROMPTS['vietnamese'])
-
-                print(f"Step 1: Transcribing in {language}...")
-                transcription_response = self.client.models.generate_content(
-                    model="gemini-2.0-flash-lite",
-                    contents=[transcription_prompt, uploaded_file]
-                )
-
-                original_transcript = transcription_response.text
-                print(f"Step 1 complete: {len(original_transcript)} characters")
-
-                # STEP 2: Translation to Vietnamese (if not already Vietnamese)
-                if language == 'vietnamese':
-                    # Already in Vietnamese, return as-is
-                    print("Language is Vietnamese, skipping translation step")
-                    return original_transcript, original_transcript
-                else:
-                    # Translate to Vietnamese
-                    translation_key = f"{language}_to_vietnamese"
-                    translation_prompt = TRANSLATION_PROMPTS.get(translation_key)
+                original_transcript = self.transcribe_uploaded(uploaded_file, language)
+            finally:
+                # The translation step does not need the uploaded file
+                self.release_segment(uploaded_file)
+            return original_transcript, self.translate_transcript(original_transcript, language)
+        except Exception as e:
+            raise Exception(f"Error in two-step transcription: {str(e)}")
 
-                    if translation_prompt:
-                        print(f"Step 2: Translating {language} to Vietnamese...")
+    def upload_segment(self, audio_segment: Union[AudioSegment, str], audio_hash: Optional[str] = None):
+        """
+        Upload a segment to Gemini through the file manager, reusing a still-valid upload of the
+        same audio. Pass the handle to release_segment when it is no longer needed.
 
-                        # Combine translation prompt with the original transcript
-                        full_translation_prompt = f"{translation_prompt}\n\nPlease translate the following transcript:\n\n{original_transcript}"
+        Args:
+            audio_segment: Segment file path (left in place for the caller), or AudioSegment object
+                           (exported to a temporary MP3 file that is deleted after the upload)
+            audio_hash: Precomputed hash_audio_segment digest, used as the upload's content key
 
-                        translation_response = self.client.models.generate_content(
-                            model="gemini-2.0-flash-lite",
-                            contents=[full_translation_prompt]
-                        )
+        Returns:
+            Handle of the uploaded file
+        """
+        if isinstance(audio_segment, str):
+            return self.file_manager.acquire(audio_segment, audio_hash)
 
-                        vietnamese_transcript = translation_response.text
-                        print(f"Step 2 complete: {len(vietnamese_transcript)} characters")
-                        return original_transcript, vietnamese_transcript
-                    else:
-                        print(f"Warning: No translation prompt for {language}, returning original transcript")
-                        return original_transcript, original_transcript
+        # Create a temporary file for the segment
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
+            audio_segment.export(temp_file.name, format="mp3")
+            temp_file_path = temp_file.name
+        try:
+            return self.file_manager.acquire(temp_file_path, audio_hash)
+        finally:
+            # Clean up temporary file
+            os.unlink(temp_file_path)
 
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+    def release_segment(self, uploaded_file) -> None:
+        """
+        Release a handle from upload_segment; the remote file is deleted in the background.
+        """
+        self.file_manager.release(uploaded_file)
 
-        except Exception as e:
-            raise Exception(f"Error in two-step transcription: {str(e)}")
+    def transcribe_uploaded(self, uploaded_file, language: str = 'vietnamese') -> str:
+        """
+        STEP 1: Transcribe an uploaded segment in its original language.
+
+        Args:
+            uploaded_file: Handle returned by upload_segment
+            language: Language for transcription ('vietnamese', 'english', 'japanese')
+
+        Returns:
+            Transcript in the original language
+        """
+        transcription_prompt = TRANSCRIPTION_PROMPTS.get(language, TRANSCRIPTION_PROMPTS['vietnamese'])
+
+        logger.debug("Step 1: Transcribing in %s", language)
+        transcription_response = self.scheduler.generate_content(
+            self.client,
+            model=TRANSCRIPTION_MODEL,
+            contents=[transcription_prompt, uploaded_file]
+        )
+
+        original_transcript = transcription_response.text
+        logger.debug("Step 1 complete: %d characters", len(original_transcript))
+        return original_transcript
+
+    def translate_transcript(self, original_transcript: str, language: str = 'vietnamese') -> str:
+        """
+        STEP 2: Translate a transcript to Vietnamese (if not already Vietnamese).
+
+        Args:
+            original_transcript: Transcript from transcribe_uploaded
+            language: Language of the transcript
+
+        Returns:
+            Vietnamese transcript
+        """
+        if language == 'vietnamese':
+            # Already in Vietnamese, return as-is
+            logger.debug("Language is Vietnamese, skipping translation step")
+            return original_transcript
+
+        translation_key = f"{language}_to_vietnamese"
+        translation_prompt = TRANSLATION_PROMPTS.get(translation_key)
+        if not translation_prompt:
+            logger.warning("No translation prompt for %s, returning original transcript", language)
+            return original_transcript
+
+        logger.debug("Step 2: Translating %s to Vietnamese", language)
+
+        # Combine translation prompt with the original transcript
+        full_translation_prompt = f"{translation_prompt}\n\nPlease translate the following transcript:\n\n{original_transcript}"
+
+        translation_response = self.scheduler.generate_content(
+            self.client,
+            model=TRANSCRIPTION_MODEL,
+            contents=[full_translation_prompt]
+        )
+
+        vietnamese_transcript = translation_response.text
+        logger.debug("Step 2 complete: %d characters", len(vietnamese_transcript))
+        return vietnamese_transcript
     
     def parse_timestamp(self, timestamp_str: str) -> int:
         """
@@ -403,13 +908,37 @@ class AudioSegmentTranscriber:
         seconds = total_seconds % 60
         return f"{minutes}:{seconds:02d}"
     
-    def adjust_timestamps(self, transcription: str, offset_ms: int) -> str:
+    def to_source_time(self, local_ms: int, offset: Union[int, OffsetMap], is_end: bool = False) -> int:
+        """
+        Convert a time within a segment to a time in the source file.
+
+        Args:
+            local_ms: Time from the start of the segment in milliseconds
+            offset: Segment start in milliseconds, or offset map from split_audio
+            is_end: Whether the time ends a range; an end time exactly on a piece boundary is
+                    mapped to the end of the earlier piece rather than the start of the next
+
+        Returns:
+            Time in the source file in milliseconds
+        """
+        if isinstance(offset, int):
+            return local_ms + offset
+
+        local_start_ms, source_start_ms = offset[0]
+        for piece_local_ms, piece_source_ms in offset[1:]:
+            if piece_local_ms > local_ms or (is_end and piece_local_ms == local_ms):
+                break
+            local_start_ms, source_start_ms = piece_local_ms, piece_source_ms
+        return source_start_ms + local_ms - local_start_ms
+
+    def adjust_timestamps(self, transcription: str, offset: Union[int, OffsetMap]) -> str:
         """
-        Adjust timestamps in transcription by adding offset.
+        Adjust timestamps in transcription from segment time to source file time.
         
         Args:
             transcription: Original transcription with timestamps
-            offset_ms: Offset to add to timestamps in milliseconds
+            offset: Offset to add to timestamps in milliseconds, or a piecewise offset map of
+                    (local_start_ms, source_start_ms) pairs for segments with dropped silences
             
         Returns:
             Transcription with adjusted timestamps
@@ -420,9 +949,9 @@ class AudioSegmentTranscriber:
         def replace_timestamp(match):
             start_str, end_str = match.groups()
             
-            # Parse timestamps and add offset
-            start_ms = self.parse_timestamp(start_str) + offset_ms
-            end_ms = self.parse_timestamp(end_str) + offset_ms
+            # Parse timestamps and map them to the source file
+            start_ms = self.to_source_time(self.parse_timestamp(start_str), offset)
+            end_ms = self.to_source_time(self.parse_timestamp(end_str), offset, is_end=True)
             
             # Format back to string
             new_start = self.format_timestamp(start_ms)
@@ -432,58 +961,214 @@ class AudioSegmentTranscriber:
         
         return re.sub(pattern, replace_timestamp, transcription)
     
-    def transcribe_file(self, audio_file_path: str, language: str = 'vietnamese') -> tuple[str, str]:
+    @staticmethod
+    def format_pipeline_stats(stats: dict) -> str:
+        """
+        Format StagePipeline.stats() as one line per stage for logging.
+        """
+        return "; ".join(
+            f"{name}: {counters['items']} items, busy {counters['busy_seconds']:.2f}s, "
+            f"waiting {counters['wait_seconds']:.2f}s, blocked {counters['blocked_seconds']:.2f}s"
+            for name, counters in stats.items()
+        )
+
+    def iter_transcribe_file(self, audio_file_path: str, language: str = 'vietnamese',
+                             parse: Optional[Callable[[str, str], object]] = None) -> Iterator[Tuple[int, int, object]]:
+        """
+        Transcribe an audio file segment by segment, yielding each segment as soon as it and
+        every segment before it are finished.
+
+        Closing the generator early stops the pipeline and cleans up pending uploads and files.
+
+        Args:
+            audio_file_path: Path to the audio or video file
+            language: Language for transcription ('vietnamese', 'english', 'japanese')
+            parse: Optional callable applied to (original_transcription, vietnamese_transcription)
+                   of each segment, e.g. to turn them into transcript items
+
+        Yields:
+            Tuples of (segment_index, segment_count, result) in segment order. result is
+            parse(original, vietnamese), or the (original_transcription, vietnamese_transcription)
+            tuple when parse is None; timestamps are relative to the start of the source file.
+        """
+        # Validate file exists
+        if not os.path.exists(audio_file_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        
+        # Validate language
+        if language not in TRANSCRIPTION_PROMPTS:
+            raise ValueError(f"Unsupported language: {language}. Supported: {list(TRANSCRIPTION_PROMPTS.keys())}")
+        
+        logger.info("Starting transcription of %s (%s)", audio_file_path, language)
+        
+        transcript_st_time = time.time()
+
+        # A file transcribed before with the same settings is served without transcoding or cutting it
+        file_key = None
+        if self.cache is not None:
+            file_key = self.file_cache_key(audio_file_path, language)
+            cached_segments = self.cache.get_segments(file_key)
+            if cached_segments is not None:
+                logger.info("Transcription cache hit for the whole file, skipping transcoding and splitting")
+                for index, (original_transcription, vietnamese_transcription) in enumerate(cached_segments):
+                    if parse is not None:
+                        yield index, len(cached_segments), parse(original_transcription, vietnamese_transcription)
+                    else:
+                        yield index, len(cached_segments), (original_transcription, vietnamese_transcription)
+                return
+
+        # Each segment moves through encode (cut by split_audio) -> upload -> transcribe ->
+        # translate. Every stage has its own workers and a bounded queue in front of it, so
+        # segment N+1 is cut while segment N uploads and segment N-1 is transcribed. For
+        # non-Vietnamese audio, finished segments are translated while later ones are still
+        # being transcribed, instead of each translation holding up the next transcription.
+        def upload_stage(job: dict) -> dict:
+            segment = job['segment']
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing segment %d (starting at %s)", job['index'] + 1,
+                             self.format_timestamp(self.to_source_time(0, job['offset'])))
+            try:
+                audio_hash = None
+                if self.cache is not None:
+                    audio_hash = self.hash_audio_segment(segment)
+                    job['cache_key'] = self.segment_cache_key(segment, language, audio_hash)
+                    cached = self.cache.get(job['cache_key'])
+                    if cached is not None:
+                        logger.debug("Transcription cache hit, skipping Gemini calls")
+                        job['result'] = cached
+                        return job
+                with span("gemini_upload"):
+                    job['uploaded'] = self.upload_segment(segment, audio_hash)
+            finally:
+                # Segment files cut by split_audio are owned by the pipeline
+                delete_segment_file(job)
+            return job
+
+        def transcribe_stage(job: dict) -> dict:
+            if 'result' not in job:
+                try:
+                    with span("transcription"):
+                        job['original'] = self.transcribe_uploaded(job['uploaded'], language)
+                finally:
+                    self.release_segment(job.pop('uploaded'))
+            return job
+
+        def translate_stage(job: dict) -> dict:
+            if 'result' not in job:
+                # Vietnamese is passed through untranslated, so it is not timed as a translation
+                with span("translation") if language != 'vietnamese' else nullcontext():
+                    job['result'] = (job['original'], self.translate_transcript(job['original'], language))
+                if self.cache is not None:
+                    self.cache.put(job['cache_key'], *job['result'])
+            return job
+
+        def delete_segment_file(job: dict) -> None:
+            segment = job.pop('segment', None)
+            if isinstance(segment, str) and os.path.exists(segment):
+                os.unlink(segment)
+
+        def discard_segment(job: dict) -> None:
+            if 'uploaded' in job:
+                self.release_segment(job.pop('uploaded'))
+            delete_segment_file(job)
+
+        translate_workers = self.translate_workers if language != 'vietnamese' else 1
+        logger.debug("Transcribing with %d worker(s) per stage, %d translating", self.max_workers, translate_workers)
+        # Transcode once to the compact upload format, then split the compact file
+        with span("decode"):
+            compact_path = self.transcode_for_upload(audio_file_path)
+        split_source = compact_path or audio_file_path
+        if compact_path:
+            logger.debug("Transcoded with profile '%s': %d -> %d bytes", self.transcode_profile,
+                         os.path.getsize(audio_file_path), os.path.getsize(compact_path))
+
+        try:
+            with span("split"):
+                segment_plan = self.plan_speech_segments(split_source)
+        except Exception as e:
+            if compact_path:
+                os.unlink(compact_path)
+            raise Exception(f"Error splitting audio file: {str(e)}")
+
+        pipeline = StagePipeline(
+            [
+                ("upload", upload_stage, self.max_workers),
+                ("transcribe", transcribe_stage, self.max_workers),
+                ("translate", translate_stage, translate_workers)
+            ],
+            queue_size=self.max_workers,
+            source_name="encode",
+            on_discard=discard_segment
+        )
+        jobs = (
+            {'index': index, 'segment': segment, 'offset': offset}
+            for index, (segment, offset) in enumerate(self.split_audio(split_source, segment_plan))
+        )
+
+        results = pipeline.run(jobs)
+        finished_segments = []
+        try:
+            # Results arrive in segment (offset) order
+            for job in results:
+                original_transcription, vietnamese_transcription = job['result']
+                original_transcription = self.adjust_timestamps(original_transcription, job['offset'])
+                vietnamese_transcription = self.adjust_timestamps(vietnamese_transcription, job['offset'])
+                finished_segments.append((original_transcription, vietnamese_transcription))
+                if parse is not None:
+                    yield job['index'], len(segment_plan), parse(original_transcription, vietnamese_transcription)
+                else:
+                    yield job['index'], len(segment_plan), (original_transcription, vietnamese_transcription)
+        finally:
+            # Stops the stages before the compact file they read from is deleted; also runs
+            # when the consumer closes the generator early
+            results.close()
+            self.last_pipeline_stats = pipeline.stats()
+            if compact_path:
+                os.unlink(compact_path)
+
+        logger.info("Transcribed %d segments in %.2fs", len(segment_plan), time.time() - transcript_st_time)
+        if file_key is not None:
+            # Only reached when every segment finished, so partial results are never cached
+            self.cache.put_segments(file_key, finished_segments)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Pipeline stage stats: %s", self.format_pipeline_stats(self.last_pipeline_stats))
+            if self.cache is not None:
+                logger.debug("Transcription cache stats: %s", self.cache.stats())
+            logger.debug("Gemini file stats: %s", self.file_manager.stats())
+        
+
+    def transcribe_file(self, audio_file_path: str, language: str = 'vietnamese',
+                        on_segment: Optional[Callable[[int, int, str, str], None]] = None) -> tuple[str, str]:
         """
         Transcribe an entire MP3 file by splitting it into segments.
 
         Args:
             audio_file_path: Path to the MP3 audio file
             language: Language for transcription ('vietnamese', 'english', 'japanese')
+            on_segment: Optional progress callback, called in segment order as each segment
+                        finishes with (segment_index, segment_count, original_transcription,
+                        vietnamese_transcription); the transcriptions have source timestamps
 
         Returns:
             Tuple of (original_transcription, vietnamese_transcription) with adjusted timestamps
         """
         try:
-            # Validate file exists
-            if not os.path.exists(audio_file_path):
-                raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
-            
-            # Validate language
-            if language not in TRANSCRIPTION_PROMPTS:
-                raise ValueError(f"Unsupported language: {language}. Supported: {list(TRANSCRIPTION_PROMPTS.keys())}")
-            
-            print(f"Starting transcription of {audio_file_path}")
-            print(f"Language: {language}")
-            
-            # Split audio into segments
-            segments = self.split_audio(audio_file_path)
-            print(f"Split audio into {len(segments)} segments")
-
             combined_original_transcription = []
             combined_vietnamese_transcription = []
-            transcript_st_time = time.time()
-            # Process each segment
-            for i, (segment, start_time_ms) in enumerate(segments):
-                print(f"Processing segment {i+1}/{len(segments)} (starting at {self.format_timestamp(start_time_ms)})")
-
-                # Transcribe the segment (returns tuple of original and vietnamese)
-                original_transcription, vietnamese_transcription = self.transcribe_segment(segment, language)
+            for segment_index, segment_count, (original_transcription, vietnamese_transcription) in \
+                    self.iter_transcribe_file(audio_file_path, language):
+                combined_original_transcription.append(original_transcription)
+                combined_vietnamese_transcription.append(vietnamese_transcription)
+                if on_segment is not None:
+                    on_segment(segment_index, segment_count, original_transcription, vietnamese_transcription)
 
-                # Adjust timestamps for both transcriptions
-                adjusted_original = self.adjust_timestamps(original_transcription, start_time_ms)
-                adjusted_vietnamese = self.adjust_timestamps(vietnamese_transcription, start_time_ms)
-
-                combined_original_transcription.append(adjusted_original)
-                combined_vietnamese_transcription.append(adjusted_vietnamese)
-
-            print(f"Transcript_time: {time.time() - transcript_st_time}:.2f")
             # Combine all transcriptions
             final_original_transcription = '\n'.join(combined_original_transcription)
             final_vietnamese_transcription = '\n'.join(combined_vietnamese_transcription)
 
-            print("Transcription completed successfully")
+            logger.debug("Transcription completed successfully")
             return final_original_transcription, final_vietnamese_transcription
-            
+
         except Exception as e:
             raise Exception(f"Error transcribing file: {str(e)}")
 
@@ -525,6 +1210,8 @@ def main():
     """
     import sys
 
+    configure_logging()
+
     if len(sys.argv) < 2:
         print("Usage: python cut_audio.py <audio_file_path> [language] [output_file]")
         print("Languages: vietnamese (default), english, japanese")
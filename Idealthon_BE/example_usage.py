@@ -58,12 +58,12 @@ def example_advanced_usage():
         # Create transcriber instance
         transcriber = AudioSegmentTranscriber()
         
-        # Split audio to see how many segments we'll have
-        segments = transcriber.split_audio(audio_file)
-        print(f"Audio will be split into {len(segments)} segments of ~10 minutes each")
+        # Plan the split to see how many segments we'll have (no audio is decoded)
+        segment_ranges = transcriber.plan_segments(audio_file)
+        print(f"Audio will be split into {len(segment_ranges)} segments of ~10 minutes each")
         
         # Calculate total duration
-        total_duration_ms = sum(len(segment) for segment, _ in segments)
+        total_duration_ms = segment_ranges[-1][1] if segment_ranges else 0
         total_minutes = total_duration_ms // (1000 * 60)
         print(f"Total audio duration: ~{total_minutes} minutes")
         
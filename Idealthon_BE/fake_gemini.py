@@ -0,0 +1,425 @@
+import datetime
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+import httpx
+from dotenv import load_dotenv
+from google.genai import errors
+
+from transcript_parser import parse_transcript_entries
+
+load_dotenv()
+
+# Transcript lines of the canned transcriptions, every 7th marked for removal
+SEGMENT_LINE_SECONDS = 15
+WORDS = {
+    "vietnamese": ("chúng ta sẽ thảo luận về dự án mới và kế hoạch phát triển sản phẩm trong quý tới "
+                   "với đội ngũ kỹ thuật và khách hàng").split(),
+    "english": ("today we will talk about the new project and our plan to grow the product next "
+                "quarter with the engineering team and customers").split(),
+    "japanese": "今日 は 新しい プロジェクト と 来期 の 製品 計画 について チーム と 話し ます".split()
+}
+FILLER_LINE = {"vietnamese": "Ừm, à...", "english": "Um, uh...", "japanese": "えーと、あの..."}
+
+# responder(contents) -> answer text, a list of stream chunks, or None for the canned answer
+Responder = Callable[[object], Union[str, List[str], None]]
+
+# Speech transcoded with the default speech_mp3 profile is 32 kbps
+DEFAULT_AUDIO_BITRATE = 32000
+AUDIO_TOKENS_PER_SECOND = 32
+
+
+class LatencyDistribution:
+    """
+    Random delay in seconds, parsed from a spec:
+        fixed:S             always S
+        uniform:LOW,HIGH    uniform between LOW and HIGH
+        normal:MEAN,STD     normal, clamped at 0
+        lognormal:MEDIAN,SIGMA  log-normal with the given median (a long right tail, like real APIs)
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.strip().partition(':')
+        kind = kind.lower()
+        try:
+            values = [float(value) for value in params.split(',')] if params.strip() else []
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}.get(kind)
+        if expected is None:
+            raise ValueError(f"Unknown latency distribution '{kind}'. Supported: {', '.join(self.KINDS)}")
+        if len(values) != expected:
+            raise ValueError(f"Latency distribution '{kind}' takes {expected} value(s), got '{spec}'")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.values)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.values))
+        median, sigma = self.values
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class FakeUsage:
+    """Stand-in for the usage_metadata of a response."""
+
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Stand-in for GenerateContentResponse: text plus usage_metadata."""
+
+    def __init__(self, text: str, prompt_tokens: int, chunks: Optional[List[str]] = None):
+        self.text = text
+        output_tokens = len(text) // 4 + 1
+        self.usage_metadata = FakeUsage(prompt_tokens, output_tokens)
+        # How a stream splits the text, when scripted
+        self.chunks = chunks
+
+
+class FakeFile:
+    """Stand-in for an uploaded types.File."""
+
+    def __init__(self, name: str, display_name: str, size_bytes: int, duration_seconds: float):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.name = name
+        self.display_name = display_name
+        self.size_bytes = size_bytes
+        self.duration_seconds = duration_seconds
+        self.mime_type = "audio/mpeg"
+        self.state = "ACTIVE"
+        self.uri = f"fake://{name}"
+        self.create_time = now
+        self.expiration_time = now + datetime.timedelta(hours=48)
+
+
+class FakeGemini:
+    """
+    Shared state of a fake backend: settings, the seeded random source and counters.
+    """
+
+    def __init__(self, latency: Optional[str] = None, upload_latency: Optional[str] = None,
+                 chunk_latency: Optional[str] = None, error_rate: Optional[float] = None,
+                 error_codes: Optional[List[int]] = None, retry_after_seconds: Optional[float] = None,
+                 seed: Optional[int] = None, audio_bitrate: Optional[int] = None):
+        """
+        Args:
+            latency: Delay before a response, or before the first chunk of a stream. If None, will use
+                     FAKE_GEMINI_LATENCY from environment (default 'lognormal:1.0,0.3').
+            upload_latency: Delay of a file upload. If None, will use FAKE_GEMINI_UPLOAD_LATENCY from
+                            environment (default 'uniform:0.1,0.3').
+            chunk_latency: Delay between stream chunks. If None, will use FAKE_GEMINI_CHUNK_LATENCY from
+                           environment (default 'fixed:0.05').
+            error_rate: Share of calls that fail, 0 to 1. If None, will use FAKE_GEMINI_ERROR_RATE from
+                        environment (default 0).
+            error_codes: HTTP status codes of the failures, chosen at random. If None, will use
+                         FAKE_GEMINI_ERROR_CODES from environment (default '429,503').
+            retry_after_seconds: Retry-After header sent with 429 errors. If None, will use
+                                 FAKE_GEMINI_RETRY_AFTER from environment (default 1).
+            seed: Seed of the random source, so runs are reproducible. If None, will use FAKE_GEMINI_SEED
+                  from environment (default 0).
+            audio_bitrate: Bits per second used to estimate the duration of an uploaded file. If None,
+                           will use FAKE_GEMINI_AUDIO_BITRATE from environment (default 32000).
+        """
+        self.latency = LatencyDistribution(latency or os.getenv("FAKE_GEMINI_LATENCY", "lognormal:1.0,0.3"))
+        self.upload_latency = LatencyDistribution(upload_latency or os.getenv("FAKE_GEMINI_UPLOAD_LATENCY", "uniform:0.1,0.3"))
+        self.chunk_latency = LatencyDistribution(chunk_latency or os.getenv("FAKE_GEMINI_CHUNK_LATENCY", "fixed:0.05"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0"))
+        self.error_codes = error_codes or [
+            int(code) for code in os.getenv("FAKE_GEMINI_ERROR_CODES", "429,503").split(',') if code.strip()
+        ]
+        self.retry_after_seconds = retry_after_seconds if retry_after_seconds is not None else float(
+            os.getenv("FAKE_GEMINI_RETRY_AFTER", "1")
+        )
+        self.audio_bitrate = audio_bitrate or int(os.getenv("FAKE_GEMINI_AUDIO_BITRATE", str(DEFAULT_AUDIO_BITRATE)))
+
+        self._rng = random.Random(seed if seed is not None else int(os.getenv("FAKE_GEMINI_SEED", "0")))
+        self._lock = threading.Lock()
+        self._scripted_failures: List[Exception] = []
+        self.counters: Dict[str, int] = {}
+
+    def fail_next(self, *failures: Exception) -> None:
+        """
+        Make the next calls (model calls and uploads alike) raise these errors, one per call in
+        order, before any random failure.
+        """
+        with self._lock:
+            self._scripted_failures.extend(failures)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def sample_latency(self, distribution: LatencyDistribution) -> float:
+        with self._lock:
+            return distribution.sample(self._rng)
+
+    def maybe_fail(self) -> None:
+        """
+        Raise the next error queued by fail_next, or a canned API error for error_rate of the calls.
+        """
+        with self._lock:
+            scripted = self._scripted_failures.pop(0) if self._scripted_failures else None
+            if scripted is None:
+                if self.error_rate <= 0 or self._rng.random() >= self.error_rate:
+                    return
+                code = self._rng.choice(self.error_codes)
+        if scripted is not None:
+            self.count("scripted_failures")
+            raise scripted
+        self.count(f"errors_{code}")
+        headers = {"retry-after": f"{self.retry_after_seconds:g}"} if code == 429 else {}
+        status = "RESOURCE_EXHAUSTED" if code == 429 else "UNAVAILABLE"
+        response_json = {"error": {"code": code, "message": "Simulated failure from the fake Gemini backend", "status": status}}
+        error_type = errors.ClientError if code < 500 else errors.ServerError
+        raise error_type(code, response_json, httpx.Response(code, headers=headers))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+def _prompt_random(parts: List) -> random.Random:
+    """
+    Random source seeded by the request, so identical prompts get identical responses.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") if isinstance(part, str) else str(getattr(part, "name", "")).encode("utf-8"))
+    return random.Random(digest.hexdigest())
+
+
+def _format_time(seconds: int) -> str:
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def _sentence(rng: random.Random, language: str, length: int) -> str:
+    words = WORDS.get(language, WORDS["vietnamese"])
+    separator = "" if language == "japanese" else " "
+    start = rng.randrange(len(words))
+    return separator.join(words[(start + offset) % len(words)] for offset in range(length))
+
+
+def canned_transcription(rng: random.Random, duration_seconds: float, language: str) -> str:
+    """
+    A transcript in the <remove>…</remove><time>…</time> format covering duration_seconds.
+    """
+    lines = []
+    total = max(SEGMENT_LINE_SECONDS, int(duration_seconds))
+    for index, start in enumerate(range(0, total, SEGMENT_LINE_SECONDS)):
+        end = min(start + SEGMENT_LINE_SECONDS, total)
+        remove = index % 7 == 6
+        text = FILLER_LINE.get(language, FILLER_LINE["vietnamese"]) if remove else _sentence(rng, language, rng.randint(8, 24))
+        lines.append(f"<remove>{'true' if remove else 'false'}</remove><time>{_format_time(start)} - {_format_time(end)}</time> {text}")
+    return '\n'.join(lines)
+
+
+def canned_translation(rng: random.Random, transcript: str) -> str:
+    """
+    The transcript with its timestamps and remove flags kept and the text replaced by Vietnamese.
+    """
+    lines = []
+    for timestamp_key, remove, text in parse_transcript_entries(transcript):
+        start, end = timestamp_key.split('-')
+        translated = FILLER_LINE["vietnamese"] if remove else _sentence(rng, "vietnamese", max(4, len(text.split())))
+        lines.append(f"<remove>{'true' if remove else 'false'}</remove><time>{start} - {end}</time> {translated}")
+    return '\n'.join(lines)
+
+
+def canned_idea(rng: random.Random) -> Dict:
+    return {
+        "main_idea": f"Ý tưởng: {_sentence(rng, 'vietnamese', 6)}",
+        "supporting_ideas": [_sentence(rng, "vietnamese", 8) for _ in range(3)],
+        "content_formats": rng.sample(["video", "blog", "post", "infographic"], 2),
+        "target_audience": _sentence(rng, "vietnamese", 4),
+        "recommended_channels": rng.sample(["YouTube", "TikTok", "Facebook", "Blog"], 2)
+    }
+
+
+def canned_content(rng: random.Random) -> str:
+    sections = []
+    for number in range(1, rng.randint(4, 7)):
+        body = '. '.join(_sentence(rng, "vietnamese", rng.randint(10, 20)).capitalize() for _ in range(3))
+        sections.append(f"## Phần {number}\n\n{body}.")
+    return '\n\n'.join(sections)
+
+
+class FakeModels:
+    """Stand-in for client.models: generate_content and generate_content_stream."""
+
+    TRANSCRIBE_PATTERN = re.compile(r'transcribe the (\w+) audio', re.IGNORECASE)
+    PARAGRAPH_PATTERN = re.compile(r'^PARAGRAPH (\d+)$', re.MULTILINE)
+
+    def __init__(self, backend: FakeGemini, responder: Optional[Responder] = None):
+        self.backend = backend
+        self.responder = responder
+
+    def respond(self, contents) -> FakeResponse:
+        """
+        Build the response for a request: the responder's answer if it gives one, otherwise the
+        canned response for the kind of prompt the request carries.
+        """
+        parts = list(contents) if isinstance(contents, (list, tuple)) else [contents]
+        texts = [part for part in parts if isinstance(part, str)]
+        files = [part for part in parts if not isinstance(part, str)]
+        prompt = '\n'.join(texts)
+        rng = _prompt_random(parts)
+        prompt_tokens = len(prompt) // 4 + 1 + sum(
+            int(getattr(part, "duration_seconds", 0) * AUDIO_TOKENS_PER_SECOND) for part in files
+        )
+
+        answer = self.responder(contents) if self.responder is not None else None
+        if answer is not None:
+            self.backend.count("scripted")
+            if isinstance(answer, str):
+                return FakeResponse(answer, prompt_tokens)
+            return FakeResponse(''.join(answer), prompt_tokens, chunks=list(answer))
+
+        if files:
+            self.backend.count("transcriptions")
+            match = self.TRANSCRIBE_PATTERN.search(prompt)
+            language = match.group(1).lower() if match else "vietnamese"
+            duration = sum(getattr(part, "duration_seconds", 0) for part in files)
+            text = canned_transcription(rng, duration, language)
+        elif "Please translate the following transcript:" in prompt:
+            self.backend.count("translations")
+            text = canned_translation(rng, prompt.split("Please translate the following transcript:", 1)[1])
+        elif "JSON array" in prompt:
+            self.backend.count("idea_batches")
+            indexes = [int(index) for index in self.PARAGRAPH_PATTERN.findall(prompt)]
+            text = json.dumps([{"index": index, **canned_idea(rng)} for index in indexes], ensure_ascii=False)
+        elif "JSON" in prompt:
+            self.backend.count("ideas")
+            text = json.dumps(canned_idea(rng), ensure_ascii=False)
+        else:
+            self.backend.count("contents")
+            text = canned_content(rng)
+        return FakeResponse(text, prompt_tokens)
+
+    def generate_content(self, model: str, contents, config=None) -> FakeResponse:
+        self.backend.count("generate_content")
+        time.sleep(self.backend.sample_latency(self.backend.latency))
+        self.backend.maybe_fail()
+        return self.respond(contents)
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator[FakeResponse]:
+        self.backend.count("generate_content_stream")
+        time.sleep(self.backend.sample_latency(self.backend.latency))
+        self.backend.maybe_fail()
+        response = self.respond(contents)
+        chunk_size = 80
+        texts = response.chunks if response.chunks is not None else [
+            response.text[offset:offset + chunk_size] for offset in range(0, len(response.text), chunk_size)
+        ]
+        for index, text in enumerate(texts):
+            if index:
+                time.sleep(self.backend.sample_latency(self.backend.chunk_latency))
+            chunk = FakeResponse(text, 0)
+            # Like the API, the last chunk reports the usage of the whole response
+            chunk.usage_metadata = response.usage_metadata if index == len(texts) - 1 else None
+            self.backend.count("stream_chunks")
+            yield chunk
+
+
+class FakeFiles:
+    """Stand-in for client.files: upload, get, list and delete."""
+
+    def __init__(self, backend: FakeGemini):
+        self.backend = backend
+        self._files: Dict[str, FakeFile] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def upload(self, file, config=None) -> FakeFile:
+        self.backend.count("uploads")
+        time.sleep(self.backend.sample_latency(self.backend.upload_latency))
+        self.backend.maybe_fail()
+        size_bytes = os.path.getsize(file)
+        display_name = (config.get("display_name") if isinstance(config, dict)
+                        else getattr(config, "display_name", None)) or os.path.basename(file)
+        with self._lock:
+            name = f"files/fake-{next(self._ids)}"
+            uploaded = FakeFile(name, display_name, size_bytes, size_bytes * 8 / self.backend.audio_bitrate)
+            self._files[name] = uploaded
+        return uploaded
+
+    def get(self, name: str) -> FakeFile:
+        with self._lock:
+            if name not in self._files:
+                raise errors.ClientError(404, {"error": {"code": 404, "message": f"File {name} not found", "status": "NOT_FOUND"}})
+            return self._files[name]
+
+    def list(self) -> List[FakeFile]:
+        with self._lock:
+            return list(self._files.values())
+
+    def delete(self, name: str) -> None:
+        self.backend.count("deletes")
+        with self._lock:
+            if self._files.pop(name, None) is None:
+                raise errors.ClientError(404, {"error": {"code": 404, "message": f"File {name} not found", "status": "NOT_FOUND"}})
+
+
+class FakeGeminiClient:
+    """
+    In-process stand-in for google.genai.Client, for offline tests, load tests and benchmarks.
+
+    Covers the calls the backend makes: files.upload/get/list/delete, models.generate_content
+    and models.generate_content_stream. Responses are canned but shaped like the real ones:
+    transcriptions in the <remove>…</remove><time>…</time> format sized to the uploaded audio,
+    translations that keep the timestamps, idea JSON objects and arrays, and content text.
+    Latency, error rates and the random seed are configurable (see FakeGemini), so benchmark
+    runs are reproducible. Enabled for the whole app with GEMINI_BACKEND=fake.
+
+    Tests can script it further: backend.fail_next queues errors for the next calls, and a
+    responder replaces the canned answers.
+    """
+
+    def __init__(self, backend: Optional[FakeGemini] = None, responder: Optional[Responder] = None, **settings):
+        """
+        Args:
+            backend: Shared settings and counters. If None, one is created from settings and the
+                     FAKE_GEMINI_* environment variables.
+            responder: Called with the contents of every model call; returns the answer text, a
+                       list of stream chunks, or None to use the canned answer
+            settings: Keyword arguments of FakeGemini
+        """
+        self.backend = backend or FakeGemini(**settings)
+        self.models = FakeModels(self.backend, responder)
+        self.files = FakeFiles(self.backend)
+
+    def close(self) -> None:
+        pass
+
+
+class GenerativeModel:
+    """
+    Stand-in for the legacy google.generativeai GenerativeModel, backed by a FakeGeminiClient.
+    """
+
+    def __init__(self, model_name: str, client: Optional[FakeGeminiClient] = None):
+        self.model_name = model_name
+        self.client = client or FakeGeminiClient()
+
+    def generate_content(self, contents, stream: bool = False):
+        if stream:
+            return self.client.models.generate_content_stream(model=self.model_name, contents=contents)
+        return self.client.models.generate_content(model=self.model_name, contents=contents)
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+from fake_gemini import FakeGeminiClient
+from gemini_files import GeminiFileManager
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClients:
+    """
+    Application-scoped registry of Gemini clients.
+
+    One google.genai Client is shared by every endpoint and by the transcriber, so requests
+    reuse pooled keep-alive HTTPS connections instead of paying for a new client and TLS
+    handshake each time. The pool size and keep-alive are configurable. Uploaded files are
+    tracked by a shared GeminiFileManager, so identical audio is uploaded once and every
+    upload is eventually deleted.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None, keepalive_expiry: Optional[float] = None,
+                 timeout_ms: Optional[int] = None, base_url: Optional[str] = None, backend: Optional[str] = None):
+        """
+        Create the shared client.
+
+        Args:
+            api_key: Google API key. If None, will use GOOGLE_API_KEY from environment.
+            max_connections: Maximum open connections. If None, will use GEMINI_MAX_CONNECTIONS
+                             from environment (default 32).
+            max_keepalive_connections: Idle connections kept open for reuse. If None, will use
+                                       GEMINI_MAX_KEEPALIVE_CONNECTIONS from environment (default 16).
+            keepalive_expiry: Seconds an idle connection is kept. If None, will use
+                              GEMINI_KEEPALIVE_EXPIRY from environment (default 120).
+            timeout_ms: Request timeout in milliseconds. If None, will use GEMINI_TIMEOUT_MS from
+                        environment; no timeout when unset.
+            base_url: API endpoint override, e.g. a proxy. If None, will use GEMINI_BASE_URL from
+                      environment; the public endpoint when unset.
+            backend: 'genai' for the Gemini API or 'fake' for the offline FakeGeminiClient, which needs
+                     no API key. If None, will use GEMINI_BACKEND from environment (default 'genai').
+        """
+        self.backend = (backend or os.getenv("GEMINI_BACKEND", "genai")).lower()
+        if self.backend not in ("genai", "fake"):
+            raise ValueError(f"Unsupported GEMINI_BACKEND: {self.backend}. Supported: genai, fake")
+
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not self.api_key and self.backend != "fake":
+            raise ValueError("Google API key is required. Set GOOGLE_API_KEY environment variable or pass api_key parameter.")
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("GEMINI_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "16")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "120"))
+        )
+        timeout_ms = timeout_ms or int(os.getenv("GEMINI_TIMEOUT_MS", "0")) or None
+
+        if self.backend == "fake":
+            logger.info("Using the fake Gemini backend (GEMINI_BACKEND=fake)")
+            self.client = FakeGeminiClient()
+            self.files = GeminiFileManager(self.client)
+            return
+
+        self.client = genai.Client(
+            api_key=self.api_key,
+            http_options=types.HttpOptions(
+                base_url=base_url or os.getenv("GEMINI_BASE_URL") or None,
+                timeout=timeout_ms,
+                client_args={"limits": self.limits},
+                async_client_args={"limits": self.limits}
+            )
+        )
+        self.files = GeminiFileManager(self.client)
+
+    def close(self) -> None:
+        """
+        Delete idle uploaded files and close the pooled connections.
+        """
+        self.files.close()
+        self.client.close()
+
+
+_clients: Optional[GeminiClients] = None
+_clients_lock = threading.Lock()
+
+
+def get_gemini_clients() -> GeminiClients:
+    """
+    Return the process-wide Gemini client registry, creating it on first use.
+
+    The FastAPI app creates it at startup; scripts and tests get it lazily.
+    """
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = GeminiClients()
+        return _clients
+
+
+def close_gemini_clients() -> None:
+    """
+    Close and forget the process-wide registry (called at application shutdown).
+    """
+    global _clients
+    with _clients_lock:
+        clients, _clients = _clients, None
+    if clients is not None:
+        clients.close()
@@ -0,0 +1,282 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from gemini_scheduler import GeminiScheduler, get_gemini_scheduler
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Gemini keeps uploaded files for 48 hours; handles this close to expiry are not reused
+REUSE_MARGIN_SECONDS = 10 * 60
+DEFAULT_FILE_LIFETIME_SECONDS = 48 * 60 * 60
+
+
+class GeminiFileManager:
+    """
+    Lifecycle manager for files uploaded to the Gemini Files API.
+
+    Uploads are keyed by a hash of their content. A handle that is still valid is reused
+    instead of uploading the same bytes again, and handles are reference counted while in use.
+    A background thread deletes remote files once they have been idle for retention_seconds
+    or have expired. Every upload is tagged with display_name_prefix, so files left behind by
+    a crashed process can be found and deleted by sweep_orphans.
+    """
+
+    def __init__(self, client, retention_seconds: Optional[float] = None, display_name_prefix: Optional[str] = None,
+                 orphan_age_seconds: Optional[float] = None, scheduler: Optional[GeminiScheduler] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            client: google.genai Client used for upload, list and delete calls
+            retention_seconds: How long an unused file is kept for reuse before it is deleted. If None,
+                               will use GEMINI_FILE_RETENTION_SECONDS from environment (default 600).
+            display_name_prefix: Prefix of the display name given to every upload. If None, will use
+                                 GEMINI_FILE_PREFIX from environment (default 'idealthon-').
+            orphan_age_seconds: Minimum age of an untracked file before sweep_orphans deletes it, so
+                                files in use by other processes are left alone. If None, will use
+                                GEMINI_ORPHAN_AGE_SECONDS from environment (default 3600).
+            scheduler: Rate limits and retries uploads. If None, will use the process-wide scheduler.
+        """
+        self.client = client
+        self.scheduler = scheduler or get_gemini_scheduler()
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(
+            os.getenv("GEMINI_FILE_RETENTION_SECONDS", "600")
+        )
+        self.display_name_prefix = display_name_prefix or os.getenv("GEMINI_FILE_PREFIX", "idealthon-")
+        self.orphan_age_seconds = orphan_age_seconds if orphan_age_seconds is not None else float(
+            os.getenv("GEMINI_ORPHAN_AGE_SECONDS", "3600")
+        )
+
+        self.uploads = 0
+        self.reuses = 0
+        self.deletions = 0
+        self.delete_errors = 0
+
+        # content hash -> {"file", "refs", "last_used", "expires_at", "ready"}
+        self._entries: Dict[str, Dict] = {}
+        self._hash_by_name: Dict[str, str] = {}
+        # Handles that can no longer be reused but are still in use, by file name
+        self._draining: Dict[str, Dict] = {}
+        # Files waiting to be deleted by the collector
+        self._retired = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._collector = None
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """
+        Return the hex SHA-256 digest of a file, read in 1 MB blocks.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _expiry_timestamp(uploaded_file) -> float:
+        expiration_time = getattr(uploaded_file, "expiration_time", None)
+        if expiration_time is not None and hasattr(expiration_time, "timestamp"):
+            return expiration_time.timestamp()
+        return time.time() + DEFAULT_FILE_LIFETIME_SECONDS
+
+    def acquire(self, file_path: str, content_hash: Optional[str] = None):
+        """
+        Return a handle for the file's content, uploading it only if no valid handle exists.
+
+        Concurrent calls for the same content share a single upload. Every handle returned must be
+        passed to release once the caller no longer needs it.
+
+        Args:
+            file_path: Local file to upload
+            content_hash: Hex digest of the file content; computed when None
+
+        Returns:
+            Uploaded file handle
+        """
+        content_hash = content_hash or self.hash_file(file_path)
+
+        with self._condition:
+            while True:
+                entry = self._entries.get(content_hash)
+                if entry is None:
+                    break
+                if not entry["ready"]:
+                    # Another thread is uploading the same content
+                    self._condition.wait()
+                    continue
+                if entry["expires_at"] - time.time() > REUSE_MARGIN_SECONDS:
+                    entry["refs"] += 1
+                    self.reuses += 1
+                    return entry["file"]
+                # Too close to expiry to reuse; the collector deletes it once it is idle
+                self._forget(content_hash)
+                break
+
+            entry = {"file": None, "refs": 1, "last_used": time.time(), "expires_at": 0.0, "ready": False}
+            self._entries[content_hash] = entry
+            self._start_collector()
+
+        try:
+            uploaded_file = self.scheduler.upload_file(
+                self.client,
+                file_path,
+                config={"display_name": f"{self.display_name_prefix}{content_hash[:32]}"}
+            )
+        except BaseException:
+            with self._condition:
+                del self._entries[content_hash]
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            entry.update(file=uploaded_file, expires_at=self._expiry_timestamp(uploaded_file), ready=True)
+            self._hash_by_name[uploaded_file.name] = content_hash
+            self.uploads += 1
+            self._condition.notify_all()
+        return uploaded_file
+
+    def release(self, uploaded_file) -> None:
+        """
+        Mark one use of a handle from acquire as finished. The file is kept for reuse for
+        retention_seconds and then deleted in the background.
+        """
+        with self._condition:
+            content_hash = self._hash_by_name.get(uploaded_file.name)
+            if content_hash is not None:
+                entry = self._entries[content_hash]
+                entry["refs"] = max(0, entry["refs"] - 1)
+                entry["last_used"] = time.time()
+            elif uploaded_file.name in self._draining:
+                # No longer reusable; delete it once the last user is done
+                entry = self._draining[uploaded_file.name]
+                entry["refs"] -= 1
+                if entry["refs"] <= 0:
+                    del self._draining[uploaded_file.name]
+                    self._retired.append(entry["file"])
+            self._condition.notify_all()
+
+    def _forget(self, content_hash: str) -> None:
+        entry = self._entries.pop(content_hash)
+        self._hash_by_name.pop(entry["file"].name, None)
+        if entry["refs"] > 0:
+            self._draining[entry["file"].name] = entry
+        else:
+            self._retired.append(entry["file"])
+
+    def _take_expired(self, now: float, everything: bool = False) -> list:
+        expired = []
+        for content_hash, entry in list(self._entries.items()):
+            if not entry["ready"] or entry["refs"] > 0:
+                continue
+            if everything or entry["last_used"] + self.retention_seconds <= now or entry["expires_at"] <= now:
+                del self._entries[content_hash]
+                self._hash_by_name.pop(entry["file"].name, None)
+                expired.append(entry["file"])
+        expired.extend(self._retired)
+        self._retired.clear()
+        return expired
+
+    def _delete(self, uploaded_file) -> None:
+        try:
+            self.client.files.delete(name=uploaded_file.name)
+            with self._condition:
+                self.deletions += 1
+        except Exception as e:
+            with self._condition:
+                self.delete_errors += 1
+            logger.warning("Failed to delete Gemini file %s: %s", uploaded_file.name, e)
+
+    def collect(self) -> int:
+        """
+        Delete every idle file past its retention or expiry time.
+
+        Returns:
+            Number of files deleted
+        """
+        with self._condition:
+            expired = self._take_expired(time.time())
+        for uploaded_file in expired:
+            self._delete(uploaded_file)
+        return len(expired)
+
+    def _start_collector(self) -> None:
+        if self._collector is None and not self._closed:
+            self._collector = threading.Thread(target=self._run_collector, name="gemini-file-collector", daemon=True)
+            self._collector.start()
+
+    def _run_collector(self) -> None:
+        interval = max(0.05, min(60.0, self.retention_seconds / 2))
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                self._condition.wait(timeout=interval)
+                if self._closed:
+                    return
+            self.collect()
+
+    def sweep_orphans(self) -> int:
+        """
+        Delete untracked files with this manager's display name prefix, e.g. left behind by a
+        process that crashed before cleaning up. Intended to run once at startup.
+
+        Returns:
+            Number of files deleted
+        """
+        deleted = 0
+        try:
+            cutoff = time.time() - self.orphan_age_seconds
+            for remote_file in self.client.files.list():
+                display_name = getattr(remote_file, "display_name", None) or ""
+                if not display_name.startswith(self.display_name_prefix):
+                    continue
+                with self._condition:
+                    if remote_file.name in self._hash_by_name or remote_file.name in self._draining:
+                        continue
+                create_time = getattr(remote_file, "create_time", None)
+                if create_time is not None and hasattr(create_time, "timestamp") and create_time.timestamp() > cutoff:
+                    continue
+                self._delete(remote_file)
+                deleted += 1
+        except Exception as e:
+            logger.warning("Gemini orphan file sweep failed: %s", e)
+        if deleted:
+            logger.info("Deleted %d orphaned Gemini file(s)", deleted)
+        return deleted
+
+    def close(self) -> None:
+        """
+        Stop the background collector and delete every file that is not in use.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            expired = self._take_expired(time.time(), everything=True)
+        if self._collector is not None:
+            self._collector.join()
+        for uploaded_file in expired:
+            self._delete(uploaded_file)
+
+    def stats(self) -> Dict:
+        """
+        Return upload/reuse/delete counters and the number of tracked files.
+        """
+        with self._condition:
+            return {
+                "uploads": self.uploads,
+                "reuses": self.reuses,
+                "deletions": self.deletions,
+                "delete_errors": self.delete_errors,
+                "tracked_files": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry["refs"] > 0)
+            }
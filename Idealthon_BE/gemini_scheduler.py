@@ -0,0 +1,458 @@
+import email.utils
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import httpx
+from dotenv import load_dotenv
+from google.genai import errors
+
+from metrics import GEMINI_REQUESTS, GEMINI_THROTTLED_SECONDS, GEMINI_TOKENS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Transient failures worth retrying: rate limiting and server-side errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Audio is billed at 32 tokens per second, so a 10-minute segment is about 19200 tokens
+DEFAULT_FILE_PART_TOKENS = 19200
+CHARACTERS_PER_TOKEN = 4
+
+# Limiter key of Files API uploads, which have their own request quota and use no tokens
+FILES_API = "files"
+
+
+class TokenBucket:
+    """
+    Allows capacity units per period_seconds, refilled continuously. Not thread-safe on its
+    own; ModelLimiter guards its buckets with one lock.
+    """
+
+    def __init__(self, capacity: float, period_seconds: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until amount units are available; a request larger than the bucket waits for a full bucket.
+        """
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class ModelLimiter:
+    """
+    Request and token buckets for one model, matching Gemini's per-model quotas, plus a
+    shared cooldown set when the API answers 429.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, period_seconds: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute, period_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, period_seconds) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until one request and tokens tokens fit in the quota, then take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(0.0, self.paused_until - now)
+                for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        wait = max(wait, bucket.wait_time(amount))
+                if wait <= 0:
+                    if self.requests is not None:
+                        self.requests.level -= 1
+                    if self.tokens is not None:
+                        self.tokens.level -= min(tokens, self.tokens.capacity)
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def settle_tokens(self, reserved: int, used: int) -> None:
+        """
+        Correct the token bucket once the actual usage of a request is known. The level may go
+        negative, which delays the next requests until the overuse is paid back.
+        """
+        if self.tokens is None:
+            return
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            difference = used - min(reserved, self.tokens.capacity)
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level - difference)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every request for this model for seconds, e.g. after a 429 with Retry-After.
+        """
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class GeminiScheduler:
+    """
+    Shared gateway for Gemini model calls.
+
+    Every generate_content call waits for room in per-model token buckets for requests and
+    tokens per minute (file uploads share a request bucket of their own), so a burst of work is spread over the quota instead of tripping it.
+    Rate limiting (429) and transient server errors are retried with jittered exponential
+    backoff; a Retry-After header or RetryInfo delay from the API is honored and pauses
+    every caller of that model, not just the one that was rejected. Identical requests that
+    are already in flight are coalesced, so they cost one call. The client is passed with
+    each call, so one scheduler enforces the quota for the shared client and for
+    transcribers with their own client alike.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 max_retries: Optional[int] = None, backoff_base_seconds: Optional[float] = None,
+                 backoff_max_seconds: Optional[float] = None, file_part_tokens: Optional[int] = None,
+                 period_seconds: float = 60.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Requests allowed per model per minute, 0 for no limit. If None, will use
+                                 GEMINI_RPM from environment (default 4000).
+            tokens_per_minute: Input plus output tokens allowed per model per minute, 0 for no limit. If None,
+                               will use GEMINI_TPM from environment (default 4000000).
+            max_retries: Retries of a failed call before giving up. If None, will use GEMINI_MAX_RETRIES
+                         from environment (default 5).
+            backoff_base_seconds: Delay cap of the first retry, doubled for each further one. If None, will
+                                  use GEMINI_BACKOFF_BASE_SECONDS from environment (default 1).
+            backoff_max_seconds: Largest delay between retries. If None, will use GEMINI_BACKOFF_MAX_SECONDS
+                                 from environment (default 60).
+            file_part_tokens: Tokens assumed for each uploaded file in a request until the response reports
+                              the actual usage. If None, will use GEMINI_FILE_PART_TOKENS from environment
+                              (default 19200, a 10-minute audio segment).
+            period_seconds: Length of the quota window (tests shorten it)
+        """
+        self.requests_per_minute = requests_per_minute if requests_per_minute is not None else int(
+            os.getenv("GEMINI_RPM", "4000")
+        )
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else int(
+            os.getenv("GEMINI_TPM", "4000000")
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+        self.backoff_base_seconds = backoff_base_seconds if backoff_base_seconds is not None else float(
+            os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1")
+        )
+        self.backoff_max_seconds = backoff_max_seconds if backoff_max_seconds is not None else float(
+            os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60")
+        )
+        self.file_part_tokens = file_part_tokens if file_part_tokens is not None else int(
+            os.getenv("GEMINI_FILE_PART_TOKENS", str(DEFAULT_FILE_PART_TOKENS))
+        )
+        self.period_seconds = period_seconds
+
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+        self._limiters: Dict[str, ModelLimiter] = {}
+        # Request key -> Future of the call in flight
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limiter = ModelLimiter(self.requests_per_minute, self.tokens_per_minute, self.period_seconds)
+                self._limiters[model] = limiter
+            return limiter
+
+    def estimate_tokens(self, contents) -> int:
+        """
+        Rough input token count of contents: text by length, uploaded files at file_part_tokens.
+        """
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        tokens = 0
+        for part in parts:
+            if isinstance(part, str):
+                tokens += len(part) // CHARACTERS_PER_TOKEN + 1
+            else:
+                tokens += self.file_part_tokens
+        return tokens
+
+    @staticmethod
+    def request_key(model: str, contents, config=None) -> Optional[str]:
+        """
+        Key identifying identical requests, or None if the contents cannot be compared safely.
+        """
+        digest = hashlib.sha256(model.encode("utf-8"))
+        for part in contents if isinstance(contents, (list, tuple)) else [contents]:
+            if isinstance(part, str):
+                digest.update(b"\0text\0" + part.encode("utf-8"))
+            elif getattr(part, "name", None):
+                # Uploaded files are identified by their remote name
+                digest.update(b"\0file\0" + str(part.name).encode("utf-8"))
+            else:
+                return None
+        if config is not None:
+            digest.update(b"\0config\0" + repr(config).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def retry_after_seconds(error: Exception) -> Optional[float]:
+        """
+        Delay requested by the API for an error: the Retry-After header (seconds or HTTP date)
+        or a google.rpc.RetryInfo retryDelay such as "17s" in the error details.
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+        details = getattr(error, "details", None)
+        if isinstance(details, dict):
+            details = details.get("error", details).get("details", [])
+        for detail in details if isinstance(details, list) else []:
+            if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+                match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+        return None
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, errors.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        # Timeouts, dropped connections and other network failures
+        return isinstance(error, httpx.TransportError)
+
+    def backoff_seconds(self, attempt: int, error: Exception) -> float:
+        """
+        Delay before retry number attempt (from 1): full jitter over an exponentially growing
+        cap, or the API's requested delay plus a little jitter so waiting callers do not all
+        return at once.
+        """
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (attempt - 1)))
+        retry_after = self.retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, min(cap, self.backoff_base_seconds))
+        return random.uniform(0, cap)
+
+    def _start_attempt(self, model: str, estimated_tokens: int) -> ModelLimiter:
+        limiter = self.limiter(model)
+        waited = limiter.acquire(estimated_tokens)
+        with self._lock:
+            self.requests += 1
+            self.throttled_seconds += waited
+        if waited:
+            GEMINI_THROTTLED_SECONDS.inc(waited, model=model)
+        return limiter
+
+    def _record_failure(self, model: str) -> None:
+        with self._lock:
+            self.failures += 1
+        GEMINI_REQUESTS.inc(model=model, outcome="failed")
+
+    def _handle_failure(self, model: str, limiter: ModelLimiter, attempt: int, error: Exception) -> None:
+        """
+        Sleep before the next attempt, or re-raise error if it should not be retried.
+        """
+        if not self.is_retryable(error) or attempt > self.max_retries:
+            self._record_failure(model)
+            raise error
+        delay = self.backoff_seconds(attempt, error)
+        rate_limited = isinstance(error, errors.APIError) and error.code == 429
+        if rate_limited:
+            # The quota is shared, so everyone waits instead of adding to the rejections
+            limiter.pause(delay)
+        with self._lock:
+            self.retries += 1
+            self.rate_limited += 1 if rate_limited else 0
+        GEMINI_REQUESTS.inc(model=model, outcome="retried")
+        logger.warning("Gemini call failed (%.200s), retry %d/%d in %.1fs", error, attempt, self.max_retries, delay)
+        time.sleep(delay)
+
+    def _record_success(self, model: str, limiter: ModelLimiter, estimated_tokens: int, response) -> None:
+        GEMINI_REQUESTS.inc(model=model, outcome="success")
+        usage = getattr(response, "usage_metadata", None)
+        total_tokens = getattr(usage, "total_token_count", None)
+        if isinstance(total_tokens, int):
+            limiter.settle_tokens(estimated_tokens, total_tokens)
+            for kind, attribute in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+                count = getattr(usage, attribute, None)
+                if isinstance(count, int):
+                    GEMINI_TOKENS.inc(count, model=model, kind=kind)
+
+    def _call_with_retries(self, model: str, estimated_tokens: int, request: Callable[[], Any]):
+        attempt = 0
+        while True:
+            limiter = self._start_attempt(model, estimated_tokens)
+            try:
+                response = request()
+            except Exception as e:
+                attempt += 1
+                self._handle_failure(model, limiter, attempt, e)
+                continue
+            self._record_success(model, limiter, estimated_tokens, response)
+            return response
+
+    def _call(self, client, model: str, contents, config=None):
+        kwargs = {"config": config} if config is not None else {}
+        return self._call_with_retries(
+            model,
+            self.estimate_tokens(contents),
+            lambda: client.models.generate_content(model=model, contents=contents, **kwargs)
+        )
+
+    def upload_file(self, client, file: str, config=None):
+        """
+        Call client.files.upload within the Files API request quota, retrying transient failures
+        like generate_content. Uploads are never coalesced; GeminiFileManager already shares
+        uploads of identical content.
+
+        Args:
+            client: google.genai Client (or anything with the same files API)
+            file: Path of the local file to upload
+            config: Optional UploadFileConfig, e.g. with a display name
+
+        Returns:
+            The uploaded file handle
+
+        Raises:
+            The last error if the upload fails with a non-retryable error or runs out of retries
+        """
+        kwargs = {"config": config} if config is not None else {}
+        return self._call_with_retries(FILES_API, 0, lambda: client.files.upload(file=file, **kwargs))
+
+    def generate_content(self, client, model: str, contents, config=None):
+        """
+        Call client.models.generate_content within the rate limits, retrying transient failures.
+
+        Args:
+            client: google.genai Client (or anything with the same models API)
+            model: Model name
+            contents: Prompt text, or a list of text and uploaded files
+            config: Optional GenerateContentConfig
+
+        Returns:
+            The model response; concurrent identical requests share one response
+
+        Raises:
+            The last error if the call fails with a non-retryable error or runs out of retries
+        """
+        key = self.request_key(model, contents, config)
+        if key is None:
+            return self._call(client, model, contents, config)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            GEMINI_REQUESTS.inc(model=model, outcome="coalesced")
+            return future.result()
+
+        try:
+            response = self._call(client, model, contents, config)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def generate_content_stream(self, client, model: str, contents, config=None) -> Iterator[Any]:
+        """
+        Stream client.models.generate_content_stream within the rate limits.
+
+        Failures before the first chunk are retried like generate_content; once chunks have been
+        yielded an error is raised to the caller, since the output cannot be taken back. Streams
+        are never coalesced.
+
+        Yields:
+            Response chunks
+        """
+        estimated_tokens = self.estimate_tokens(contents)
+        kwargs = {"config": config} if config is not None else {}
+        attempt = 0
+        while True:
+            limiter = self._start_attempt(model, estimated_tokens)
+            started = False
+            last_chunk = None
+            try:
+                for chunk in client.models.generate_content_stream(model=model, contents=contents, **kwargs):
+                    started = True
+                    last_chunk = chunk
+                    yield chunk
+            except Exception as e:
+                if started:
+                    self._record_failure(model)
+                    raise
+                attempt += 1
+                self._handle_failure(model, limiter, attempt, e)
+                continue
+            # The final chunk carries the usage of the whole response
+            self._record_success(model, limiter, estimated_tokens, last_chunk)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters since the scheduler was created.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "in_flight": len(self._in_flight)
+            }
+
+
+_scheduler: Optional[GeminiScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_gemini_scheduler() -> GeminiScheduler:
+    """
+    Return the process-wide scheduler, creating it on first use.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GeminiScheduler()
+        return _scheduler
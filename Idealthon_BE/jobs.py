@@ -0,0 +1,416 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app_logging import request_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Next to the backend code rather than the working directory, like the transcription cache
+DEFAULT_JOB_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".transcription_jobs", "jobs.sqlite3")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+# transcribe(file_path, language, on_segment) -> (original_transcription, vietnamese_transcription)
+TranscribeFunction = Callable[[str, str, Callable[[int, int, str, str], None]], Tuple[str, str]]
+
+
+class TranscriptionJobQueue:
+    """
+    Persistent queue of transcription jobs served by a bounded pool of worker threads.
+
+    Jobs and the transcript of every finished segment are stored in SQLite, so clients can
+    poll a job's progress and partial results while later segments are still being
+    transcribed. The uploaded file of a job is deleted once it finishes.
+
+    Several processes may share one database: jobs are claimed atomically, and every
+    process refreshes a heartbeat on the jobs it runs. A running job whose heartbeat is
+    older than stale_seconds (its process stopped or crashed) is queued again.
+    """
+
+    def __init__(self, transcribe: TranscribeFunction, db_path: Optional[str] = None,
+                 workers: Optional[int] = None, retention_seconds: Optional[float] = None,
+                 heartbeat_seconds: Optional[float] = None):
+        """
+        Initialize the queue, creating the database if needed. Workers start with start().
+
+        Args:
+            transcribe: Function running one transcription; called as transcribe(file_path,
+                        language, on_segment) on a worker thread
+            db_path: SQLite database path. If None, will use TRANSCRIPTION_JOB_DB from
+                     environment (default .transcription_jobs/jobs.sqlite3 in
+                     the backend directory).
+            workers: Number of jobs transcribed at the same time. If None, will use
+                     TRANSCRIPTION_JOB_WORKERS from environment (default 2).
+            retention_seconds: How long finished jobs are kept before they are purged. If None,
+                               will use TRANSCRIPTION_JOB_RETENTION_SECONDS from environment
+                               (default 86400).
+            heartbeat_seconds: How often running jobs are marked alive and stale jobs are
+                               looked for. Jobs are stale after three missed heartbeats. If
+                               None, will use TRANSCRIPTION_JOB_HEARTBEAT_SECONDS from
+                               environment (default 10).
+        """
+        self.transcribe = transcribe
+        self.db_path = db_path or os.getenv("TRANSCRIPTION_JOB_DB") or DEFAULT_JOB_DB
+        self.workers = workers or int(os.getenv("TRANSCRIPTION_JOB_WORKERS", "2"))
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(
+            os.getenv("TRANSCRIPTION_JOB_RETENTION_SECONDS", "86400")
+        )
+        self.heartbeat_seconds = heartbeat_seconds or float(os.getenv("TRANSCRIPTION_JOB_HEARTBEAT_SECONDS", "10"))
+        self.stale_seconds = 3 * self.heartbeat_seconds
+        # Identifies this queue's claims among the processes sharing the database
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # One connection shared by the workers and the API; access is serialized by _condition
+        self._condition = threading.Condition()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                language TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                segments_total INTEGER,
+                segments_done INTEGER NOT NULL DEFAULT 0,
+                original_transcription TEXT,
+                vietnamese_transcription TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat_at REAL
+            )"""
+        )
+        # Databases created before claims were owned lack these columns
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS job_segments (
+                job_id TEXT NOT NULL,
+                segment_index INTEGER NOT NULL,
+                original_transcription TEXT NOT NULL,
+                vietnamese_transcription TEXT NOT NULL,
+                PRIMARY KEY (job_id, segment_index)
+            )"""
+        )
+        self._db.commit()
+
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        # Separate from _condition so submit() never wakes the heartbeat instead of a worker
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """
+        Requeue stale jobs, purge old finished jobs and start the workers and the heartbeat.
+        """
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            self._stopped.clear()
+        self.requeue_stale()
+        self.purge_finished()
+
+        for worker_index in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, name=f"transcription-job-{worker_index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._run_heartbeat, name="transcription-job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop taking new jobs and wait for the workers to finish their current job.
+
+        Jobs still running after timeout stop getting heartbeats, so they are requeued once stale.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def close(self) -> None:
+        """
+        Stop the workers and close the database.
+        """
+        self.stop()
+        with self._condition:
+            self._db.close()
+
+    def submit(self, file_path: str, filename: str, language: str) -> str:
+        """
+        Queue a transcription job. The queue takes ownership of file_path and deletes it when the job finishes.
+
+        Args:
+            file_path: Path of the saved upload
+            filename: Original filename of the upload
+            language: Input language used to pick the transcription prompt
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        with self._condition:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, filename, language, file_path, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, language, file_path, time.time())
+            )
+            self._db.commit()
+            self._condition.notify()
+        return job_id
+
+    def get(self, job_id: str, include_segments: bool = True, since_segment: int = 0) -> Optional[Dict]:
+        """
+        Return a job's status and progress.
+
+        Args:
+            job_id: Id returned by submit
+            include_segments: Whether to include finished segment transcripts
+            since_segment: Only include segments with an index at or after this one
+
+        Returns:
+            Job dict with id, status, filename, language, segments_total, segments_done, error,
+            timings and, when requested, a "segments" list of {index, original_transcription,
+            vietnamese_transcription} in segment order; None if the job does not exist
+        """
+        with self._condition:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = {
+                "id": row["id"],
+                "status": row["status"],
+                "filename": row["filename"],
+                "language": row["language"],
+                "segments_total": row["segments_total"],
+                "segments_done": row["segments_done"],
+                "error": row["error"],
+                "created_at": row["created_at"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"]
+            }
+            if include_segments:
+                segment_rows = self._db.execute(
+                    """SELECT segment_index, original_transcription, vietnamese_transcription FROM job_segments
+                       WHERE job_id = ? AND segment_index >= ? ORDER BY segment_index""",
+                    (job_id, since_segment)
+                ).fetchall()
+                job["segments"] = [
+                    {
+                        "index": segment_row["segment_index"],
+                        "original_transcription": segment_row["original_transcription"],
+                        "vietnamese_transcription": segment_row["vietnamese_transcription"]
+                    }
+                    for segment_row in segment_rows
+                ]
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Return the full (original_transcription, vietnamese_transcription) of a completed job, or None.
+        """
+        with self._condition:
+            row = self._db.execute(
+                "SELECT original_transcription, vietnamese_transcription FROM jobs WHERE id = ? AND status = ?",
+                (job_id, JOB_COMPLETED)
+            ).fetchone()
+        if row is None:
+            return None
+        return row["original_transcription"], row["vietnamese_transcription"]
+
+    def stats(self) -> Dict:
+        """
+        Return the number of jobs in each status and the worker count.
+        """
+        with self._condition:
+            rows = self._db.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        stats = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED)}
+        stats.update({row["status"]: row["count"] for row in rows})
+        stats["workers"] = self.workers
+        return stats
+
+    def purge_finished(self) -> int:
+        """
+        Delete finished jobs older than retention_seconds.
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = time.time() - self.retention_seconds
+        with self._condition:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED_STATUSES, cutoff)
+            ).fetchall()
+            for row in rows:
+                self._db.execute("DELETE FROM job_segments WHERE job_id = ?", (row["id"],))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+            self._db.commit()
+        return len(rows)
+
+    def requeue_stale(self) -> int:
+        """
+        Queue again the running jobs whose process stopped sending heartbeats, or fail them if
+        their upload is gone.
+
+        Returns:
+            Number of jobs recovered
+        """
+        cutoff = time.time() - self.stale_seconds
+        recovered = 0
+        with self._condition:
+            stale = self._db.execute(
+                "SELECT id, file_path FROM jobs WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (JOB_RUNNING, cutoff)
+            ).fetchall()
+            for row in stale:
+                # Re-checked in the UPDATE, so a job whose heartbeat arrived meanwhile is left alone
+                still_stale = "id = ? AND status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+                if os.path.exists(row["file_path"]):
+                    cursor = self._db.execute(
+                        f"""UPDATE jobs SET status = ?, segments_total = NULL, segments_done = 0, started_at = NULL,
+                            owner = NULL, heartbeat_at = NULL WHERE {still_stale}""",
+                        (JOB_QUEUED, row["id"], JOB_RUNNING, cutoff)
+                    )
+                else:
+                    cursor = self._db.execute(
+                        f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE {still_stale}",
+                        (JOB_FAILED, "Job was interrupted and its upload is no longer available", time.time(),
+                         row["id"], JOB_RUNNING, cutoff)
+                    )
+                if cursor.rowcount:
+                    self._db.execute("DELETE FROM job_segments WHERE job_id = ?", (row["id"],))
+                    recovered += 1
+            self._db.commit()
+        if recovered:
+            logger.info("Recovered %d interrupted transcription job(s)", recovered)
+        return recovered
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        # Called with _condition held. Another process may claim the same job between the
+        # SELECT and the UPDATE; the status check in the UPDATE makes only one of them win.
+        while True:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, now, self.owner, now, row["id"], JOB_QUEUED)
+            )
+            self._db.commit()
+            if cursor.rowcount:
+                return self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+
+    def _run_heartbeat(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                self._db.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                    (time.time(), self.owner, JOB_RUNNING)
+                )
+                self._db.commit()
+            if self._stopped.wait(self.heartbeat_seconds):
+                return
+            # Picks up jobs of processes that died while this one keeps running
+            self.requeue_stale()
+
+    def _run_worker(self) -> None:
+        while True:
+            with self._condition:
+                row = None
+                while not self._stopping:
+                    row = self._claim_next()
+                    if row is not None:
+                        break
+                    # Also wakes up periodically for jobs queued by another process
+                    self._condition.wait(timeout=1.0)
+                if self._stopping:
+                    return
+            # Records logged while the job runs carry its id in place of a request id
+            with request_context(row["id"]):
+                self._run_job(row)
+
+    def _record_segment(self, job_id: str, segment_index: int, segment_count: int,
+                        original_transcription: str, vietnamese_transcription: str) -> None:
+        with self._condition:
+            self._db.execute(
+                """INSERT OR REPLACE INTO job_segments
+                   (job_id, segment_index, original_transcription, vietnamese_transcription) VALUES (?, ?, ?, ?)""",
+                (job_id, segment_index, original_transcription, vietnamese_transcription)
+            )
+            self._db.execute(
+                "UPDATE jobs SET segments_total = ?, segments_done = ? WHERE id = ?",
+                (segment_count, segment_index + 1, job_id)
+            )
+            self._db.commit()
+
+    def _run_job(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        logger.info("Starting transcription job %s (%s, %s)", job_id, row["filename"], row["language"])
+
+        def on_segment(segment_index: int, segment_count: int, original_transcription: str,
+                       vietnamese_transcription: str) -> None:
+            self._record_segment(job_id, segment_index, segment_count, original_transcription, vietnamese_transcription)
+
+        try:
+            try:
+                original_transcription, vietnamese_transcription = self.transcribe(
+                    row["file_path"], row["language"], on_segment
+                )
+            finally:
+                # Deleted before the final status is written, so clients never see a finished
+                # job whose upload is still on disk
+                self._delete_upload(row["file_path"])
+            with self._condition:
+                self._db.execute(
+                    """UPDATE jobs SET status = ?, original_transcription = ?, vietnamese_transcription = ?,
+                       finished_at = ? WHERE id = ? AND owner = ?""",
+                    (JOB_COMPLETED, original_transcription, vietnamese_transcription, time.time(), job_id, self.owner)
+                )
+                self._db.commit()
+            logger.info("Transcription job %s completed", job_id)
+        except Exception as e:
+            logger.error("Transcription job %s failed: %s", job_id, e)
+            with self._condition:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+                    (JOB_FAILED, str(e), time.time(), job_id, self.owner)
+                )
+                self._db.commit()
+
+    def _delete_upload(self, file_path: str) -> None:
+        if os.path.exists(file_path):
+            try:
+                os.unlink(file_path)
+            except Exception as cleanup_error:
+                logger.warning("Could not delete job upload %s: %s", file_path, cleanup_error)
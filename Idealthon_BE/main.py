@@ -1,26 +1,95 @@
+import asyncio
+import contextvars
+import logging
 import time
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import os
 import tempfile
-import re
+import threading
 import json
 from dotenv import load_dotenv
-import google.generativeai as genai
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
+from app_logging import configure_logging, log_payload, new_request_id, request_context
 # Import the audio transcription functionality
 from cut_audio import AudioSegmentTranscriber
+from gemini_clients import close_gemini_clients, get_gemini_clients
+from gemini_scheduler import get_gemini_scheduler
+from jobs import FINISHED_STATUSES, JOB_FAILED, TranscriptionJobQueue
+from metrics import CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, TRANSCRIPTION_JOBS, render_metrics, span
+from response_cache import ResponseCache
+from transcript_grouping import GroupingPolicy, group_segments, parse_grouping_policy
+from transcript_parser import align_original_text, parse_transcript_entries
+from transcription_cache import get_default_transcription_cache
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini AI
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+configure_logging()
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Content Generation API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Gemini client (and HTTP connection pool) is shared by every request for the app's lifetime
+    try:
+        clients = get_gemini_clients()
+        # Delete uploads left behind by earlier runs without delaying startup
+        asyncio.get_running_loop().run_in_executor(None, clients.files.sweep_orphans)
+    except ValueError as e:
+        logger.warning("Gemini client not initialized: %s", e)
+    transcription_jobs = get_transcription_jobs()
+    transcription_jobs.start()
+    yield
+    # Running jobs are not waited for; they are requeued once their heartbeat goes stale
+    transcription_jobs.stop(timeout=0)
+    close_gemini_clients()
+
+
+app = FastAPI(title="Content Generation API", version="1.0.0", lifespan=lifespan)
+
+# Transcription decodes audio and makes blocking Gemini calls, so it runs on a dedicated
+# executor instead of the event loop. The worker count caps concurrent transcriptions;
+# further uploads wait in the executor queue.
+MAX_CONCURRENT_TRANSCRIPTIONS = int(os.getenv("MAX_CONCURRENT_TRANSCRIPTIONS", "2"))
+transcription_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_TRANSCRIPTIONS,
+    thread_name_prefix="transcription"
+)
+
+# Uploads are copied to disk in chunks of UPLOAD_CHUNK_SIZE and rejected above MAX_UPLOAD_BYTES
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Request bodies may exceed MAX_UPLOAD_BYTES by this much for multipart boundaries and form fields
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Maximum number of paragraphs sent to Gemini at the same time by /generate-ideas
+IDEA_GENERATION_CONCURRENCY = int(os.getenv("IDEA_GENERATION_CONCURRENCY", "8"))
+
+# Paragraphs packed into one idea-generation request (1 = one request per paragraph)
+IDEA_BATCH_SIZE = int(os.getenv("IDEA_BATCH_SIZE", "1"))
+
+# Where transcripts are split into paragraphs for /generate-ideas, e.g. "chars:200" or
+# "tokens:80,gap:5,segments:12" (see transcript_grouping.parse_grouping_policy)
+TRANSCRIPT_GROUPING_POLICY = parse_grouping_policy()
+
+GEMINI_MODEL = 'gemini-2.0-flash-lite'
+
+# Bump these when the idea or content prompts change so cached responses are not reused
+IDEA_PROMPT_VERSION = "1"
+CONTENT_PROMPT_VERSION = "1"
+
+# Memoized AI responses, so re-submitted transcripts and ideas skip the model
+idea_cache = ResponseCache("ideas")
+content_cache = ResponseCache("content")
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,6 +101,91 @@ app.add_middleware(
 )
 
 
+def upload_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB."
+    )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects request bodies over the upload limit with 413 before they are parsed.
+
+    Starlette spools multipart uploads to a temporary file before the endpoint runs, so the
+    check in spool_upload_to_disk alone would only apply once the whole body was on disk.
+    The declared Content-Length is checked first, then the body is counted as it arrives.
+    """
+
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Read per request so MAX_UPLOAD_BYTES can be changed at runtime (e.g. in tests)
+        max_upload_bytes = self.max_bytes or MAX_UPLOAD_BYTES
+        max_body_bytes = max_upload_bytes + UPLOAD_FORM_OVERHEAD_BYTES
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > max_body_bytes:
+            too_large = upload_too_large(max_upload_bytes)
+            response = JSONResponse({"detail": too_large.detail}, status_code=too_large.status_code)
+            await response(scope, receive, send)
+            return
+
+        received_bytes = 0
+
+        async def limited_receive():
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > max_body_bytes:
+                    # Raised while FastAPI parses the body, which turns it into the 413 response
+                    raise upload_too_large(max_upload_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Label by route template (e.g. /video-transcript/jobs/{job_id}) so job ids do not create new series
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # Every log record written while handling the request carries its id; clients can pass their own
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    with request_context(request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # Pydantic models for request/response
 class TranscriptItem(BaseModel):
     timestamp: str
@@ -45,6 +199,22 @@ class TranscriptResponse(BaseModel):
     data: List[TranscriptItem]
 
 
+class TranscriptionJobCreated(BaseModel):
+    job_id: str
+    status: str
+
+
+class TranscriptionJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed or failed
+    filename: str
+    language: str
+    segments_total: Optional[int] = None  # Known once the audio has been split
+    segments_done: int = 0
+    error: Optional[str] = None
+    data: List[TranscriptItem] = []  # Items of the segments finished so far
+
+
 class IdeaGenerationRequest(BaseModel):
     data: List[TranscriptItem]  # List of transcript items with remove field
 
@@ -175,78 +345,129 @@ def parse_transcription_to_transcript_items(transcription_text: str, original_tr
     Returns:
         List of TranscriptItem objects with both original and Vietnamese text
     """
-    transcript_items = []
+    with span("parsing"):
+        entries = parse_transcript_entries(transcription_text)
 
-    # Create a mapping of timestamps to original text for non-Vietnamese languages
-    original_text_map = {}
-    if original_transcription_text and language != 'vietnamese':
-        original_pattern = r'<remove>(true|false)</remove><time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<remove>|\Z)'
-        original_matches = re.findall(original_pattern, original_transcription_text, re.DOTALL)
+        # Pair each segment with the original text it overlaps most, for non-Vietnamese languages
+        original_texts = [""] * len(entries)
+        if original_transcription_text and language != 'vietnamese':
+            original_texts, alignment_stats = align_original_text(entries, parse_transcript_entries(original_transcription_text))
+            if alignment_stats["shifted"] or alignment_stats["unmatched"]:
+                logger.info("Transcript alignment drift", extra=alignment_stats)
+
+    return [
+        TranscriptItem(
+            timestamp=timestamp_key,
+            transcript=vietnamese_text,
+            original_transcript=original_text,
+            language=language,
+            remove=should_remove
+        )
+        for (timestamp_key, should_remove, vietnamese_text), original_text in zip(entries, original_texts)
+    ]
 
-        for _, start_time, end_time, text in original_matches:
-            timestamp_key = f"{start_time}-{end_time}"
-            cleaned_original_text = ' '.join(text.strip().split())
-            original_text_map[timestamp_key] = cleaned_original_text
 
-    # Pattern to match <remove>true/false</remove><time>start - end</time> followed by text
-    pattern = r'<remove>(true|false)</remove><time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<remove>|\Z)'
+async def spool_upload_to_disk(file: UploadFile, suffix: str = "", max_bytes: int = None, chunk_size: int = None) -> str:
+    """
+    Copy an uploaded file to a temporary file in fixed-size chunks.
 
-    matches = re.findall(pattern, transcription_text, re.DOTALL)
+    Only one chunk is held in memory at a time, and disk writes run off the event loop.
+    Bodies over the limit are already rejected by RequestSizeLimitMiddleware while Starlette
+    parses the form; this check enforces the exact limit on the file itself.
 
-    for remove_flag, start_time, end_time, text in matches:
-        # Clean up the Vietnamese text (remove extra whitespace and newlines)
-        cleaned_vietnamese_text = ' '.join(text.strip().split())
+    Args:
+        file: Uploaded file
+        suffix: Suffix for the temporary file (keeps the extension for ffmpeg)
+        max_bytes: Maximum accepted size. Defaults to MAX_UPLOAD_BYTES.
+        chunk_size: Bytes read per chunk. Defaults to UPLOAD_CHUNK_SIZE.
 
-        if cleaned_vietnamese_text:  # Only add non-empty transcriptions
-            # Convert string "true"/"false" to boolean
-            should_remove = remove_flag.lower() == "true"
+    Returns:
+        Path of the temporary file; the caller is responsible for deleting it
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    too_large = upload_too_large(max_bytes)
 
-            # Get corresponding original text
-            timestamp_key = f"{start_time}-{end_time}"
-            original_text = original_text_map.get(timestamp_key, "") if language != 'vietnamese' else ""
+    # Reject early when the size is already known
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
 
-            transcript_items.append(TranscriptItem(
-                timestamp=timestamp_key,
-                transcript=cleaned_vietnamese_text,
-                original_transcript=original_text,
-                language=language,
-                remove=should_remove
-            ))
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with span("upload_spool"), temp_file:
+            total_bytes = 0
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                total_bytes += len(chunk)
+                if total_bytes > max_bytes:
+                    raise too_large
+                await asyncio.to_thread(temp_file.write, chunk)
+    except BaseException:
+        os.unlink(temp_file.name)
+        raise
+
+    return temp_file.name
+
+
+def run_transcription(audio_file_path: str, language: str, on_segment=None) -> tuple[str, str]:
+    """
+    Transcribe an audio file synchronously. Intended to run on transcription_executor.
+
+    Args:
+        audio_file_path: Path to the saved upload
+        language: Input language used to pick the transcription prompt
+        on_segment: Optional per-segment progress callback passed to transcribe_file
+
+    Returns:
+        Tuple of (original_transcription, vietnamese_transcription)
+    """
+    transcriber = AudioSegmentTranscriber()
+    return transcriber.transcribe_file(audio_file_path, language, on_segment=on_segment)
 
-    # Fallback: try old format without <remove> tags for backward compatibility
-    if not transcript_items:
-        # Create original text mapping for old format
-        original_text_map_old = {}
-        if original_transcription_text and language != 'vietnamese':
-            old_original_pattern = r'<time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<time>|\Z)'
-            old_original_matches = re.findall(old_original_pattern, original_transcription_text, re.DOTALL)
 
-            for start_time, end_time, text in old_original_matches:
-                timestamp_key = f"{start_time}-{end_time}"
-                cleaned_original_text = ' '.join(text.strip().split())
-                original_text_map_old[timestamp_key] = cleaned_original_text
+def run_transcription_job(audio_file_path: str, language: str, on_segment) -> tuple[str, str]:
+    """
+    Run a transcription job on transcription_executor and wait for it, so jobs and direct
+    uploads together never exceed MAX_CONCURRENT_TRANSCRIPTIONS.
 
-        # Pattern to match old format: <time>start - end</time> followed by text
-        old_pattern = r'<time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>\s*(.+?)(?=<time>|\Z)'
-        old_matches = re.findall(old_pattern, transcription_text, re.DOTALL)
+    Args:
+        audio_file_path: Path to the job's upload
+        language: Input language used to pick the transcription prompt
+        on_segment: Per-segment progress callback from the job queue
 
-        for start_time, end_time, text in old_matches:
-            # Clean up the Vietnamese text (remove extra whitespace and newlines)
-            cleaned_vietnamese_text = ' '.join(text.strip().split())
+    Returns:
+        Tuple of (original_transcription, vietnamese_transcription)
+    """
+    # The copied context keeps the job id on records logged by the executor thread
+    future = transcription_executor.submit(
+        contextvars.copy_context().run, run_transcription, audio_file_path, language, on_segment
+    )
+    return future.result()
 
-            if cleaned_vietnamese_text:  # Only add non-empty transcriptions
-                timestamp_key = f"{start_time}-{end_time}"
-                original_text = original_text_map_old.get(timestamp_key, "") if language != 'vietnamese' else ""
 
-                transcript_items.append(TranscriptItem(
-                    timestamp=timestamp_key,
-                    transcript=cleaned_vietnamese_text,
-                    original_transcript=original_text,
-                    language=language,
-                    remove=False  # Default to not removing for old format
-                ))
+# Uploads submitted to /video-transcript/jobs are claimed by this queue's worker pool
+# (TRANSCRIPTION_JOB_WORKERS) and transcribed on transcription_executor; their progress is
+# persisted in SQLite
+_transcription_jobs: Optional[TranscriptionJobQueue] = None
+_transcription_jobs_lock = threading.Lock()
+
+
+def get_transcription_jobs() -> TranscriptionJobQueue:
+    """
+    Return the transcription job queue, creating it (and its database) on first use.
+
+    The app creates it at startup, so importing this module does not touch the disk.
+    """
+    global _transcription_jobs
+    with _transcription_jobs_lock:
+        if _transcription_jobs is None:
+            _transcription_jobs = TranscriptionJobQueue(run_transcription_job)
+        return _transcription_jobs
 
-    return transcript_items
+# How often the job events stream checks for new segments
+JOB_EVENTS_POLL_SECONDS = 0.5
 
 
 def detect_language_from_filename(filename: str) -> str:
@@ -264,90 +485,168 @@ def detect_language_from_filename(filename: str) -> str:
         return 'english'     # English input → Vietnamese output (translation)
 
 
-def parse_timestamp_to_seconds(timestamp: str) -> int:
+def group_transcript_segments(transcript_items: List[TranscriptItem], policy: Optional[GroupingPolicy] = None) -> List[Dict]:
     """
-    Convert timestamp string (e.g., "1:30-2:45") to seconds.
+    Group related transcript segments into coherent paragraphs.
 
     Args:
-        timestamp: Timestamp in "mm:ss-mm:ss" format
+        transcript_items: List of transcript items where remove=False
+        policy: Where to split paragraphs. Defaults to TRANSCRIPT_GROUPING_POLICY.
 
     Returns:
-        Start time in seconds
+        List of grouped paragraphs with combined text and timestamp ranges
     """
-    try:
-        if '-' in timestamp:
-            start_time = timestamp.split('-')[0]
-        else:
-            start_time = timestamp
+    with span("grouping"):
+        return group_segments(transcript_items, policy or TRANSCRIPT_GROUPING_POLICY)
 
-        parts = start_time.split(':')
-        if len(parts) == 2:
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        return 0
-    except:
-        return 0
 
+def generate_with_gemini(prompt: str):
+    """
+    Send a prompt to GEMINI_MODEL through the shared scheduler, which rate limits and retries
+    the call and coalesces it with an identical one already in flight. Blocking.
 
-def group_transcript_segments(transcript_items: List[TranscriptItem]) -> List[Dict]:
+    Args:
+        prompt: Prompt text
+
+    Returns:
+        The model response
     """
-    Group related transcript segments into coherent paragraphs.
+    return get_gemini_scheduler().generate_content(get_gemini_clients().client, model=GEMINI_MODEL, contents=prompt)
+
+
+def clean_ai_json_text(response_text: str, opening: str = '{', closing: str = '}') -> str:
+    """
+    Strip chatty prefixes and markdown fences from an AI response and cut out the JSON value.
 
     Args:
-        transcript_items: List of transcript items where remove=False
+        response_text: Raw text returned by the model
+        opening: First character of the expected JSON value ('{' for objects, '[' for arrays)
+        closing: Last character of the expected JSON value
 
     Returns:
-        List of grouped paragraphs with combined text and timestamp ranges
+        Text between the first opening and last closing character, ready for json.loads
+    """
+    # Clean the response text more thoroughly
+    response_text = response_text.strip()
+
+    # Remove common prefixes that AI might add
+    prefixes_to_remove = [
+        'Okay, I\'m ready to analyze',
+        'Here is the analysis',
+        'Here\'s the analysis',
+        'Based on the transcript',
+        'Analysis:',
+        'Here is the JSON',
+        'Here\'s the JSON',
+        '```json',
+        '```'
+    ]
+
+    for prefix in prefixes_to_remove:
+        if response_text.lower().startswith(prefix.lower()):
+            response_text = response_text[len(prefix):].strip()
+
+    # Remove markdown code blocks
+    if response_text.startswith('```json'):
+        response_text = response_text[7:].strip()
+    if response_text.startswith('```'):
+        response_text = response_text[3:].strip()
+    if response_text.endswith('```'):
+        response_text = response_text[:-3].strip()
+
+    # Find the first opening and last closing character to extract just the JSON
+    start_idx = response_text.find(opening)
+    end_idx = response_text.rfind(closing)
+
+    if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
+        response_text = response_text[start_idx:end_idx + 1]
+
+    return response_text
+
+
+def build_idea_from_ai_response(ai_response: Dict, paragraph_data: Dict) -> Dict:
+    """
+    Convert a parsed AI idea object into the IdeaItem dictionary format.
+
+    Args:
+        ai_response: JSON object returned by the model for one paragraph
+        paragraph_data: Grouped paragraph the idea was generated for
+
+    Returns:
+        Dictionary with generated ideas including original language content
     """
-    if not transcript_items:
-        return []
+    supporting_ideas = ai_response.get('supporting_ideas', [])
+    return {
+        'paragraph': ai_response.get('paragraph', paragraph_data['paragraph']),
+        'original_paragraph': ai_response.get('original_paragraph', paragraph_data.get('original_paragraph', '')),
+        'language': ai_response.get('language', paragraph_data.get('language', 'vietnamese')),
+        'timestamp': ai_response.get('timestamp', paragraph_data['timestamp']),
+        'main_idea': ai_response.get('main_idea', 'Content Idea'),
+        'sub_idea': ' | '.join(supporting_ideas),  # Keep for backward compatibility
+        'supporting_ideas': supporting_ideas,  # New field for individual sub ideas
+        'format': ai_response.get('content_formats', ['blog'])[0] if ai_response.get('content_formats') else 'blog'
+    }
 
-    grouped_paragraphs = []
-    current_group = []
-    current_text = []
 
-    # Sort by timestamp to ensure proper ordering
-    sorted_items = sorted(transcript_items, key=lambda x: parse_timestamp_to_seconds(x.timestamp))
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace so trivially different inputs share a cache entry.
+    """
+    return ' '.join((text or '').split())
 
-    for i, item in enumerate(sorted_items):
-        current_group.append(item)
-        current_text.append(item.transcript)
 
-        # Group segments together if they're short or if we have enough content
-        should_group = (
-            len(' '.join(current_text)) < 200 and  # Less than 200 characters
-            i < len(sorted_items) - 1  # Not the last item
-        )
+def idea_cache_key(paragraph_data: Dict) -> str:
+    """
+    Build the idea cache key from the normalized paragraph, model name and prompt version.
+    """
+    return ResponseCache.make_key(
+        "idea",
+        GEMINI_MODEL,
+        IDEA_PROMPT_VERSION,
+        normalize_text(paragraph_data['paragraph']),
+        normalize_text(paragraph_data.get('original_paragraph', '')),
+        paragraph_data.get('language', 'vietnamese')
+    )
 
-        if not should_group or i == len(sorted_items) - 1:
-            # Create a paragraph from current group
-            if current_group:
-                start_timestamp = current_group[0].timestamp.split('-')[0] if '-' in current_group[0].timestamp else current_group[0].timestamp
-                end_timestamp = current_group[-1].timestamp.split('-')[1] if '-' in current_group[-1].timestamp else current_group[-1].timestamp
-
-                # Collect original text and determine language
-                current_original_text = []
-                language = "vietnamese"  # Default
-
-                for group_item in current_group:
-                    if hasattr(group_item, 'original_transcript') and group_item.original_transcript:
-                        current_original_text.append(group_item.original_transcript)
-                        if hasattr(group_item, 'language'):
-                            language = group_item.language
-
-                grouped_paragraphs.append({
-                    'paragraph': ' '.join(current_text),
-                    'original_paragraph': ' '.join(current_original_text) if current_original_text else "",
-                    'language': language,
-                    'timestamp': f"{start_timestamp}-{end_timestamp}",
-                    'items': current_group
-                })
 
-            # Reset for next group
-            current_group = []
-            current_text = []
+def content_cache_key(format_type: str, idea_text: str, selected_sub_ideas: List[str] = None) -> str:
+    """
+    Build the content cache key from format, idea, sorted sub ideas, model name and prompt version.
+    """
+    return ResponseCache.make_key(
+        "content",
+        GEMINI_MODEL,
+        CONTENT_PROMPT_VERSION,
+        format_type,
+        normalize_text(idea_text),
+        sorted(normalize_text(idea) for idea in selected_sub_ideas or [])
+    )
+
+
+def get_cached_idea(paragraph_data: Dict) -> Optional[Dict]:
+    """
+    Return the cached idea for a paragraph, with paragraph and timestamp taken from the request.
+    """
+    cached = idea_cache.get(idea_cache_key(paragraph_data))
+    if cached is None:
+        return None
+
+    return {
+        'paragraph': paragraph_data['paragraph'],
+        'original_paragraph': paragraph_data.get('original_paragraph', ''),
+        'language': paragraph_data.get('language', 'vietnamese'),
+        'timestamp': paragraph_data['timestamp'],
+        **cached
+    }
+
 
-    return grouped_paragraphs
+def cache_idea(paragraph_data: Dict, idea: Dict) -> None:
+    """
+    Store the AI-generated fields of an idea. Fallback ideas should not be cached.
+    """
+    idea_cache.set(idea_cache_key(paragraph_data), {
+        field: idea[field] for field in ('main_idea', 'sub_idea', 'supporting_ideas', 'format')
+    })
 
 
 async def generate_ideas_with_ai(paragraph_data: Dict) -> Dict:
@@ -361,6 +660,10 @@ async def generate_ideas_with_ai(paragraph_data: Dict) -> Dict:
         Dictionary with generated ideas including original language content
     """
     try:
+        cached_idea = get_cached_idea(paragraph_data)
+        if cached_idea is not None:
+            return cached_idea
+
         # Create the structured prompt with dual-language support
         original_paragraph = paragraph_data.get('original_paragraph', '')
         language = paragraph_data.get('language', 'vietnamese')
@@ -407,80 +710,118 @@ Return ONLY this JSON structure with all content in Vietnamese:
 
 CRITICAL: Return ONLY the JSON object above. No explanations, no markdown, no additional text."""
 
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash-lite')
-
-        # Generate response
-        response = model.generate_content(prompt)
+        # Generate response through the shared scheduler (the SDK call is blocking, so keep it off the event loop)
+        with span("idea_generation"):
+            response = await asyncio.to_thread(generate_with_gemini, prompt)
 
         # Parse the JSON response
         try:
-            # Clean the response text more thoroughly
-            response_text = response.text.strip()
-
-            # Remove common prefixes that AI might add
-            prefixes_to_remove = [
-                'Okay, I\'m ready to analyze',
-                'Here is the analysis',
-                'Here\'s the analysis',
-                'Based on the transcript',
-                'Analysis:',
-                'Here is the JSON',
-                'Here\'s the JSON',
-                '```json',
-                '```'
-            ]
-
-            for prefix in prefixes_to_remove:
-                if response_text.lower().startswith(prefix.lower()):
-                    response_text = response_text[len(prefix):].strip()
-
-            # Remove markdown code blocks
-            if response_text.startswith('```json'):
-                response_text = response_text[7:].strip()
-            if response_text.startswith('```'):
-                response_text = response_text[3:].strip()
-            if response_text.endswith('```'):
-                response_text = response_text[:-3].strip()
-
-            # Find the first { and last } to extract just the JSON
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}')
-
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                response_text = response_text[start_idx:end_idx + 1]
-
-            print(f"Cleaned AI response for JSON parsing: {response_text[:200]}...")
+            response_text = clean_ai_json_text(response.text, '{', '}')
+            log_payload(logger, "Cleaned AI response for JSON parsing", response_text)
             ai_response = json.loads(response_text)
 
             # Convert to the expected format with dual-language support
-            supporting_ideas = ai_response.get('supporting_ideas', [])
-            return {
-                'paragraph': ai_response.get('paragraph', paragraph_data['paragraph']),
-                'original_paragraph': ai_response.get('original_paragraph', paragraph_data.get('original_paragraph', '')),
-                'language': ai_response.get('language', paragraph_data.get('language', 'vietnamese')),
-                'timestamp': ai_response.get('timestamp', paragraph_data['timestamp']),
-                'main_idea': ai_response.get('main_idea', 'Content Idea'),
-                'sub_idea': ' | '.join(supporting_ideas),  # Keep for backward compatibility
-                'supporting_ideas': supporting_ideas,  # New field for individual sub ideas
-                'format': ai_response.get('content_formats', ['blog'])[0] if ai_response.get('content_formats') else 'blog'
-            }
+            idea = build_idea_from_ai_response(ai_response, paragraph_data)
+            cache_idea(paragraph_data, idea)
+            return idea
 
         except json.JSONDecodeError as e:
             # Fallback if JSON parsing fails
-            print(f"Failed to parse AI response as JSON.")
-            print(f"Original response: {response.text[:500]}...")
-            print(f"Cleaned response: {response_text[:500]}...")
-            print(f"JSON decode error: {str(e)}")
-            print(f"Error position: line {e.lineno}, column {e.colno}")
+            logger.warning("Failed to parse AI response as JSON: %s (line %d, column %d)", e.msg, e.lineno, e.colno)
+            log_payload(logger, "Original AI response", response.text)
+            log_payload(logger, "Cleaned AI response", response_text)
             return create_fallback_idea(paragraph_data)
 
     except Exception as e:
-        print(f"Error generating ideas with AI: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
+        logger.error("Error generating ideas with AI: %s: %s", type(e).__name__, e)
         return create_fallback_idea(paragraph_data)
 
 
+async def generate_ideas_batch_with_ai(batch: List[Dict]) -> List[Dict]:
+    """
+    Generate content ideas for several paragraphs with a single Gemini request.
+
+    The instruction preamble is sent once and the model returns a JSON array keyed by
+    paragraph index. Paragraphs whose entry is missing or malformed are retried
+    individually with generate_ideas_with_ai.
+
+    Args:
+        batch: List of paragraph dictionaries from group_transcript_segments
+
+    Returns:
+        List of idea dictionaries in the same order as batch
+    """
+    # Paragraphs seen before are answered from the cache and left out of the prompt
+    results: List[Optional[Dict]] = [get_cached_idea(paragraph_data) for paragraph_data in batch]
+    pending = [index for index, result in enumerate(results) if result is None]
+
+    try:
+        if pending:
+            paragraph_blocks = []
+            for index in pending:
+                paragraph_data = batch[index]
+                original_paragraph = paragraph_data.get('original_paragraph', '')
+                language = paragraph_data.get('language', 'vietnamese')
+
+                block = f"PARAGRAPH {index}\nTIMESTAMP: {paragraph_data['timestamp']}\n"
+                if original_paragraph and language != 'vietnamese':
+                    block += f"ORIGINAL ({language.upper()}): {original_paragraph}\n"
+                block += f"VIETNAMESE: {paragraph_data['paragraph']}"
+                paragraph_blocks.append(block)
+
+            paragraphs_text = '\n\n'.join(paragraph_blocks)
+            prompt = f"""Analyze each numbered transcript paragraph below and return ONLY a valid JSON array with no additional text or explanations.
+
+{paragraphs_text}
+
+Return ONLY a JSON array with exactly one object per paragraph, all content in Vietnamese:
+[
+  {{
+    "index": {pending[0]},
+    "main_idea": "ý tưởng chính bằng tiếng Việt",
+    "supporting_ideas": ["ý tưởng phụ 1", "ý tưởng phụ 2", "ý tưởng phụ 3"],
+    "content_formats": ["định dạng 1", "định dạng 2"],
+    "target_audience": "đối tượng mục tiêu bằng tiếng Việt",
+    "recommended_channels": ["YouTube", "TikTok"]
+  }}
+]
+
+CRITICAL: "index" must be the PARAGRAPH number. Return ONLY the JSON array above. No explanations, no markdown, no additional text."""
+
+            # Generate response through the shared scheduler (the SDK call is blocking, so keep it off the event loop)
+            with span("idea_generation"):
+                response = await asyncio.to_thread(generate_with_gemini, prompt)
+
+            response_text = clean_ai_json_text(response.text, '[', ']')
+            ai_response = json.loads(response_text)
+
+            if isinstance(ai_response, list):
+                for entry in ai_response:
+                    if not isinstance(entry, dict):
+                        continue
+                    index = entry.get('index')
+                    # bool and float indexes (True, 1.0) compare equal to ints, so require an actual int
+                    if type(index) is int and index in pending and results[index] is None and isinstance(entry.get('main_idea'), str):
+                        results[index] = build_idea_from_ai_response(entry, batch[index])
+                        cache_idea(batch[index], results[index])
+
+    except json.JSONDecodeError as e:
+        logger.warning("Failed to parse batched AI response as JSON: %s", e)
+        log_payload(logger, "Cleaned batched AI response", response_text)
+    except Exception as e:
+        logger.error("Error generating batched ideas with AI: %s: %s", type(e).__name__, e)
+
+    # Retry paragraphs without a usable entry one by one. They run sequentially because the
+    # caller holds a single IDEA_GENERATION_CONCURRENCY slot for the whole batch.
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        logger.info("Retrying %d/%d paragraphs individually", len(missing), len(batch))
+        for index in missing:
+            results[index] = await generate_ideas_with_ai(batch[index])
+
+    return results
+
+
 def create_fallback_idea(paragraph_data: Dict) -> Dict:
     """
     Create a fallback idea when AI generation fails.
@@ -514,11 +855,132 @@ def create_fallback_idea(paragraph_data: Dict) -> Dict:
     }
 
 
+async def generate_idea_item(index: int, total: int, paragraph_data: Dict, semaphore: asyncio.Semaphore) -> IdeaItem:
+    """
+    Generate the idea for one paragraph, waiting for a free slot in the semaphore.
+
+    Args:
+        index: Zero-based paragraph index (for logging)
+        total: Total number of paragraphs (for logging)
+        paragraph_data: Grouped paragraph from group_transcript_segments
+        semaphore: Limits how many paragraphs are generated concurrently
+
+    Returns:
+        IdeaItem from the AI, or the fallback idea if generation failed
+    """
+    async with semaphore:
+        logger.debug("Generating ideas for paragraph %d/%d", index + 1, total)
+
+        try:
+            idea = await generate_ideas_with_ai(paragraph_data)
+            return IdeaItem(**idea)
+
+        except Exception as e:
+            logger.error("Error generating idea for paragraph %d: %s", index + 1, e)
+            # Use fallback for this paragraph
+            return IdeaItem(**create_fallback_idea(paragraph_data))
+
+
+async def generate_idea_batch_items(index: int, total: int, batch: List[Dict], semaphore: asyncio.Semaphore) -> List[IdeaItem]:
+    """
+    Generate ideas for a batch of paragraphs in one request, waiting for a free slot in the semaphore.
+
+    Args:
+        index: Zero-based batch index (for logging)
+        total: Total number of batches (for logging)
+        batch: Grouped paragraphs sent together
+        semaphore: Limits how many requests are in flight concurrently
+
+    Returns:
+        IdeaItems in batch order, with fallback ideas for paragraphs that failed
+    """
+    async with semaphore:
+        logger.debug("Generating ideas for batch %d/%d (%d paragraphs)", index + 1, total, len(batch))
+
+        try:
+            ideas = await generate_ideas_batch_with_ai(batch)
+            return [IdeaItem(**idea) for idea in ideas]
+
+        except Exception as e:
+            logger.error("Error generating ideas for batch %d: %s", index + 1, e)
+            # Use fallback for every paragraph in this batch
+            return [IdeaItem(**create_fallback_idea(paragraph_data)) for paragraph_data in batch]
+
+
 @app.get("/")
 async def root():
     return {"message": "Content Generation API is running"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Report hit rates of the transcription, idea and content caches.
+    """
+    transcription_cache = get_default_transcription_cache()
+    return {
+        "transcription": transcription_cache.stats() if transcription_cache else None,
+        "ideas": idea_cache.stats(),
+        "content": content_cache.stats()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Expose stage latencies, HTTP, Gemini and job metrics in the Prometheus text format.
+    """
+    # A SQLite query; kept off the event loop in case a job worker holds the write lock
+    job_stats = await asyncio.to_thread(get_transcription_jobs().stats)
+    for status, count in job_stats.items():
+        if status != "workers":
+            TRANSCRIPTION_JOBS.set(count, status=status)
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+def resolve_transcription_language(file: UploadFile, language: str) -> str:
+    """
+    Validate a transcription upload and determine its input language.
+
+    Args:
+        file: Uploaded audio or video file
+        language: Requested language ('vietnamese', 'english', 'japanese' or 'auto')
+
+    Returns:
+        Language used to pick the transcription prompt
+
+    Raises:
+        HTTPException: 400 for an unsupported file type or language
+    """
+    # Validate file type (check both content type and file extension)
+    valid_content_types = ('video/', 'audio/')
+    valid_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.mp3', '.wav', '.m4a', '.aac', '.flac')
+
+    is_valid_content_type = file.content_type and file.content_type.startswith(valid_content_types)
+    is_valid_extension = file.filename and any(file.filename.lower().endswith(ext) for ext in valid_extensions)
+
+    if not (is_valid_content_type or is_valid_extension):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type '{file.content_type}' and extension. Please upload a video or audio file."
+        )
+    logger.debug("Received language parameter: %r", language)
+
+    # Determine language to use for transcription
+    if language == "auto":
+        # Auto-detect language from filename (simple heuristic)
+        return detect_language_from_filename(file.filename or "")
+
+    # Use provided language, validate it's supported
+    valid_languages = ['vietnamese', 'english', 'japanese']
+    if language not in valid_languages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported language '{language}'. Supported languages: {', '.join(valid_languages)}"
+        )
+    return language
+
+
 @app.post("/video-transcript", response_model=TranscriptResponse)
 async def video_transcript(
     file: UploadFile = File(...),
@@ -544,45 +1006,21 @@ async def video_transcript(
     temp_file_path = None
     try:
         st_time = time.time()
-        # Validate file type (check both content type and file extension)
-        valid_content_types = ('video/', 'audio/')
-        valid_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.mp3', '.wav', '.m4a', '.aac', '.flac')
-
-        is_valid_content_type = file.content_type and file.content_type.startswith(valid_content_types)
-        is_valid_extension = file.filename and any(file.filename.lower().endswith(ext) for ext in valid_extensions)
-
-        if not (is_valid_content_type or is_valid_extension):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type '{file.content_type}' and extension. Please upload a video or audio file."
-            )
-        print(f"🔍 BACKEND RECEIVED LANGUAGE PARAMETER: '{language}' (type: {type(language).__name__})")
-
-        # Determine language to use for transcription
-        if language == "auto":
-            # Auto-detect language from filename (simple heuristic)
-            detected_language = detect_language_from_filename(file.filename or "")
-        else:
-            # Use provided language, validate it's supported
-            valid_languages = ['vietnamese', 'english', 'japanese']
-            if language not in valid_languages:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported language '{language}'. Supported languages: {', '.join(valid_languages)}"
-                )
-            detected_language = language
-
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename or "")[1]) as temp_file:
-            temp_file_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
-
-        # Initialize transcriber and process the audio
-        transcriber = AudioSegmentTranscriber()
-
-        # Transcribe the audio file (returns tuple of original and vietnamese transcripts)
-        original_transcription_text, vietnamese_transcription_text = transcriber.transcribe_file(temp_file_path, detected_language)
+        detected_language = resolve_transcription_language(file, language)
+
+        # Save uploaded file to temporary location without loading it into memory
+        temp_file_path = await spool_upload_to_disk(file, suffix=os.path.splitext(file.filename or "")[1])
+
+        # Transcribe the audio file off the event loop (returns tuple of original and vietnamese transcripts);
+        # running it in a copy of the request's context keeps the request id on its log records
+        loop = asyncio.get_running_loop()
+        original_transcription_text, vietnamese_transcription_text = await loop.run_in_executor(
+            transcription_executor,
+            contextvars.copy_context().run,
+            run_transcription,
+            temp_file_path,
+            detected_language
+        )
 
         # Parse transcription into the required format with dual-language support
         transcript_items = parse_transcription_to_transcript_items(
@@ -601,7 +1039,7 @@ async def video_transcript(
         raise
     except Exception as e:
         # Log the error for debugging
-        print(f"Error processing audio file: {str(e)}")
+        logger.exception("Error processing audio file: %s", e)
         # Return mock data as fallback
         return TranscriptResponse(data=MOCK_TRANSCRIPT_DATA)
     finally:
@@ -610,7 +1048,281 @@ async def video_transcript(
             try:
                 os.unlink(temp_file_path)
             except Exception as cleanup_error:
-                print(f"Warning: Could not delete temporary file {temp_file_path}: {cleanup_error}")
+                logger.warning("Could not delete temporary file %s: %s", temp_file_path, cleanup_error)
+
+
+async def stream_transcript_segments(audio_file_path: str, language: str) -> AsyncIterator[Tuple[int, int, List[TranscriptItem]]]:
+    """
+    Transcribe a saved upload on transcription_executor and yield its transcript items
+    segment by segment as they finish.
+
+    The upload is deleted once transcription stops. If the consumer stops early (e.g. the
+    client disconnects), transcription stops after the current segment.
+
+    Args:
+        audio_file_path: Path to the saved upload; owned and deleted by this function
+        language: Input language used to pick the transcription prompt
+
+    Yields:
+        Tuples of (segment_index, segment_count, transcript_items) in segment order
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    cancelled = threading.Event()
+
+    def emit(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening any more
+            cancelled.set()
+
+    def produce_segments():
+        # iter_transcribe_file blocks on the pipeline, so it is consumed on a worker thread
+        transcriber = AudioSegmentTranscriber()
+        segments = transcriber.iter_transcribe_file(
+            audio_file_path,
+            language,
+            parse=lambda original, vietnamese: parse_transcription_to_transcript_items(vietnamese, original, language)
+        )
+        try:
+            for segment in segments:
+                if cancelled.is_set():
+                    break
+                emit(segment)
+        except Exception as e:
+            emit(e)
+        finally:
+            segments.close()
+            emit(finished)
+            if os.path.exists(audio_file_path):
+                try:
+                    os.unlink(audio_file_path)
+                except Exception as cleanup_error:
+                    logger.warning("Could not delete temporary file %s: %s", audio_file_path, cleanup_error)
+
+    loop.run_in_executor(transcription_executor, contextvars.copy_context().run, produce_segments)
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+@app.post("/video-transcript/stream")
+async def video_transcript_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    language: str = Form("auto")
+):
+    """
+    Transcribe an audio/video file and stream its transcript items segment by segment,
+    so the first minutes can be shown while the rest is still being transcribed.
+
+    Input: same form fields as /video-transcript
+    Output: NDJSON by default, one record per line:
+              {"type": "segment", "segment_index": 0, "segments_total": 3, "data": [TranscriptItem, ...]}
+              {"type": "done", "segments_total": 3, "items": 42, "total_ms": 81234}
+              {"type": "error", "detail": "..."}              (instead of "done" on failure)
+            With "Accept: text/event-stream", the same records as Server-Sent Events: segment
+            records as "data:" messages, then a "done" or "error" event.
+    """
+    detected_language = resolve_transcription_language(file, language)
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    temp_file_path = await spool_upload_to_disk(file, suffix=os.path.splitext(file.filename or "")[1])
+
+    def format_record(record: Dict) -> str:
+        if not use_sse:
+            return format_ndjson_line(record)
+        record_type = record.pop("type")
+        return format_sse_event(record, event=None if record_type == "segment" else record_type)
+
+    transcription_started = False
+
+    async def record_stream():
+        nonlocal transcription_started
+        st_time = time.time()
+        segments_total = 0
+        items = 0
+        # stream_transcript_segments owns (and deletes) the upload from its first step on
+        transcription_started = True
+        try:
+            async for segment_index, segment_count, transcript_items in stream_transcript_segments(temp_file_path, detected_language):
+                segments_total = segment_count
+                items += len(transcript_items)
+                yield format_record({
+                    "type": "segment",
+                    "segment_index": segment_index,
+                    "segments_total": segment_count,
+                    "data": [item.model_dump() for item in transcript_items]
+                })
+        except Exception as e:
+            logger.exception("Error streaming transcription: %s", e)
+            yield format_record({"type": "error", "detail": f"Error transcribing file: {str(e)}"})
+            return
+
+        total_ms = (time.time() - st_time) * 1000
+        logger.info("Streamed %d transcript items from %d segments in %.0fms", items, segments_total, total_ms)
+        yield format_record({"type": "done", "segments_total": segments_total, "items": items, "total_ms": round(total_ms)})
+
+    def discard_unstarted_upload():
+        # The body was never iterated (e.g. the client went away first), so nothing else deletes the upload
+        if not transcription_started and os.path.exists(temp_file_path):
+            try:
+                os.unlink(temp_file_path)
+            except Exception as cleanup_error:
+                logger.warning("Could not delete temporary file %s: %s", temp_file_path, cleanup_error)
+
+    return StreamingResponse(
+        record_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(discard_unstarted_upload)
+    )
+
+
+def job_segment_items(segments: List[Dict], language: str) -> List[TranscriptItem]:
+    """
+    Parse the finished segments of a transcription job into TranscriptItems.
+
+    Args:
+        segments: Segment dicts from TranscriptionJobQueue.get
+        language: Input language of the job
+
+    Returns:
+        Transcript items of the segments, in order
+    """
+    items = []
+    for segment in segments:
+        items.extend(parse_transcription_to_transcript_items(
+            segment["vietnamese_transcription"],
+            segment["original_transcription"],
+            language
+        ))
+    return items
+
+
+@app.post("/video-transcript/jobs", response_model=TranscriptionJobCreated, status_code=202)
+async def create_transcription_job(
+    file: UploadFile = File(...),
+    language: str = Form("auto")
+):
+    """
+    Queue an audio/video file for transcription and return a job id immediately.
+
+    The job runs on the transcription job worker pool. Poll GET /video-transcript/jobs/{job_id}
+    or subscribe to GET /video-transcript/jobs/{job_id}/events for progress and partial results.
+
+    Args:
+        file: Audio or video file to transcribe
+        language: Input language ('vietnamese', 'english', 'japanese', or 'auto'); output is always Vietnamese
+
+    Returns:
+        TranscriptionJobCreated with the job id
+    """
+    detected_language = resolve_transcription_language(file, language)
+    temp_file_path = await spool_upload_to_disk(file, suffix=os.path.splitext(file.filename or "")[1])
+    try:
+        job_id = await asyncio.to_thread(get_transcription_jobs().submit, temp_file_path, file.filename or "", detected_language)
+    except BaseException:
+        # Not queued, so nothing else will delete the upload
+        try:
+            os.unlink(temp_file_path)
+        except Exception as cleanup_error:
+            logger.warning("Could not delete temporary file %s: %s", temp_file_path, cleanup_error)
+        raise
+    # From here on the job queue owns the saved upload and deletes it when the job finishes
+    logger.info("Queued transcription job %s for %s (%s)", job_id, file.filename, detected_language)
+    return TranscriptionJobCreated(job_id=job_id, status="queued")
+
+
+@app.get("/video-transcript/jobs/{job_id}", response_model=TranscriptionJobStatus)
+async def get_transcription_job(job_id: str):
+    """
+    Return the status of a transcription job with the transcript items finished so far.
+
+    Args:
+        job_id: Id returned by POST /video-transcript/jobs
+
+    Returns:
+        TranscriptionJobStatus; data holds every item once the job is completed
+    """
+    job = await asyncio.to_thread(get_transcription_jobs().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Transcription job '{job_id}' not found")
+
+    result = await asyncio.to_thread(get_transcription_jobs().get_result, job_id)
+    if result is not None:
+        original_transcription_text, vietnamese_transcription_text = result
+        items = parse_transcription_to_transcript_items(
+            vietnamese_transcription_text, original_transcription_text, job["language"]
+        )
+    else:
+        items = job_segment_items(job["segments"], job["language"])
+
+    return TranscriptionJobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        filename=job["filename"],
+        language=job["language"],
+        segments_total=job["segments_total"],
+        segments_done=job["segments_done"],
+        error=job["error"],
+        data=items
+    )
+
+
+@app.get("/video-transcript/jobs/{job_id}/events")
+async def transcription_job_events(job_id: str):
+    """
+    Stream the progress of a transcription job as Server-Sent Events.
+
+    Output: text/event-stream with one "data: {...}" message per finished segment, carrying
+            segment_index, segments_total, segments_done, status and the segment's transcript
+            items, then a "done" event with the final status, or an "error" event if the job failed
+    """
+    transcription_jobs = get_transcription_jobs()
+    job = await asyncio.to_thread(transcription_jobs.get, job_id, False)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Transcription job '{job_id}' not found")
+
+    async def event_stream():
+        next_segment = 0
+        while True:
+            job = await asyncio.to_thread(transcription_jobs.get, job_id, True, next_segment)
+            for segment in job["segments"]:
+                yield format_sse_event({
+                    "segment_index": segment["index"],
+                    "segments_total": job["segments_total"],
+                    "segments_done": job["segments_done"],
+                    "status": job["status"],
+                    "data": [item.model_dump() for item in job_segment_items([segment], job["language"])]
+                })
+                next_segment = segment["index"] + 1
+
+            if job["status"] == JOB_FAILED:
+                yield format_sse_event({"detail": job["error"]}, event="error")
+                return
+            if job["status"] in FINISHED_STATUSES:
+                yield format_sse_event(
+                    {"status": job["status"], "segments_total": job["segments_total"], "segments_done": job["segments_done"]},
+                    event="done"
+                )
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/generate-ideas", response_model=IdeaGenerationResponse)
@@ -627,62 +1339,63 @@ async def generate_ideas(request: IdeaGenerationRequest):
         if not request.data:
             raise HTTPException(status_code=400, detail="No transcript data provided")
 
-        print(f"Received {len(request.data)} transcript items for idea generation")
+        logger.info("Received %d transcript items for idea generation", len(request.data))
 
         # Filter transcript items where remove=False (high-quality segments)
         high_quality_items = [item for item in request.data if not item.remove]
 
-        print(f"Filtered to {len(high_quality_items)} high-quality transcript items")
+        logger.debug("Filtered to %d high-quality transcript items", len(high_quality_items))
 
         if not high_quality_items:
-            print("No high-quality transcript items found, returning mock data")
+            logger.warning("No high-quality transcript items found, returning mock data")
             return IdeaGenerationResponse(data=MOCK_IDEAS_DATA)
 
         # Group related transcript segments into coherent paragraphs
         grouped_paragraphs = group_transcript_segments(high_quality_items)
 
-        print(f"Grouped into {len(grouped_paragraphs)} paragraphs")
+        logger.debug("Grouped into %d paragraphs", len(grouped_paragraphs))
 
         if not grouped_paragraphs:
-            print("No paragraphs could be formed, returning mock data")
+            logger.warning("No paragraphs could be formed, returning mock data")
             return IdeaGenerationResponse(data=MOCK_IDEAS_DATA)
 
-        # Generate ideas for each paragraph using AI
-        generated_ideas = []
-
-        for i, paragraph_data in enumerate(grouped_paragraphs):
-            print(f"Generating ideas for paragraph {i+1}/{len(grouped_paragraphs)}")
-
-            try:
-                idea = await generate_ideas_with_ai(paragraph_data)
-                generated_ideas.append(IdeaItem(**idea))
-
-            except Exception as e:
-                print(f"Error generating idea for paragraph {i+1}: {str(e)}")
-                # Use fallback for this paragraph
-                fallback_idea = create_fallback_idea(paragraph_data)
-                generated_ideas.append(IdeaItem(**fallback_idea))
+        # Generate ideas for all paragraphs concurrently; gather() keeps paragraph order
+        semaphore = asyncio.Semaphore(IDEA_GENERATION_CONCURRENCY)
+        if IDEA_BATCH_SIZE > 1:
+            batches = [
+                grouped_paragraphs[i:i + IDEA_BATCH_SIZE]
+                for i in range(0, len(grouped_paragraphs), IDEA_BATCH_SIZE)
+            ]
+            batch_results = await asyncio.gather(*(
+                generate_idea_batch_items(i, len(batches), batch, semaphore)
+                for i, batch in enumerate(batches)
+            ))
+            generated_ideas = [idea for batch_ideas in batch_results for idea in batch_ideas]
+        else:
+            generated_ideas = list(await asyncio.gather(*(
+                generate_idea_item(i, len(grouped_paragraphs), paragraph_data, semaphore)
+                for i, paragraph_data in enumerate(grouped_paragraphs)
+            )))
 
-        print(f"Successfully generated {len(generated_ideas)} ideas")
-        print(f"Idea time: {time.time() - idea_time}:.2f")
+        logger.info("Generated %d ideas in %.2fs", len(generated_ideas), time.time() - idea_time)
 
         # Return generated ideas or fallback to mock data if none generated
         if generated_ideas:
             return IdeaGenerationResponse(data=generated_ideas)
         else:
-            print("No ideas could be generated, returning mock data")
+            logger.warning("No ideas could be generated, returning mock data")
             return IdeaGenerationResponse(data=MOCK_IDEAS_DATA)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in generate_ideas endpoint: {str(e)}")
+        logger.exception("Error in generate_ideas endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Error generating ideas: {str(e)}")
 
 
-async def generate_content_with_ai(format_type: str, idea_text: str, selected_sub_ideas: List[str] = None) -> str:
+def build_content_prompt(format_type: str, idea_text: str, selected_sub_ideas: List[str] = None) -> str:
     """
-    Generate content using Google Gemini AI with format-specific prompts.
+    Build the format-specific Gemini prompt for content generation.
 
     Args:
         format_type: Content format (video, blog, post, infographic)
@@ -690,17 +1403,16 @@ async def generate_content_with_ai(format_type: str, idea_text: str, selected_su
         selected_sub_ideas: Optional list of selected sub ideas for more focused content
 
     Returns:
-        Generated content in Vietnamese
+        Prompt text, defaulting to the social media post prompt for unknown formats
     """
-    try:
-        # Prepare sub ideas text if provided
-        sub_ideas_text = ""
-        if selected_sub_ideas and len(selected_sub_ideas) > 0:
-            sub_ideas_text = f"\n\nSELECTED SUPPORTING IDEAS:\n" + "\n".join([f"- {idea}" for idea in selected_sub_ideas])
+    # Prepare sub ideas text if provided
+    sub_ideas_text = ""
+    if selected_sub_ideas and len(selected_sub_ideas) > 0:
+        sub_ideas_text = f"\n\nSELECTED SUPPORTING IDEAS:\n" + "\n".join([f"- {idea}" for idea in selected_sub_ideas])
 
-        # Format-specific prompt templates
-        prompts = {
-            "video": f"""You are a video scriptwriter assistant. Your task is to write a detailed video script in Vietnamese, structured for creating an Excel storyboard.
+    # Format-specific prompt templates
+    prompts = {
+        "video": f"""You are a video scriptwriter assistant. Your task is to write a detailed video script in Vietnamese, structured for creating an Excel storyboard.
 
 CONTENT IDEA: {idea_text}{sub_ideas_text}
 TARGET FORMAT: Video Script
@@ -728,7 +1440,7 @@ Structure Requirements:
 LANGUAGE REQUIREMENT: All content must be written in Vietnamese language.
 Provide a complete, detailed video script ready for production.""",
 
-            "blog": f"""You are a professional blog writer. Create a comprehensive blog article in Vietnamese based on the provided content idea.
+        "blog": f"""You are a professional blog writer. Create a comprehensive blog article in Vietnamese based on the provided content idea.
 
 CONTENT IDEA: {idea_text}{sub_ideas_text}
 TARGET FORMAT: Blog Article
@@ -761,7 +1473,7 @@ Structure Requirements:
 LANGUAGE REQUIREMENT: All content must be written in Vietnamese language.
 Create a complete, publication-ready blog article.""",
 
-            "post": f"""You are a social media content creator. Create engaging social media posts in Vietnamese based on the provided content idea.
+        "post": f"""You are a social media content creator. Create engaging social media posts in Vietnamese based on the provided content idea.
 
 CONTENT IDEA: {idea_text}{sub_ideas_text}
 TARGET FORMAT: Social Media Posts
@@ -794,7 +1506,7 @@ Create content for multiple platforms:
 LANGUAGE REQUIREMENT: All captions and text content must be written in Vietnamese language.
 Provide complete, ready-to-post content for each platform.""",
 
-            "infographic": f"""You are an infographic content designer. Create detailed content structure for an infographic in Vietnamese based on the provided idea.
+        "infographic": f"""You are an infographic content designer. Create detailed content structure for an infographic in Vietnamese based on the provided idea.
 
 CONTENT IDEA: {idea_text}{sub_ideas_text}
 TARGET FORMAT: Infographic Content
@@ -834,29 +1546,167 @@ Structure Requirements:
 
 LANGUAGE REQUIREMENT: All text content must be written in Vietnamese language.
 Provide complete content ready for graphic design implementation."""
-        }
+    }
 
-        # Get the appropriate prompt
-        prompt = prompts.get(format_type, prompts["post"])  # Default to post if format not found
+    # Get the appropriate prompt
+    return prompts.get(format_type, prompts["post"])  # Default to post if format not found
 
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash-lite')
 
-        # Generate content
-        response = model.generate_content(prompt)
+def get_fallback_content(format_type: str, idea_text: str) -> str:
+    """
+    Return the fallback content used when AI generation fails.
 
+    Args:
+        format_type: Content format (video, blog, post, infographic)
+        idea_text: The content idea to expand upon
+
+    Returns:
+        Short content description in Vietnamese
+    """
+    # Fallback content in Vietnamese
+    fallback_content = {
+        "video": f"Kịch bản video về '{idea_text}': Tạo video hấp dẫn với nội dung chất lượng cao, bao gồm phần mở đầu thu hút, nội dung chính có giá trị và lời kêu gọi hành động rõ ràng.",
+        "blog": f"Bài viết blog về '{idea_text}': Viết bài viết toàn diện với các tiêu đề SEO, nội dung có giá trị và ví dụ thực tế. Bao gồm phần mở đầu, nội dung chính và kết luận.",
+        "post": f"Bài đăng mạng xã hội về '{idea_text}': Tạo nội dung hấp dẫn với hashtag phù hợp, emoji và lời kêu gọi hành động. Phù hợp cho Facebook, Instagram và LinkedIn.",
+        "infographic": f"Infographic về '{idea_text}': Thiết kế infographic với thống kê quan trọng, quy trình rõ ràng và hình ảnh minh họa. Sử dụng màu sắc nhất quán và font chữ dễ đọc."
+    }
+    return fallback_content.get(format_type, f"Nội dung được tạo cho {format_type}: {idea_text}")
+
+
+async def generate_content_with_ai(format_type: str, idea_text: str, selected_sub_ideas: List[str] = None) -> str:
+    """
+    Generate content using Google Gemini AI with format-specific prompts.
+
+    Args:
+        format_type: Content format (video, blog, post, infographic)
+        idea_text: The content idea to expand upon
+        selected_sub_ideas: Optional list of selected sub ideas for more focused content
+
+    Returns:
+        Generated content in Vietnamese
+    """
+    try:
+        cache_key = content_cache_key(format_type, idea_text, selected_sub_ideas)
+        cached_content = content_cache.get(cache_key)
+        if cached_content is not None:
+            return cached_content
+
+        prompt = build_content_prompt(format_type, idea_text, selected_sub_ideas)
+
+        # Generate content through the shared scheduler (the SDK call is blocking, so keep it off the event loop)
+        with span("content_generation"):
+            response = await asyncio.to_thread(generate_with_gemini, prompt)
+
+        content_cache.set(cache_key, response.text)
         return response.text
 
     except Exception as e:
-        print(f"Error generating content with AI: {str(e)}")
-        # Fallback content in Vietnamese
-        fallback_content = {
-            "video": f"Kịch bản video về '{idea_text}': Tạo video hấp dẫn với nội dung chất lượng cao, bao gồm phần mở đầu thu hút, nội dung chính có giá trị và lời kêu gọi hành động rõ ràng.",
-            "blog": f"Bài viết blog về '{idea_text}': Viết bài viết toàn diện với các tiêu đề SEO, nội dung có giá trị và ví dụ thực tế. Bao gồm phần mở đầu, nội dung chính và kết luận.",
-            "post": f"Bài đăng mạng xã hội về '{idea_text}': Tạo nội dung hấp dẫn với hashtag phù hợp, emoji và lời kêu gọi hành động. Phù hợp cho Facebook, Instagram và LinkedIn.",
-            "infographic": f"Infographic về '{idea_text}': Thiết kế infographic với thống kê quan trọng, quy trình rõ ràng và hình ảnh minh họa. Sử dụng màu sắc nhất quán và font chữ dễ đọc."
-        }
-        return fallback_content.get(format_type, f"Nội dung được tạo cho {format_type}: {idea_text}")
+        logger.error("Error generating content with AI: %s", e)
+        return get_fallback_content(format_type, idea_text)
+
+
+async def stream_content_with_ai(format_type: str, idea_text: str, selected_sub_ideas: List[str] = None) -> AsyncIterator[str]:
+    """
+    Stream generated content from Google Gemini AI chunk by chunk as it arrives.
+
+    Args:
+        format_type: Content format (video, blog, post, infographic)
+        idea_text: The content idea to expand upon
+        selected_sub_ideas: Optional list of selected sub ideas for more focused content
+
+    Yields:
+        Text chunks of the generated content in Vietnamese
+    """
+    cache_key = content_cache_key(format_type, idea_text, selected_sub_ideas)
+    cached_content = content_cache.get(cache_key)
+    if cached_content is not None:
+        yield cached_content
+        return
+
+    prompt = build_content_prompt(format_type, idea_text, selected_sub_ideas)
+
+    client = get_gemini_clients().client
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    cancelled = threading.Event()
+
+    def emit(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening any more
+            cancelled.set()
+
+    def produce_chunks():
+        # The SDK stream is a blocking iterator, so it is consumed on a worker thread
+        stream = get_gemini_scheduler().generate_content_stream(client, model=GEMINI_MODEL, contents=prompt)
+        try:
+            with span("content_generation"):
+                for chunk in stream:
+                    if cancelled.is_set():
+                        # The client went away; stop reading instead of paying for the rest
+                        break
+                    if chunk.text:
+                        emit(chunk.text)
+        except Exception as e:
+            emit(e)
+        finally:
+            stream.close()
+            emit(finished)
+
+    loop.run_in_executor(None, contextvars.copy_context().run, produce_chunks)
+
+    chunks = []
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            chunks.append(item)
+            yield item
+    finally:
+        cancelled.set()
+
+    # Only reached when the stream finished; an empty answer is not worth keeping for the TTL
+    content = ''.join(chunks)
+    if content.strip():
+        content_cache.set(cache_key, content)
+
+
+def validate_content_request(request: ContentGenerationRequest) -> None:
+    """
+    Validate a content generation request, raising HTTPException 400 if it is invalid.
+    """
+    # Validate format
+    valid_formats = ["video", "blog", "post", "infographic"]
+    if request.format not in valid_formats:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(valid_formats)}"
+        )
+
+    # Validate idea_text
+    if not request.idea_text or len(request.idea_text.strip()) == 0:
+        raise HTTPException(status_code=400, detail="idea_text cannot be empty")
+
+
+def format_sse_event(data: Dict, event: str = None) -> str:
+    """
+    Encode a dictionary as a Server-Sent Events message.
+    """
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def format_ndjson_line(data: Dict) -> str:
+    """
+    Format one newline-delimited JSON record.
+    """
+    return json.dumps(data, ensure_ascii=False) + "\n"
 
 
 @app.post("/generate-content", response_model=ContentGenerationResponse)
@@ -868,19 +1718,10 @@ async def generate_content(request: ContentGenerationRequest):
     """
     try:
         content_time = time.time()
-        print(f"Generating content for format: {request.format}, idea: {request.idea_text[:100]}...")
-
-        # Validate format
-        valid_formats = ["video", "blog", "post", "infographic"]
-        if request.format not in valid_formats:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid format. Must be one of: {', '.join(valid_formats)}"
-            )
+        logger.info("Generating content for format: %s", request.format)
+        log_payload(logger, "Content idea", request.idea_text)
 
-        # Validate idea_text
-        if not request.idea_text or len(request.idea_text.strip()) == 0:
-            raise HTTPException(status_code=400, detail="idea_text cannot be empty")
+        validate_content_request(request)
 
         # Generate content using AI with selected sub ideas
         generated_content = await generate_content_with_ai(
@@ -889,18 +1730,67 @@ async def generate_content(request: ContentGenerationRequest):
             request.selected_sub_ideas
         )
 
-        print(f"Successfully generated {len(generated_content)} characters of content")
-        print(f"Content time: {time.time() - content_time}:.2f")
+        logger.info("Generated %d characters of content in %.2fs", len(generated_content), time.time() - content_time)
 
         return ContentGenerationResponse(content=generated_content)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in generate_content endpoint: {str(e)}")
+        logger.exception("Error in generate_content endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Error generating content: {str(e)}")
 
 
+@app.post("/generate-content/stream")
+async def generate_content_stream(request: ContentGenerationRequest):
+    """
+    Stream generated content as Server-Sent Events while Gemini produces it.
+    Input: same body as /generate-content
+    Output: text/event-stream with one "data: {"text": ...}" message per chunk, then a
+            "done" event carrying time-to-first-byte and total timings in milliseconds
+    """
+    validate_content_request(request)
+    logger.info("Streaming content for format: %s", request.format)
+    log_payload(logger, "Content idea", request.idea_text)
+
+    async def event_stream():
+        content_time = time.time()
+        first_chunk_ms = None
+        characters = 0
+
+        try:
+            async for chunk in stream_content_with_ai(request.format, request.idea_text, request.selected_sub_ideas):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.time() - content_time) * 1000
+                    logger.debug("Content time to first byte: %.0fms", first_chunk_ms)
+                characters += len(chunk)
+                yield format_sse_event({"text": chunk})
+
+        except Exception as e:
+            logger.error("Error streaming content with AI: %s", e)
+            if first_chunk_ms is not None:
+                # Part of the content was already sent, so report the error instead of mixing in fallback text
+                yield format_sse_event({"detail": f"Error generating content: {str(e)}"}, event="error")
+                return
+            fallback = get_fallback_content(request.format, request.idea_text)
+            first_chunk_ms = (time.time() - content_time) * 1000
+            characters = len(fallback)
+            yield format_sse_event({"text": fallback})
+
+        total_ms = (time.time() - content_time) * 1000
+        logger.info("Streamed %d characters of content in %.0fms (first byte %.0fms)", characters, total_ms, first_chunk_ms or total_ms)
+        yield format_sse_event(
+            {"ttfb_ms": round(first_chunk_ms or total_ms), "total_ms": round(total_ms), "characters": characters},
+            event="done"
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
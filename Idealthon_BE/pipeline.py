@@ -0,0 +1,209 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_END = object()
+
+
+class StagePipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Each stage has its own worker threads, so different items can be in different stages at
+    the same time (item N+1 is produced while item N is in stage 1 and item N-1 in stage 2).
+    The bounded queues apply backpressure all the way back to the source iterator, which is
+    consumed on a feeder thread. Results are yielded in source order, and busy/wait time is
+    counted for every stage.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = 4,
+                 source_name: str = "source", on_discard: Optional[Callable[[Any], None]] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: List of (name, function, workers). Each function takes the item returned by
+                    the previous stage and returns the item for the next one.
+            queue_size: Capacity of the queue in front of each stage
+            source_name: Name under which time spent in the source iterator is reported
+            on_discard: Called with every item dropped after a failure, e.g. to delete temp files
+        """
+        if not stages:
+            raise ValueError("StagePipeline needs at least one stage")
+        self.stages = [(name, func, max(1, workers)) for name, func, workers in stages]
+        self.queue_size = max(1, queue_size)
+        self.source_name = source_name
+        self.on_discard = on_discard
+
+        self._lock = threading.Lock()
+        self._counters = {
+            name: {"workers": workers, "items": 0, "busy_seconds": 0.0, "wait_seconds": 0.0, "blocked_seconds": 0.0}
+            for name, workers in [(source_name, 1)] + [(name, workers) for name, _, workers in self.stages]
+        }
+
+    def _record(self, name: str, items: int = 0, **seconds: float) -> None:
+        with self._lock:
+            counters = self._counters[name]
+            counters["items"] += items
+            for key, value in seconds.items():
+                counters[key] += value
+
+    def _discard(self, item: Any) -> None:
+        if self.on_discard is not None:
+            try:
+                self.on_discard(item)
+            except Exception as e:
+                logger.warning("Failed to discard pipeline item: %s", e)
+
+    def run(self, source: Iterable) -> Iterator[Any]:
+        """
+        Feed every source item through the stages.
+
+        Args:
+            source: Items for the first stage; consumed lazily, at most queue_size ahead
+
+        Yields:
+            Output of the last stage, in source order
+
+        Raises:
+            The first exception raised by the source or any stage, after the remaining items
+            have been discarded
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        output = queue.Queue()
+        stop = threading.Event()
+        errors = []
+        remaining_workers = [workers for _, _, workers in self.stages]
+
+        def fail(error: BaseException) -> None:
+            with self._lock:
+                if not errors:
+                    errors.append(error)
+            stop.set()
+
+        def put(target: queue.Queue, entry: Any, name: str) -> None:
+            start = time.perf_counter()
+            target.put(entry)
+            self._record(name, blocked_seconds=time.perf_counter() - start)
+
+        def feed() -> None:
+            iterator = iter(source)
+            try:
+                index = 0
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    self._record(self.source_name, items=1, busy_seconds=time.perf_counter() - start)
+                    put(queues[0], (index, item), self.source_name)
+                    index += 1
+            except BaseException as e:
+                fail(e)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                for _ in range(self.stages[0][2]):
+                    queues[0].put(_END)
+
+        def work(stage_index: int) -> None:
+            name, func, _ = self.stages[stage_index]
+            is_last = stage_index == len(self.stages) - 1
+            next_queue = output if is_last else queues[stage_index + 1]
+
+            while True:
+                start = time.perf_counter()
+                entry = queues[stage_index].get()
+                self._record(name, wait_seconds=time.perf_counter() - start)
+                if entry is _END:
+                    break
+
+                index, item = entry
+                if stop.is_set():
+                    self._discard(item)
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    result = func(item)
+                except BaseException as e:
+                    fail(e)
+                    self._discard(item)
+                    continue
+                self._record(name, items=1, busy_seconds=time.perf_counter() - start)
+                put(next_queue, (index, result), name)
+
+            # The last worker of this stage to finish ends the next stage's input
+            with self._lock:
+                remaining_workers[stage_index] -= 1
+                finished = remaining_workers[stage_index] == 0
+            if finished:
+                for _ in range(1 if is_last else self.stages[stage_index + 1][2]):
+                    next_queue.put(_END)
+
+        # Each thread runs in its own copy of the caller's context (e.g. its request id)
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(feed,),
+                                    name=f"pipeline-{self.source_name}", daemon=True)]
+        for stage_index, (name, _, workers) in enumerate(self.stages):
+            threads.extend(
+                threading.Thread(target=contextvars.copy_context().run, args=(work, stage_index),
+                                 name=f"pipeline-{name}-{worker}", daemon=True)
+                for worker in range(workers)
+            )
+        for thread in threads:
+            thread.start()
+
+        # Reorder buffer: results can finish out of order when a stage has several workers
+        pending = {}
+        next_index = 0
+        try:
+            while True:
+                entry = output.get()
+                if entry is _END:
+                    break
+                index, result = entry
+                if stop.is_set():
+                    self._discard(result)
+                    continue
+                pending[index] = result
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+
+            if errors:
+                raise errors[0]
+        finally:
+            # Also reached when the consumer stops early: drain the stages and drop leftovers
+            stop.set()
+            for result in pending.values():
+                self._discard(result)
+            for thread in threads:
+                thread.join()
+            while not output.empty():
+                entry = output.get()
+                if entry is not _END:
+                    self._discard(entry[1])
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Return per-stage counters.
+
+        busy_seconds is time spent processing items, wait_seconds time spent waiting for input
+        and blocked_seconds time spent waiting for room in the next queue, summed over workers.
+        """
+        with self._lock:
+            stats = {}
+            for name, counters in self._counters.items():
+                stats[name] = dict(counters)
+                stats[name]["mean_ms"] = (
+                    counters["busy_seconds"] / counters["items"] * 1000 if counters["items"] else 0.0
+                )
+            return stats
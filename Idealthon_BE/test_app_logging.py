@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for structured logging: queued JSON/text records, request ids and payload sampling.
+"""
+
+import sys
+import os
+import io
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import app_logging
+from app_logging import (
+    JsonFormatter, RequestIdFilter, TextFormatter, _InProcessQueueHandler,
+    get_request_id, log_payload, request_context
+)
+from pipeline import StagePipeline
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(RequestIdFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_logger(name, level=logging.DEBUG):
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = RecordingHandler()
+    logger.handlers = [handler]
+    return logger, handler
+
+
+def test_queued_records():
+    """Records go through the queue and are written as JSON or text lines with request ids and extra fields."""
+    for formatter, parse in ((JsonFormatter(), json.loads), (TextFormatter(), str)):
+        output = io.StringIO()
+        stream_handler = logging.StreamHandler(output)
+        stream_handler.setFormatter(formatter)
+        log_queue = queue.SimpleQueue()
+        queue_handler = _InProcessQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        listener = QueueListener(log_queue, stream_handler)
+        listener.start()
+
+        logger = logging.getLogger("test_app_logging.queued")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.handlers = [queue_handler]
+
+        logger.info("outside any request")
+        with request_context("req-1"):
+            logger.info("Streamed %d items", 3, extra={"total_ms": 120})
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                logger.exception("Request failed")
+        logger.debug("not written")
+        listener.stop()
+
+        lines = [parse(line) for line in output.getvalue().splitlines() if line.strip()]
+        print(lines[:2])
+        if formatter.__class__ is JsonFormatter:
+            assert [entry["message"] for entry in lines] == ["outside any request", "Streamed 3 items", "Request failed"]
+            assert [entry["request_id"] for entry in lines] == ["-", "req-1", "req-1"]
+            assert lines[1]["total_ms"] == 120 and lines[1]["level"] == "INFO"
+            assert "RuntimeError: boom" in lines[2]["exc"]
+        else:
+            assert "[req-1] Streamed 3 items total_ms=120" in lines[1]
+            assert any("RuntimeError: boom" in line for line in lines)
+
+    print("✅ Queued records test passed!")
+
+
+def test_request_id_reaches_pipeline_threads():
+    """Pipeline stage threads see the request id of the code that started the pipeline."""
+    seen = []
+
+    def stage(item):
+        seen.append((item, get_request_id(), threading.current_thread().name))
+        return item
+
+    with request_context("job-42"):
+        results = list(StagePipeline([("a", stage, 2), ("b", stage, 1)]).run(range(5)))
+
+    assert results == list(range(5))
+    assert {request_id for _, request_id, _ in seen} == {"job-42"}
+    assert all(name.startswith("pipeline-") for _, _, name in seen)
+    assert get_request_id() == "-"
+
+    print("✅ Pipeline request id test passed!")
+
+
+def test_payload_sampling():
+    """Payload dumps cost nothing below DEBUG, are sampled, and are truncated."""
+    def payload():
+        raise AssertionError("Payload should not be built")
+
+    logger, handler = make_logger("test_app_logging.payload", logging.INFO)
+    for _ in range(100):
+        log_payload(logger, "Raw response", payload, sample_rate=1.0)
+    assert handler.records == []
+
+    logger.setLevel(logging.DEBUG)
+    for _ in range(100):
+        log_payload(logger, "Raw response", payload, sample_rate=0.0)
+    assert handler.records == []
+
+    log_payload(logger, "Raw response", "x" * 2000, sample_rate=1.0, paragraph=3)
+    record = handler.records[0]
+    assert record.payload == "x" * app_logging.LOG_PAYLOAD_MAX_CHARS
+    assert record.payload_chars == 2000 and record.paragraph == 3
+
+    handler.records.clear()
+    for _ in range(1000):
+        log_payload(logger, "Raw response", "y", sample_rate=0.1)
+    print(f"Sampled {len(handler.records)}/1000 payloads at rate 0.1")
+    assert 40 < len(handler.records) < 200
+
+    print("✅ Payload sampling test passed!")
+
+
+def test_request_id_header():
+    """Responses carry X-Request-ID, and records logged by the endpoint carry the same id."""
+    import main
+    handler = RecordingHandler()
+    logging.getLogger("main").addHandler(handler)
+    try:
+        client = TestClient(main.app)
+        response = client.post("/generate-content", json={"format": "poem", "idea_text": "x"},
+                               headers={"X-Request-ID": "client-id-1"})
+        assert response.status_code == 400
+        assert response.headers["x-request-id"] == "client-id-1"
+        assert handler.records and all(record.request_id == "client-id-1" for record in handler.records)
+
+        generated = client.get("/").headers["x-request-id"]
+        assert len(generated) == 16 and generated != "client-id-1"
+    finally:
+        logging.getLogger("main").removeHandler(handler)
+
+    print("✅ Request id header test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing structured logging...")
+    print("="*60)
+
+    try:
+        test_queued_records()
+        test_request_id_reaches_pipeline_threads()
+        test_payload_sampling()
+        test_request_id_header()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
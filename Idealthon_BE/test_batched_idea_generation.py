@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for batched multi-paragraph idea prompts.
+Runs offline: the shared Gemini client is replaced with a scripted FakeGeminiClient.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from fake_gemini import FakeGeminiClient
+from test_fake_gemini import INSTANT
+
+
+class BatchResponder:
+    """Answers batched prompts with a partly broken array and single prompts with an object."""
+
+    def __init__(self):
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, contents):
+        self.prompts.append(contents)
+        if "PARAGRAPH 0" in contents:
+            entries = [
+                {"index": 0, "main_idea": "Ý tưởng 0", "supporting_ideas": ["a", "b"], "content_formats": ["video"]},
+                {"index": 1, "main_idea": None},  # Malformed: retried individually
+                {"index": 3, "main_idea": "Ý tưởng 3", "supporting_ideas": ["c"], "content_formats": ["post"]},
+                {"index": 99, "main_idea": "Không tồn tại"},  # Out of range: ignored
+                {"index": True, "main_idea": "Sai kiểu"},  # Not an int (True == 1): ignored
+                {"index": 2.0, "main_idea": "Sai kiểu"},  # Not an int (2.0 == 2): ignored
+            ]
+            return "```json\n" + json.dumps(entries, ensure_ascii=False) + "\n```"
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return json.dumps({
+            "main_idea": "Ý tưởng riêng lẻ",
+            "supporting_ideas": ["retry"],
+            "content_formats": ["blog"]
+        }, ensure_ascii=False)
+
+
+def build_batch(count: int):
+    return [
+        {'paragraph': f"Đoạn văn {i}", 'original_paragraph': '', 'language': 'vietnamese', 'timestamp': f"{i}:00-{i}:30"}
+        for i in range(count)
+    ]
+
+
+def test_batch_splits_and_retries():
+    """Valid entries are split back by index; missing and malformed entries are retried one by one."""
+    responder = BatchResponder()
+    client = FakeGeminiClient(responder=responder, **INSTANT)
+    original_get_clients = main.get_gemini_clients
+    main.get_gemini_clients = lambda: SimpleNamespace(client=client)
+    try:
+        ideas = asyncio.run(main.generate_ideas_batch_with_ai(build_batch(4)))
+    finally:
+        main.get_gemini_clients = original_get_clients
+
+    for idea in ideas:
+        print(f"{idea['timestamp']}: {idea['main_idea']} ({idea['format']})")
+
+    assert len(ideas) == 4, f"Expected 4 ideas, got {len(ideas)}"
+    assert [idea['timestamp'] for idea in ideas] == [f"{i}:00-{i}:30" for i in range(4)]
+    assert ideas[0]['main_idea'] == "Ý tưởng 0" and ideas[0]['format'] == "video"
+    assert ideas[0]['paragraph'] == "Đoạn văn 0", "Paragraph text should come from the request"
+    assert ideas[3]['main_idea'] == "Ý tưởng 3"
+    assert ideas[1]['main_idea'] == "Ý tưởng riêng lẻ", "Malformed entry should be retried individually"
+    assert ideas[2]['main_idea'] == "Ý tưởng riêng lẻ", "Missing entry should be retried individually"
+    assert len(responder.prompts) == 3, f"Expected 1 batch + 2 retries, got {len(responder.prompts)} calls"
+    assert responder.max_in_flight == 1, "Retries should run one at a time within the batch's concurrency slot"
+
+    print("✅ Batched idea generation test passed!")
+
+
+def test_clean_ai_json_text_array():
+    """The JSON cleaner extracts arrays as well as objects."""
+    text = "Here is the JSON\n```json\n[{\"index\": 0}]\n```"
+    assert main.clean_ai_json_text(text, '[', ']') == '[{"index": 0}]'
+    assert main.clean_ai_json_text('Analysis: {"a": 1} trailing', '{', '}') == '{"a": 1}'
+
+    print("✅ JSON cleaning test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batched idea generation...")
+    print("="*60)
+
+    try:
+        test_batch_splits_and_retries()
+        test_clean_ai_json_text_array()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
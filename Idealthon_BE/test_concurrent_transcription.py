@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent per-segment transcription in AudioSegmentTranscriber.
+Runs offline: segment splitting and the Gemini calls are replaced with sleeps.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cut_audio import AudioSegmentTranscriber
+
+SEGMENT_LATENCY = 0.2
+
+
+class SlowTranscriber(AudioSegmentTranscriber):
+    """Transcriber whose segments take a fixed time and finish in reverse order."""
+
+    def __init__(self, segment_count: int, max_workers: int):
+        super().__init__(api_key="test-key", max_workers=max_workers, transcode_profile="source", cache=False)
+        self.segment_count = segment_count
+
+    def plan_speech_segments(self, audio_file_path):
+        return [[(index * self.segment_duration_ms, (index + 1) * self.segment_duration_ms)]
+                for index in range(self.segment_count)]
+
+    def split_audio(self, audio_file_path, segment_plan=None):
+        return [(index, index * self.segment_duration_ms) for index in range(self.segment_count)]
+
+    def upload_segment(self, audio_segment, audio_hash=None):
+        return audio_segment
+
+    def release_segment(self, uploaded_file):
+        pass
+
+    def transcribe_uploaded(self, uploaded_file, language='vietnamese'):
+        # Later segments finish first to prove results are reassembled by offset
+        time.sleep(SEGMENT_LATENCY * (1 + (self.segment_count - uploaded_file) / self.segment_count))
+        return f"<remove>false</remove><time>0:00 - 0:10</time> segment {uploaded_file}"
+
+
+class TranslatingTranscriber(SlowTranscriber):
+    """Transcriber for English audio whose transcription and translation take the same time."""
+
+    def __init__(self, segment_count: int, translate_workers: int):
+        super().__init__(segment_count, max_workers=1)
+        self.translate_workers = translate_workers
+        self.events = []
+
+    def transcribe_uploaded(self, uploaded_file, language='vietnamese'):
+        time.sleep(SEGMENT_LATENCY)
+        self.events.append(("transcribed", uploaded_file, time.time()))
+        return f"<remove>false</remove><time>0:00 - 0:10</time> segment {uploaded_file}"
+
+    def translate_transcript(self, original_transcript, language='vietnamese'):
+        self.events.append(("translating", int(original_transcript.rsplit(' ', 1)[1]), time.time()))
+        time.sleep(SEGMENT_LATENCY)
+        return original_transcript.replace("segment", "đoạn")
+
+
+def run_transcriber(segment_count: int, max_workers: int):
+    transcriber = SlowTranscriber(segment_count, max_workers)
+    start = time.time()
+    original, vietnamese = transcriber.transcribe_file(__file__, 'vietnamese')
+    return original, vietnamese, time.time() - start
+
+
+def test_results_in_offset_order():
+    """Segments finishing out of order are joined in offset order with adjusted timestamps."""
+    original, vietnamese, _ = run_transcriber(segment_count=4, max_workers=4)
+    lines = original.split('\n')
+
+    print("Combined transcription:")
+    print(original)
+
+    assert len(lines) == 4, f"Expected 4 lines, got {len(lines)}"
+    for index, line in enumerate(lines):
+        assert line.endswith(f"segment {index}"), f"Line {index} out of order: {line}"
+        expected_start = f"{index * 10}:00"
+        assert f"<time>{expected_start} - " in line, f"Line {index} has wrong offset: {line}"
+    assert original == vietnamese
+
+    print("✅ Offset ordering test passed!")
+
+
+def test_concurrency_reduces_wall_clock():
+    """Four workers should be clearly faster than one on eight segments."""
+    _, _, serial_time = run_transcriber(segment_count=8, max_workers=1)
+    _, _, parallel_time = run_transcriber(segment_count=8, max_workers=4)
+
+    print(f"Serial: {serial_time:.2f}s, 4 workers: {parallel_time:.2f}s")
+    assert parallel_time < serial_time / 2, "Concurrent mode should be at least 2x faster"
+
+    print("✅ Concurrency speedup test passed!")
+
+
+def test_translation_overlaps_transcription():
+    """English segments are translated while later segments are transcribed, close to 2x faster."""
+    segment_count = 8
+    transcriber = TranslatingTranscriber(segment_count, translate_workers=1)
+    start = time.time()
+    original, vietnamese = transcriber.transcribe_file(__file__, 'english')
+    elapsed = time.time() - start
+
+    serial_time = segment_count * 2 * SEGMENT_LATENCY
+    print(f"Overlapped: {elapsed:.2f}s, transcribe-then-translate chain: {serial_time:.2f}s")
+    assert elapsed < serial_time * 0.7, "Translation should overlap transcription of later segments"
+
+    # Segment 0 is being translated before segment 1 has finished transcribing
+    translating_first = next(at for kind, index, at in transcriber.events if kind == "translating" and index == 0)
+    transcribed_second = next(at for kind, index, at in transcriber.events if kind == "transcribed" and index == 1)
+    assert translating_first < transcribed_second
+
+    # Both transcripts are merged by segment offset
+    for index, (original_line, vietnamese_line) in enumerate(zip(original.split('\n'), vietnamese.split('\n'))):
+        assert original_line.endswith(f"segment {index}")
+        assert vietnamese_line.endswith(f"đoạn {index}")
+        assert f"<time>{index * 10}:00 - " in vietnamese_line
+
+    stats = transcriber.last_pipeline_stats
+    assert stats["translate"]["workers"] == 1 and stats["translate"]["items"] == segment_count
+
+    print("✅ Translation overlap test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing concurrent segment transcription...")
+    print("="*60)
+
+    try:
+        test_results_in_offset_order()
+        test_concurrency_reduces_wall_clock()
+        test_translation_overlaps_transcription()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
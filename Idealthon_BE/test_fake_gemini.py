@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline fake Gemini backend (GEMINI_BACKEND=fake).
+Requires ffmpeg/ffprobe on PATH for the end-to-end transcription test.
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from google.genai import errors
+
+import gemini_clients
+from audio_fixtures import make_tone
+from cut_audio import AudioSegmentTranscriber, TRANSCRIPTION_PROMPTS
+from fake_gemini import FakeGeminiClient, GenerativeModel, LatencyDistribution
+from gemini_clients import GeminiClients, close_gemini_clients
+from gemini_scheduler import GeminiScheduler
+from transcript_parser import parse_transcript_entries
+
+INSTANT = {"latency": "fixed:0", "upload_latency": "fixed:0", "chunk_latency": "fixed:0"}
+
+
+def test_latency_distributions():
+    """Latency specs parse, sample in range, and are reproducible with a seed."""
+    assert LatencyDistribution("fixed:0.25").sample(random.Random(0)) == 0.25
+    samples = [LatencyDistribution("uniform:0.1,0.3").sample(random.Random(seed)) for seed in range(50)]
+    assert all(0.1 <= sample <= 0.3 for sample in samples)
+    assert LatencyDistribution("normal:0,1").sample(random.Random(1)) >= 0
+    lognormal = LatencyDistribution("lognormal:1.0,0.3")
+    assert lognormal.sample(random.Random(7)) == lognormal.sample(random.Random(7))
+
+    for spec in ("gamma:1,2", "fixed:a", "uniform:1"):
+        try:
+            LatencyDistribution(spec)
+        except ValueError as e:
+            print(f"Rejected '{spec}': {e}")
+        else:
+            raise AssertionError(f"Spec '{spec}' should be rejected")
+
+    print("✅ Latency distribution test passed!")
+
+
+def test_canned_responses():
+    """Transcriptions, translations, ideas and content come back in the shapes the backend parses."""
+    client = FakeGeminiClient(**INSTANT)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "speech.mp3")
+        # 32 kbps: 4000 bytes per second, so 160000 bytes is about 40 seconds
+        with open(path, "wb") as f:
+            f.write(b"\0" * 160000)
+        uploaded = client.files.upload(file=path, config={"display_name": "idealthon-test"})
+    assert uploaded.display_name == "idealthon-test"
+    assert [remote_file.name for remote_file in client.files.list()] == [uploaded.name]
+
+    response = client.models.generate_content(model="gemini-test", contents=[TRANSCRIPTION_PROMPTS["english"], uploaded])
+    entries = parse_transcript_entries(response.text)
+    print(f"Canned transcription: {entries}")
+    assert [timestamp_key for timestamp_key, _, _ in entries] == ["0:00-0:15", "0:15-0:30", "0:30-0:40"]
+    assert response.usage_metadata.total_token_count > 40 * 32
+
+    translation = client.models.generate_content(
+        model="gemini-test", contents=[f"Translate.\n\nPlease translate the following transcript:\n\n{response.text}"]
+    )
+    assert [key for key, _, _ in parse_transcript_entries(translation.text)] == [key for key, _, _ in entries]
+
+    idea = json.loads(client.models.generate_content(model="gemini-test", contents="Return ONLY this JSON structure").text)
+    assert idea["main_idea"] and len(idea["supporting_ideas"]) == 3
+
+    batch_prompt = "PARAGRAPH 0\nVIETNAMESE: một\n\nPARAGRAPH 2\nVIETNAMESE: hai\n\nReturn ONLY a JSON array"
+    batch = json.loads(client.models.generate_content(model="gemini-test", contents=batch_prompt).text)
+    assert [entry["index"] for entry in batch] == [0, 2]
+
+    # Identical prompts get identical answers; streams add up to the same text
+    content = client.models.generate_content(model="gemini-test", contents="Viết một bài blog").text
+    assert content == client.models.generate_content(model="gemini-test", contents="Viết một bài blog").text
+    chunks = list(client.models.generate_content_stream(model="gemini-test", contents="Viết một bài blog"))
+    assert ''.join(chunk.text for chunk in chunks) == content
+    assert chunks[-1].usage_metadata is not None
+
+    assert GenerativeModel("gemini-test", client).generate_content("Viết một bài blog").text == content
+
+    client.files.delete(name=uploaded.name)
+    assert client.files.list() == []
+    stats = client.backend.stats()
+    print(f"Fake backend stats: {stats}")
+    assert stats["transcriptions"] == 1 and stats["translations"] == 1 and stats["idea_batches"] == 1
+
+    print("✅ Canned responses test passed!")
+
+
+def test_errors_and_latency():
+    """Configured error rates raise API errors the scheduler retries; latency is applied."""
+    client = FakeGeminiClient(latency="fixed:0.1", error_rate=1.0, error_codes=[429], retry_after_seconds=0.05)
+    try:
+        client.models.generate_content(model="gemini-test", contents="xin chào")
+        raise AssertionError("Should fail")
+    except errors.ClientError as e:
+        assert e.code == 429
+        assert e.response.headers["retry-after"] == "0.05"
+
+    # Half of the calls fail; the scheduler retries until each one succeeds
+    client = FakeGeminiClient(latency="fixed:0.01", error_rate=0.5, error_codes=[503], seed=3)
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=20, backoff_base_seconds=0.001)
+    start = time.monotonic()
+    for index in range(10):
+        scheduler.generate_content(client, model="gemini-test", contents=f"Viết bài {index}")
+    elapsed = time.monotonic() - start
+    stats = scheduler.stats()
+    print(f"10 calls at 50% errors: {elapsed:.2f}s, scheduler {stats}, fake {client.backend.stats()}")
+    assert stats["retries"] > 0 and stats["failures"] == 0
+    assert elapsed >= 0.01 * (10 + stats["retries"])
+
+    print("✅ Errors and latency test passed!")
+
+
+def test_scripted_failures_and_responder():
+    """fail_next queues errors for the next calls; a responder replaces the canned answers and stream chunks."""
+    answers = {"hỏi": "đáp", "kể": ["một ", "hai ", "ba"]}
+    client = FakeGeminiClient(responder=lambda contents: answers.get(contents), **INSTANT)
+    client.backend.fail_next(RuntimeError("first"), RuntimeError("second"))
+
+    for expected in ("first", "second"):
+        try:
+            client.models.generate_content(model="fake", contents="hỏi")
+            raise AssertionError("Scripted failure expected")
+        except RuntimeError as e:
+            assert str(e) == expected
+    assert client.models.generate_content(model="fake", contents="hỏi").text == "đáp"
+
+    chunks = list(client.models.generate_content_stream(model="fake", contents="kể"))
+    assert [chunk.text for chunk in chunks] == ["một ", "hai ", "ba"]
+    assert chunks[-1].usage_metadata is not None and chunks[0].usage_metadata is None
+    # Prompts the responder does not know get the canned answer
+    assert client.models.generate_content(model="fake", contents="viết bài").text.startswith("## Phần 1")
+
+    stats = client.backend.stats()
+    assert stats["scripted_failures"] == 2 and stats["scripted"] == 2 and stats["stream_chunks"] == 3
+
+    print("✅ Scripting hooks test passed!")
+
+
+def test_backend_setting():
+    """GEMINI_BACKEND=fake swaps the shared client, so the app runs end to end without a key or network."""
+    saved = {name: os.environ.get(name) for name in
+             ("GEMINI_BACKEND", "GOOGLE_API_KEY", "FAKE_GEMINI_LATENCY", "FAKE_GEMINI_UPLOAD_LATENCY", "TRANSCRIPTION_CACHE_ENABLED")}
+    os.environ.update(GEMINI_BACKEND="fake", FAKE_GEMINI_LATENCY="fixed:0", FAKE_GEMINI_UPLOAD_LATENCY="fixed:0",
+                      TRANSCRIPTION_CACHE_ENABLED="false")
+    os.environ.pop("GOOGLE_API_KEY", None)
+    close_gemini_clients()
+    try:
+        clients = GeminiClients()
+        assert isinstance(clients.client, FakeGeminiClient)
+        clients.close()
+        try:
+            GeminiClients(backend="other")
+            raise AssertionError("Unknown backend should be rejected")
+        except ValueError:
+            pass
+
+        import main
+        with TestClient(main.app) as client, tempfile.TemporaryDirectory() as temp_dir:
+            assert isinstance(gemini_clients._clients.client, FakeGeminiClient)
+            assert isinstance(AudioSegmentTranscriber().client, FakeGeminiClient)
+
+            path = os.path.join(temp_dir, "talk.mp3")
+            # Mono 32 kbps, the bitrate the fake backend assumes when sizing transcripts
+            make_tone(path, 40, channels=1, sample_rate=16000, bitrate="32k")
+            with open(path, "rb") as f:
+                response = client.post("/video-transcript", files={"file": ("talk.mp3", f, "audio/mpeg")},
+                                       data={"language": "english"})
+            assert response.status_code == 200, response.text
+            items = response.json()["data"]
+            print(f"Transcript items: {[(item['timestamp'], item['remove']) for item in items]}")
+            assert len(items) >= 2
+            assert all(item["original_transcript"] for item in items)
+
+            kept = [item for item in items if not item["remove"]]
+            response = client.post("/generate-ideas", json={"data": kept})
+            assert response.status_code == 200, response.text
+            ideas = response.json()["data"]
+            assert ideas and all(idea["main_idea"].startswith("Ý tưởng") for idea in ideas)
+
+            response = client.post("/generate-content", json={"format": "blog", "idea_text": ideas[0]["main_idea"]})
+            assert response.status_code == 200
+            assert response.json()["content"].startswith("## Phần 1")
+    finally:
+        close_gemini_clients()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    print("✅ Backend setting test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing fake Gemini backend...")
+    print("="*60)
+
+    try:
+        test_latency_distributions()
+        test_canned_responses()
+        test_errors_and_latency()
+        test_scripted_failures_and_responder()
+        test_backend_setting()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
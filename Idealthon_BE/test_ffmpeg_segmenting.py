@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test script for the ffmpeg-based lazy segmenter in AudioSegmentTranscriber.
+Requires ffmpeg/ffprobe on PATH; the Gemini client is replaced so it runs offline.
+"""
+
+import sys
+import os
+import inspect
+import subprocess
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pydub import AudioSegment
+from pydub.utils import get_prober_name
+
+from audio_fixtures import make_tone
+from cut_audio import AudioSegmentTranscriber
+from transcription_cache import TranscriptionCache
+
+
+def probe_duration_ms(path: str) -> int:
+    result = subprocess.run(
+        [get_prober_name(), "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True, check=True
+    )
+    return int(float(result.stdout.strip()) * 1000)
+
+
+class EchoClient:
+    """Stand-in for genai.Client that answers every segment with one timestamped line."""
+
+    def __init__(self, response: str = "<remove>false</remove><time>0:01 - 0:04</time> Xin chào"):
+        self.response = response
+        self.uploaded_sizes = []
+        self.uploaded_durations = []
+        self.deleted = []
+        self.files = SimpleNamespace(upload=self.upload, delete=self.delete)
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def upload(self, file, config=None):
+        self.uploaded_sizes.append(os.path.getsize(file))
+        self.uploaded_durations.append(probe_duration_ms(file))
+        return SimpleNamespace(name=file)
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+    def generate_content(self, model, contents):
+        return SimpleNamespace(text=self.response)
+
+
+def make_speech_with_gap(path: str, speech_seconds: int, gap_seconds: int):
+    # Tone, digital silence, tone: a recording with one long pause
+    subprocess.run(
+        [AudioSegment.converter, "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={speech_seconds}",
+         "-f", "lavfi", "-i", f"anullsrc=r=44100:cl=mono:d={gap_seconds}",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={speech_seconds}",
+         "-filter_complex", "[0][1][2]concat=n=3:v=0:a=1", "-ac", "2", "-ar", "44100", path],
+        check=True
+    )
+
+
+def make_transcriber(cache_dir: str, transcode_profile: str = 'source', client: EchoClient = None) -> AudioSegmentTranscriber:
+    transcriber = AudioSegmentTranscriber(
+        client=client or EchoClient(),
+        max_workers=2,
+        cache=TranscriptionCache(cache_dir=cache_dir),
+        transcode_profile=transcode_profile
+    )
+    transcriber.segment_duration_ms = 10 * 1000
+    return transcriber
+
+
+def test_split_is_lazy_and_covers_file():
+    """split_audio is a generator of segment files covering the source duration."""
+    for suffix in (".mp3", ".wav"):
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, f"tone{suffix}")
+            make_tone(source, 25)
+            transcriber = make_transcriber(work_dir)
+
+            segments = transcriber.split_audio(source)
+            assert inspect.isgenerator(segments), "split_audio should be lazy"
+
+            starts = []
+            durations = []
+            for segment_path, offset_map in segments:
+                starts.append(offset_map[0][1])
+                durations.append(transcriber.probe_duration_ms(segment_path))
+                os.unlink(segment_path)
+
+            print(f"{suffix}: starts={starts}, durations={durations}")
+            assert starts == [0, 10000, 20000]
+            assert abs(sum(durations) - 25000) < 500, "Segments should cover the whole file"
+
+    print("✅ Lazy segmenting test passed!")
+
+
+def test_transcribe_file_adjusts_offsets_and_cleans_up():
+    """Transcribing cut segments yields offset timestamps and removes every segment file."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "tone.wav")
+        make_tone(source, 25)
+        transcriber = make_transcriber(work_dir)
+
+        temp_dir = tempfile.gettempdir()
+        before = {name for name in os.listdir(temp_dir) if name.endswith(".mp3")}
+        original, _ = transcriber.transcribe_file(source, 'vietnamese')
+        after = {name for name in os.listdir(temp_dir) if name.endswith(".mp3")}
+
+        print(original)
+        assert "<time>0:01 - 0:04</time>" in original
+        assert "<time>0:11 - 0:14</time>" in original
+        assert "<time>0:21 - 0:24</time>" in original
+        assert after == before, "Segment files should be deleted after transcription"
+
+    print("✅ Offset and cleanup test passed!")
+
+
+def test_speech_profiles_shrink_uploads():
+    """Speech profiles upload far fewer bytes than the source encoding and keep offsets intact."""
+    uploaded_bytes = {}
+    for profile in ('source', 'speech_mp3', 'speech_opus'):
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, "tone.wav")
+            make_tone(source, 25)
+            transcriber = make_transcriber(work_dir, transcode_profile=profile)
+
+            original, _ = transcriber.transcribe_file(source, 'vietnamese')
+            uploaded_bytes[profile] = sum(transcriber.client.uploaded_sizes)
+
+            assert len(transcriber.client.uploaded_sizes) == 3, f"{profile}: expected 3 segments"
+            assert "<time>0:21 - 0:24</time>" in original
+
+    print(f"Uploaded bytes per profile: {uploaded_bytes}")
+    assert uploaded_bytes['speech_mp3'] * 2 < uploaded_bytes['source']
+    assert uploaded_bytes['speech_opus'] * 2 < uploaded_bytes['source']
+
+    print("✅ Transcode profile test passed!")
+
+
+def test_segment_plan_snaps_to_pauses_and_drops_long_silences():
+    """Cuts land on pauses near the 10-minute mark and long silences are left out."""
+    transcriber = make_transcriber(tempfile.gettempdir())
+    transcriber.segment_duration_ms = 10 * 60 * 1000
+
+    # Fixed cuts when there are no pauses
+    assert transcriber.build_segment_plan(25 * 60 * 1000, []) == [
+        [(0, 600000)], [(600000, 1200000)], [(1200000, 1500000)]
+    ]
+
+    silences = [(100000, 101000), (590000, 591000), (700000, 760000)]
+    plan = transcriber.build_segment_plan(1500000, silences)
+    print(f"Plan: {plan}")
+
+    # First cut snaps back to the pause at 9:50 instead of splitting a word at 10:00
+    assert plan[0] == [(0, 590500)]
+    # The 60s silence is dropped except 500ms of context at each edge
+    assert plan[1][0] == (590500, 700500)
+    assert plan[1][1][0] == 759500
+    kept_ms = sum(end - start for pieces in plan for start, end in pieces)
+    assert kept_ms == 1500000 - 59000
+    for pieces in plan:
+        assert sum(end - start for start, end in pieces) <= transcriber.segment_duration_ms
+
+    print("✅ Segment plan test passed!")
+
+
+def test_piecewise_offsets_map_to_source_time():
+    """Timestamps after a dropped silence are mapped back to absolute source times."""
+    transcriber = make_transcriber(tempfile.gettempdir())
+    offset_map = [(0, 60000), (8500, 87500)]
+
+    adjusted = transcriber.adjust_timestamps(
+        "<time>0:01 - 0:08</time> a\n<time>0:08 - 0:12</time> b", offset_map
+    )
+    print(adjusted)
+    assert "<time>1:01 - 1:08</time> a" in adjusted
+    # 0:08 starts in the first piece; 0:12 is 3.5s into the second piece
+    assert "<time>1:08 - 1:31</time> b" in adjusted
+    # Plain integer offsets keep working
+    assert transcriber.adjust_timestamps("<time>0:01 - 0:04</time>", 10000) == "<time>0:11 - 0:14</time>"
+
+    print("✅ Piecewise offset test passed!")
+
+
+def test_long_silence_is_not_uploaded():
+    """A recording with a long gap uploads only the speech and keeps absolute timestamps."""
+    for profile in ('source', 'speech_mp3'):
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, "meeting.wav")
+            make_speech_with_gap(source, speech_seconds=8, gap_seconds=20)
+            transcriber = make_transcriber(
+                work_dir, transcode_profile=profile,
+                client=EchoClient("<remove>false</remove><time>0:10 - 0:12</time> Xin chào")
+            )
+            transcriber.segment_duration_ms = 60 * 1000
+
+            original, _ = transcriber.transcribe_file(source, 'vietnamese')
+            uploaded_ms = transcriber.client.uploaded_durations
+
+            print(f"{profile}: uploaded {uploaded_ms}ms of 36000ms -> {original}")
+            assert len(uploaded_ms) == 1
+            assert 16000 <= uploaded_ms[0] <= 19000, "The 20s gap should be dropped"
+            # 0:10 in the upload is 1.5s into the second tone, which starts at 0:28 in the source
+            assert "<time>0:29 - 0:31</time>" in original
+
+    print("✅ Silence drop test passed!")
+
+
+def test_repeat_file_skips_transcoding_and_splitting():
+    """A file transcribed before is served from the file-level cache entry without running ffmpeg."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "tone.wav")
+        make_tone(source, 25)
+        transcriber = make_transcriber(work_dir, transcode_profile='speech_mp3')
+        first = transcriber.transcribe_file(source, 'vietnamese')
+        uploads = len(transcriber.client.uploaded_sizes)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("A file-level cache hit should not transcode, detect silence or cut")
+
+        transcriber.transcode_for_upload = fail
+        transcriber.plan_speech_segments = fail
+        transcriber.split_audio = fail
+        assert transcriber.transcribe_file(source, 'vietnamese') == first
+        assert len(transcriber.client.uploaded_sizes) == uploads
+
+        # Other settings or languages are a different file key
+        assert transcriber.file_cache_key(source, 'english') != transcriber.file_cache_key(source, 'vietnamese')
+        transcriber.transcode_profile = 'speech_opus'
+        try:
+            transcriber.transcribe_file(source, 'vietnamese')
+            raise AssertionError("A different transcode profile should miss the file-level entry")
+        except Exception as e:
+            assert "should not transcode" in str(e)
+
+    print("✅ File-level cache test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ffmpeg segmenting...")
+    print("="*60)
+
+    try:
+        test_split_is_lazy_and_covers_file()
+        test_transcribe_file_adjusts_offsets_and_cleans_up()
+        test_speech_profiles_shrink_uploads()
+        test_segment_plan_snaps_to_pauses_and_drops_long_silences()
+        test_piecewise_offsets_map_to_source_time()
+        test_long_silence_is_not_uploaded()
+        test_repeat_file_skips_transcoding_and_splitting()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared Gemini client registry.
+Runs offline: a local HTTP server stands in for the Gemini API.
+"""
+
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import gemini_clients
+from gemini_clients import GeminiClients, close_gemini_clients, get_gemini_clients
+from cut_audio import AudioSegmentTranscriber
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers every generateContent call and records the client port of each request."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    client_ports = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        FakeGeminiHandler.client_ports.append(self.client_address[1])
+        body = json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": "xin chào"}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_gemini():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_requests_reuse_pooled_connections():
+    """Sequential calls through the shared client reuse one keep-alive connection."""
+    server = start_fake_gemini()
+    FakeGeminiHandler.client_ports = []
+    try:
+        clients = GeminiClients(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}/")
+        for _ in range(5):
+            response = clients.client.models.generate_content(model="gemini-2.0-flash-lite", contents="chào")
+            assert response.text == "xin chào"
+        clients.close()
+    finally:
+        server.shutdown()
+
+    print(f"Client ports: {FakeGeminiHandler.client_ports}")
+    assert len(FakeGeminiHandler.client_ports) == 5
+    assert len(set(FakeGeminiHandler.client_ports)) == 1, "All requests should share one connection"
+
+    print("✅ Connection reuse test passed!")
+
+
+def test_pool_limits_from_environment():
+    """Pool size and keep-alive come from the environment unless passed explicitly."""
+    os.environ["GEMINI_MAX_CONNECTIONS"] = "7"
+    os.environ["GEMINI_KEEPALIVE_EXPIRY"] = "30"
+    try:
+        clients = GeminiClients(api_key="test-key", max_keepalive_connections=3)
+    finally:
+        del os.environ["GEMINI_MAX_CONNECTIONS"]
+        del os.environ["GEMINI_KEEPALIVE_EXPIRY"]
+
+    assert clients.limits.max_connections == 7
+    assert clients.limits.max_keepalive_connections == 3
+    assert clients.limits.keepalive_expiry == 30
+    clients.close()
+
+    print("✅ Pool configuration test passed!")
+
+
+def test_registry_is_shared_and_closed_by_lifespan():
+    """The app creates the registry at startup, every caller gets the same one, and shutdown closes it."""
+    import main
+
+    original_key = os.environ.get("GOOGLE_API_KEY")
+    os.environ["GOOGLE_API_KEY"] = "test-key"
+    close_gemini_clients()
+    try:
+        with TestClient(main.app) as client:
+            assert client.get("/").status_code == 200
+            clients = gemini_clients._clients
+            assert clients is not None, "Registry should be created at startup"
+            assert get_gemini_clients() is clients
+
+            # Transcribers without their own key reuse the shared client
+            assert AudioSegmentTranscriber(transcode_profile="source", cache=False).client is clients.client
+        assert gemini_clients._clients is None, "Registry should be closed at shutdown"
+    finally:
+        if original_key is None:
+            del os.environ["GOOGLE_API_KEY"]
+        else:
+            os.environ["GOOGLE_API_KEY"] = original_key
+
+    print("✅ Shared registry test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing shared Gemini clients...")
+    print("="*60)
+
+    try:
+        test_requests_reuse_pooled_connections()
+        test_pool_limits_from_environment()
+        test_registry_is_shared_and_closed_by_lifespan()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Test script for GeminiFileManager, the lifecycle manager of uploaded Gemini files.
+Runs offline: the Files API is replaced with an in-memory fake.
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from audio_fixtures import make_tone
+from gemini_files import GeminiFileManager
+from gemini_scheduler import GeminiScheduler
+from test_ffmpeg_segmenting import EchoClient, make_transcriber
+from test_gemini_scheduler import api_error
+
+
+class FakeFilesClient:
+    """In-memory Files API: upload, list and delete. Uploads fail with the queued errors first."""
+
+    def __init__(self, upload_seconds: float = 0.0, lifetime: timedelta = timedelta(hours=48), failures=()):
+        self.upload_seconds = upload_seconds
+        self.lifetime = lifetime
+        self.failures = list(failures)
+        self.attempts = 0
+        self.remote = {}
+        self.uploads = 0
+        self.deleted = []
+        self.lock = threading.Lock()
+        self.files = SimpleNamespace(upload=self.upload, delete=self.delete, list=self.list)
+
+    def upload(self, file, config=None):
+        with self.lock:
+            self.attempts += 1
+            failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        time.sleep(self.upload_seconds)
+        with self.lock:
+            self.uploads += 1
+            name = f"files/{self.uploads}"
+            now = datetime.now(timezone.utc)
+            self.remote[name] = SimpleNamespace(
+                name=name, display_name=config["display_name"], create_time=now, expiration_time=now + self.lifetime
+            )
+            return self.remote[name]
+
+    def delete(self, name):
+        with self.lock:
+            del self.remote[name]
+            self.deleted.append(name)
+
+    def list(self):
+        with self.lock:
+            return list(self.remote.values())
+
+
+def write_file(directory: str, name: str, content: bytes) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_reuses_handles_by_content():
+    """The same bytes are uploaded once, even from different paths; new content is uploaded."""
+    client = FakeFilesClient()
+    manager = GeminiFileManager(client, retention_seconds=60)
+    with tempfile.TemporaryDirectory() as work_dir:
+        first = manager.acquire(write_file(work_dir, "a.mp3", b"segment audio"))
+        manager.release(first)
+        second = manager.acquire(write_file(work_dir, "b.mp3", b"segment audio"))
+        other = manager.acquire(write_file(work_dir, "c.mp3", b"other audio"))
+
+    assert second is first
+    assert other is not first
+    stats = manager.stats()
+    print(f"Stats: {stats}")
+    assert stats["uploads"] == 2 and stats["reuses"] == 1 and stats["in_use"] == 2
+    assert first.display_name.startswith("idealthon-")
+    manager.close()
+
+    print("✅ Content reuse test passed!")
+
+
+def test_concurrent_acquires_share_one_upload():
+    """Threads asking for the same content at once wait for a single upload."""
+    client = FakeFilesClient(upload_seconds=0.1)
+    manager = GeminiFileManager(client, retention_seconds=60)
+    handles = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_file(work_dir, "a.mp3", b"segment audio")
+        threads = [threading.Thread(target=lambda: handles.append(manager.acquire(path))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert client.uploads == 1
+    assert len({handle.name for handle in handles}) == 1
+    assert manager.stats()["in_use"] == 1
+    manager.close()
+
+    print("✅ Shared upload test passed!")
+
+
+def test_idle_files_deleted_in_background():
+    """Released files are deleted after the retention time; files in use are kept."""
+    client = FakeFilesClient()
+    manager = GeminiFileManager(client, retention_seconds=0.1)
+    with tempfile.TemporaryDirectory() as work_dir:
+        released = manager.acquire(write_file(work_dir, "a.mp3", b"released"))
+        in_use = manager.acquire(write_file(work_dir, "b.mp3", b"in use"))
+    manager.release(released)
+
+    time.sleep(0.5)
+    print(f"Deleted: {client.deleted}")
+    assert client.deleted == [released.name]
+    assert in_use.name in client.remote
+
+    manager.release(in_use)
+    manager.close()
+    assert client.remote == {}, "close should delete every idle file"
+
+    print("✅ Background deletion test passed!")
+
+
+def test_handles_near_expiry_are_not_reused():
+    """A handle about to expire is replaced by a fresh upload and deleted once idle."""
+    client = FakeFilesClient(lifetime=timedelta(minutes=5))
+    manager = GeminiFileManager(client, retention_seconds=60)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_file(work_dir, "a.mp3", b"segment audio")
+        first = manager.acquire(path)
+        second = manager.acquire(path)
+        assert second is not first, "A handle expiring within the margin should not be reused"
+
+        manager.release(first)
+        manager.collect()
+        assert client.deleted == [first.name]
+
+    manager.release(second)
+    manager.close()
+
+    print("✅ Expiry test passed!")
+
+
+def test_sweep_deletes_only_old_untracked_files():
+    """The startup sweep removes stale prefixed files and leaves everything else alone."""
+    client = FakeFilesClient()
+    now = datetime.now(timezone.utc)
+    client.remote = {
+        "files/orphan": SimpleNamespace(name="files/orphan", display_name="idealthon-abc", create_time=now - timedelta(hours=3)),
+        "files/recent": SimpleNamespace(name="files/recent", display_name="idealthon-def", create_time=now),
+        "files/foreign": SimpleNamespace(name="files/foreign", display_name="other-app", create_time=now - timedelta(hours=3)),
+    }
+    manager = GeminiFileManager(client, retention_seconds=60, orphan_age_seconds=3600)
+    with tempfile.TemporaryDirectory() as work_dir:
+        tracked = manager.acquire(write_file(work_dir, "a.mp3", b"tracked"))
+    tracked.create_time = now - timedelta(hours=3)
+
+    assert manager.sweep_orphans() == 1
+    assert client.deleted == ["files/orphan"]
+    manager.release(tracked)
+    manager.close()
+
+    print("✅ Orphan sweep test passed!")
+
+
+def test_rate_limited_upload_is_retried():
+    """A 429 or 503 from the Files API is retried by the scheduler, waiting as long as the API asks."""
+    client = FakeFilesClient(failures=[api_error(429, retry_after="0.3"), api_error(503)])
+    scheduler = GeminiScheduler(backoff_base_seconds=0.01)
+    manager = GeminiFileManager(client, retention_seconds=60, scheduler=scheduler)
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.monotonic()
+        uploaded = manager.acquire(write_file(work_dir, "a.mp3", b"segment audio"))
+        elapsed = time.monotonic() - start
+
+    stats = scheduler.stats()
+    print(f"Upload took {elapsed:.2f}s over {client.attempts} attempts, scheduler stats {stats}")
+    assert uploaded.name == "files/1" and client.attempts == 3
+    assert elapsed >= 0.3, "The Retry-After delay should be honored"
+    assert stats["requests"] == 3 and stats["retries"] == 2 and stats["rate_limited"] == 1
+    assert manager.stats()["uploads"] == 1
+    manager.close()
+
+    # Errors that retrying cannot fix still fail the upload, and leave nothing tracked
+    client = FakeFilesClient(failures=[api_error(400)])
+    manager = GeminiFileManager(client, scheduler=GeminiScheduler(backoff_base_seconds=0.01))
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            manager.acquire(write_file(work_dir, "a.mp3", b"segment audio"))
+            raise AssertionError("A 400 should not be retried")
+        except Exception as e:
+            assert getattr(e, "code", None) == 400
+    assert client.attempts == 1 and manager.stats()["tracked_files"] == 0
+    manager.close()
+
+    print("✅ Upload retry test passed!")
+
+
+def test_transcriber_releases_and_reuses_uploads():
+    """transcribe_file releases every upload, and a second language reuses them instead of re-uploading."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "tone.wav")
+        make_tone(source, 25)
+        client = EchoClient()
+        transcriber = make_transcriber(work_dir, client=client)
+
+        transcriber.transcribe_file(source, 'vietnamese')
+        uploads_after_first = len(client.uploaded_sizes)
+        transcriber.transcribe_file(source, 'english')
+        stats = transcriber.file_manager.stats()
+
+        print(f"Uploads: {len(client.uploaded_sizes)}, file stats: {stats}")
+        assert uploads_after_first == 3
+        assert len(client.uploaded_sizes) == 3, "Same segments in another language should reuse the uploads"
+        assert stats["reuses"] == 3 and stats["in_use"] == 0
+
+        transcriber.file_manager.close()
+        assert len(client.deleted) == 3
+
+    print("✅ Transcriber file lifecycle test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Gemini file lifecycle...")
+    print("="*60)
+
+    try:
+        test_reuses_handles_by_content()
+        test_concurrent_acquires_share_one_upload()
+        test_idle_files_deleted_in_background()
+        test_handles_near_expiry_are_not_reused()
+        test_sweep_deletes_only_old_untracked_files()
+        test_rate_limited_upload_is_retried()
+        test_transcriber_releases_and_reuses_uploads()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test script for the rate-limited Gemini scheduler.
+
+Runs offline: calls go to FakeGeminiClients that sleep, fail with canned API errors, or count calls.
+"""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from google.genai import errors
+
+from fake_gemini import FakeGeminiClient
+from gemini_scheduler import GeminiScheduler
+from test_fake_gemini import INSTANT
+
+
+def api_error(code, retry_after=None, retry_delay=None):
+    details = []
+    if retry_delay:
+        details.append({"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay})
+    response_json = {"error": {"code": code, "message": "canned error", "status": "UNAVAILABLE", "details": details}}
+    headers = {"retry-after": retry_after} if retry_after else {}
+    error_type = errors.ClientError if code < 500 else errors.ServerError
+    return error_type(code, response_json, httpx.Response(code, headers=headers))
+
+
+def fake_client(failures=(), latency="fixed:0", responder=None) -> FakeGeminiClient:
+    """A fake client answering "answer to <prompt>" after latency, failing with the queued errors first."""
+    client = FakeGeminiClient(
+        responder=responder or (lambda contents: f"answer to {contents}"), **{**INSTANT, "latency": latency}
+    )
+    client.backend.fail_next(*failures)
+    return client
+
+
+def calls(client: FakeGeminiClient, kind: str = "generate_content") -> int:
+    return client.backend.stats().get(kind, 0)
+
+
+def test_request_rate_limit():
+    """Calls beyond the request budget wait for the bucket to refill."""
+    scheduler = GeminiScheduler(requests_per_minute=5, tokens_per_minute=0, period_seconds=1.0)
+    client = fake_client()
+
+    start = time.monotonic()
+    for index in range(10):
+        scheduler.generate_content(client, model="gemini-test", contents=f"prompt {index}")
+    elapsed = time.monotonic() - start
+
+    print(f"10 calls at 5 per second: {elapsed:.2f}s, stats {scheduler.stats()}")
+    # The first 5 go out at once, the other 5 are spread over the next second
+    assert 0.8 <= elapsed < 2.0
+    assert scheduler.stats()["throttled_seconds"] > 0
+
+    # Each model has its own quota
+    start = time.monotonic()
+    scheduler.generate_content(client, model="other-model", contents="prompt")
+    assert time.monotonic() - start < 0.1
+
+    print("✅ Request rate limit test passed!")
+
+
+def test_token_rate_limit_and_usage():
+    """Token usage reported by the API is charged, so later calls wait for it."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=1000, period_seconds=1.0)
+    # A short prompt is estimated at a few tokens but the response reports about 1500
+    client = fake_client(responder=lambda contents: "x" * 6000)
+
+    scheduler.generate_content(client, model="gemini-test", contents="short")
+    start = time.monotonic()
+    scheduler.generate_content(client, model="gemini-test", contents="short again")
+    elapsed = time.monotonic() - start
+
+    print(f"Call after a 1500-token response: waited {elapsed:.2f}s")
+    # The bucket is 500 tokens in debt, so the next call waits about half a second
+    assert 0.35 <= elapsed < 1.5
+
+    assert scheduler.estimate_tokens("x" * 400) == 101
+    assert scheduler.estimate_tokens(["x" * 40, SimpleNamespace(name="files/abc")]) == 11 + scheduler.file_part_tokens
+
+    print("✅ Token rate limit test passed!")
+
+
+def test_retries_honor_retry_after():
+    """429 and 5xx errors are retried, waiting at least as long as the API asks."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base_seconds=0.01)
+    client = fake_client(failures=[api_error(429, retry_after="0.3"), api_error(503, retry_delay="0.2s")])
+
+    start = time.monotonic()
+    response = scheduler.generate_content(client, model="gemini-test", contents="xin chào")
+    elapsed = time.monotonic() - start
+
+    stats = scheduler.stats()
+    print(f"Succeeded after {elapsed:.2f}s, stats {stats}")
+    assert response.text == "answer to xin chào"
+    assert calls(client) == 3
+    assert elapsed >= 0.5
+    assert stats["retries"] == 2 and stats["rate_limited"] == 1 and stats["failures"] == 0
+
+    assert GeminiScheduler.retry_after_seconds(api_error(429, retry_after="7")) == 7
+    assert GeminiScheduler.retry_after_seconds(api_error(429, retry_delay="17s")) == 17
+    assert GeminiScheduler.retry_after_seconds(api_error(429)) is None
+
+    print("✅ Retry-After test passed!")
+
+
+def test_rate_limit_pauses_other_callers():
+    """A 429 with Retry-After holds back every caller of the model, not just the rejected one."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base_seconds=0.01)
+    client = fake_client(failures=[api_error(429, retry_after="0.4")])
+
+    first = threading.Thread(target=scheduler.generate_content, args=(client,),
+                             kwargs={"model": "gemini-test", "contents": "first"})
+    first.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    scheduler.generate_content(client, model="gemini-test", contents="second")
+    waited = time.monotonic() - start
+    first.join()
+
+    print(f"Second caller waited {waited:.2f}s")
+    assert waited >= 0.2
+
+    print("✅ Shared pause test passed!")
+
+
+def test_non_retryable_and_exhausted():
+    """Client errors are raised at once; transient errors are raised once retries run out."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=2, backoff_base_seconds=0.01)
+
+    client = fake_client(failures=[api_error(400)])
+    try:
+        scheduler.generate_content(client, model="gemini-test", contents="bad")
+        raise AssertionError("400 should not be retried")
+    except errors.ClientError as e:
+        assert e.code == 400
+    assert calls(client) == 1
+
+    client = fake_client(failures=[api_error(500)] * 5)
+    try:
+        scheduler.generate_content(client, model="gemini-test", contents="flaky")
+        raise AssertionError("Should give up after max_retries")
+    except errors.ServerError:
+        pass
+    assert calls(client) == 3
+    assert scheduler.stats()["failures"] == 2
+
+    print("✅ Non-retryable and exhausted retries test passed!")
+
+
+def test_identical_requests_are_coalesced():
+    """Concurrent identical prompts share one call; different prompts do not."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0)
+    client = fake_client(latency="fixed:0.3")
+    results = []
+
+    def call(prompt):
+        results.append(scheduler.generate_content(client, model="gemini-test", contents=prompt))
+
+    threads = [threading.Thread(target=call, args=("cùng một câu hỏi",)) for _ in range(5)]
+    threads.append(threading.Thread(target=call, args=("câu hỏi khác",)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"Calls: {calls(client)}, stats {scheduler.stats()}")
+    assert calls(client) == 2
+    assert sum(1 for result in results if result.text == "answer to cùng một câu hỏi") == 5
+    assert scheduler.stats()["coalesced"] == 4
+    assert scheduler.stats()["in_flight"] == 0
+
+    # Once finished, the same prompt is sent again
+    scheduler.generate_content(client, model="gemini-test", contents="cùng một câu hỏi")
+    assert calls(client) == 3
+
+    print("✅ Coalescing test passed!")
+
+
+def test_stream_retries_before_first_chunk():
+    """A stream that fails before its first chunk is retried."""
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base_seconds=0.01)
+    client = fake_client(failures=[api_error(503)], responder=lambda contents: ["một", "hai"])
+
+    chunks = [chunk.text for chunk in scheduler.generate_content_stream(client, model="gemini-test", contents="x")]
+    assert chunks == ["một", "hai"]
+    assert calls(client, "generate_content_stream") == 2
+
+    print("✅ Stream retry test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Gemini scheduler...")
+    print("="*60)
+
+    try:
+        test_request_rate_limit()
+        test_token_rate_limit_and_usage()
+        test_retries_honor_retry_after()
+        test_rate_limit_pauses_other_callers()
+        test_non_retryable_and_exhausted()
+        test_identical_requests_are_coalesced()
+        test_stream_retries_before_first_chunk()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
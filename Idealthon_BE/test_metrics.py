@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the stage metrics and the Prometheus /metrics endpoint.
+
+Runs offline: Gemini calls go to the fake backend (GEMINI_BACKEND=fake).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+from fake_gemini import FakeGeminiClient
+from gemini_clients import close_gemini_clients
+from gemini_scheduler import GeminiScheduler
+from metrics import (
+    GEMINI_REQUESTS, GEMINI_TOKENS, STAGE_DURATION, STAGE_ERRORS, STAGE_IN_FLIGHT,
+    Counter, Gauge, Histogram, MetricsRegistry, span
+)
+
+
+def test_render_format():
+    """Counters, gauges and histograms render in the Prometheus text format."""
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("test_requests_total", "Requests.", ["path"]))
+    in_flight = registry.register(Gauge("test_in_flight", "In flight."))
+    duration = registry.register(Histogram("test_duration_seconds", "Duration.", ["stage"], buckets=(0.1, 1)))
+
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    duration.observe(0.05, stage="x")
+    duration.observe(0.5, stage="x")
+    duration.observe(5, stage="x")
+
+    text = registry.render()
+    print(text)
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{path="/a\\"b"} 3' in text
+    assert "test_in_flight 1" in text
+    assert 'test_duration_seconds_bucket{stage="x",le="0.1"} 1' in text
+    assert 'test_duration_seconds_bucket{stage="x",le="1"} 2' in text
+    assert 'test_duration_seconds_bucket{stage="x",le="+Inf"} 3' in text
+    assert 'test_duration_seconds_sum{stage="x"} 5.55' in text
+    assert 'test_duration_seconds_count{stage="x"} 3' in text
+
+    for bad_call in (lambda: requests.inc(-1, path="/"), lambda: requests.inc(), lambda: registry.register(Counter("test_in_flight", "Again."))):
+        try:
+            bad_call()
+            raise AssertionError("Should be rejected")
+        except ValueError:
+            pass
+
+    print("✅ Render format test passed!")
+
+
+def test_span():
+    """Spans record durations, errors and in-flight counts."""
+    count = STAGE_DURATION.count(stage="test_stage")
+    errors = STAGE_ERRORS.value(stage="test_stage")
+
+    with span("test_stage"):
+        assert STAGE_IN_FLIGHT.value(stage="test_stage") == 1
+    try:
+        with span("test_stage"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert STAGE_DURATION.count(stage="test_stage") == count + 2
+    assert STAGE_ERRORS.value(stage="test_stage") == errors + 1
+    assert STAGE_IN_FLIGHT.value(stage="test_stage") == 0
+
+    print("✅ Span test passed!")
+
+
+def test_scheduler_metrics():
+    """Scheduler calls are counted by outcome along with the tokens they used."""
+    client = FakeGeminiClient(latency="fixed:0", error_rate=0.5, error_codes=[503], seed=3)
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=20, backoff_base_seconds=0.001)
+    model = "gemini-metrics-test"
+
+    for index in range(5):
+        scheduler.generate_content(client, model=model, contents=f"Viết bài {index}")
+
+    stats = scheduler.stats()
+    print(f"Scheduler stats: {stats}")
+    assert GEMINI_REQUESTS.value(model=model, outcome="success") == 5
+    assert GEMINI_REQUESTS.value(model=model, outcome="retried") == stats["retries"]
+    assert GEMINI_TOKENS.value(model=model, kind="prompt") > 0
+    assert GEMINI_TOKENS.value(model=model, kind="output") > 0
+
+    print("✅ Scheduler metrics test passed!")
+
+
+def test_metrics_endpoint():
+    """/metrics exposes stage, HTTP and job metrics after requests go through the app."""
+    saved = {name: os.environ.get(name) for name in ("GEMINI_BACKEND", "FAKE_GEMINI_LATENCY")}
+    os.environ.update(GEMINI_BACKEND="fake", FAKE_GEMINI_LATENCY="fixed:0")
+    close_gemini_clients()
+    try:
+        import main
+        with TestClient(main.app) as client:
+            response = client.post("/generate-content", json={"format": "blog", "idea_text": "Ý tưởng đo lường"})
+            assert response.status_code == 200, response.text
+            assert client.get("/video-transcript/jobs/missing").status_code == 404
+
+            response = client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+            text = response.text
+    finally:
+        close_gemini_clients()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert 'idealthon_stage_duration_seconds_count{stage="content_generation"}' in text
+    assert 'idealthon_http_request_duration_seconds_count{method="POST",route="/generate-content",status="200"}' in text
+    # Route templates, not raw paths, keep job ids out of the label values
+    assert 'route="/video-transcript/jobs/{job_id}",status="404"' in text
+    assert 'idealthon_transcription_jobs{status="queued"}' in text
+    assert 'idealthon_gemini_requests_total{model="gemini-2.0-flash-lite",outcome="success"}' in text
+
+    print("✅ Metrics endpoint test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing metrics...")
+    print("="*60)
+
+    try:
+        test_render_format()
+        test_span()
+        test_scheduler_metrics()
+        test_metrics_endpoint()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
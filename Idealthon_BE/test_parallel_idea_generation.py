@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent idea generation in /generate-ideas.
+Runs offline: generate_ideas_with_ai is replaced with a coroutine that sleeps.
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from main import IdeaGenerationRequest, TranscriptItem
+
+CALL_LATENCY = 0.2
+
+
+def build_request(paragraph_count: int) -> IdeaGenerationRequest:
+    # Each transcript item is long enough to become its own paragraph
+    items = [
+        TranscriptItem(
+            timestamp=f"{i}:00-{i}:30",
+            transcript=f"Đoạn {i}: " + "nội dung dài " * 20,
+            remove=False
+        )
+        for i in range(paragraph_count)
+    ]
+    return IdeaGenerationRequest(data=items)
+
+
+async def fake_generate_ideas_with_ai(paragraph_data):
+    await asyncio.sleep(CALL_LATENCY)
+    if paragraph_data['timestamp'].startswith('3:'):
+        raise RuntimeError("simulated Gemini failure")
+    return {
+        'paragraph': paragraph_data['paragraph'],
+        'timestamp': paragraph_data['timestamp'],
+        'main_idea': f"Ý tưởng {paragraph_data['timestamp']}",
+        'sub_idea': 'phụ',
+        'supporting_ideas': ['phụ'],
+        'format': 'blog'
+    }
+
+
+def test_parallel_generation_keeps_order_and_fallback():
+    """Paragraphs run concurrently, stay in order, and a failure uses the fallback idea."""
+    original_generate = main.generate_ideas_with_ai
+    main.generate_ideas_with_ai = fake_generate_ideas_with_ai
+    try:
+        start = time.time()
+        response = asyncio.run(main.generate_ideas(build_request(8)))
+        elapsed = time.time() - start
+    finally:
+        main.generate_ideas_with_ai = original_generate
+
+    print(f"Generated {len(response.data)} ideas in {elapsed:.2f}s")
+
+    assert len(response.data) == 8, f"Expected 8 ideas, got {len(response.data)}"
+    for i, idea in enumerate(response.data):
+        assert idea.timestamp.startswith(f"{i}:00"), f"Idea {i} out of order: {idea.timestamp}"
+    assert response.data[3].supporting_ideas == ['Cơ hội phát triển nội dung từ đoạn transcript này'], \
+        "Failed paragraph should use the fallback idea"
+    assert response.data[2].main_idea == "Ý tưởng 2:00-2:30"
+    assert elapsed < CALL_LATENCY * 4, "Paragraphs should be generated concurrently"
+
+    print("✅ Parallel idea generation test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing parallel idea generation...")
+    print("="*60)
+
+    try:
+        test_parallel_generation_keeps_order_and_fallback()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
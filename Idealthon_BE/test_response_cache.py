@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the idea/content response cache.
+Runs offline: the shared Gemini client is replaced with a FakeGeminiClient, which counts calls.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from fake_gemini import FakeGeminiClient
+from response_cache import ResponseCache
+from test_fake_gemini import INSTANT
+
+
+def test_lru_and_ttl():
+    """The memory tier evicts least recently used entries and expires old ones."""
+    cache = ResponseCache("test", max_entries=2, ttl_seconds=0.2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None, "Least recently used entry should be evicted"
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    time.sleep(0.25)
+    assert cache.get("a") is None, "Expired entry should be a miss"
+
+    stats = cache.stats()
+    print(f"Cache stats: {stats}")
+    assert stats["memory_hits"] == 3 and stats["misses"] == 2
+
+    print("✅ LRU/TTL test passed!")
+
+
+def test_disk_tier_survives_restart():
+    """Entries written to the disk tier are served by a new cache instance."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        ResponseCache("content", cache_dir=cache_dir).set("key", {"content": "xin chào"})
+
+        reopened = ResponseCache("content", cache_dir=cache_dir)
+        assert reopened.get("key") == {"content": "xin chào"}
+        assert reopened.get("key") == {"content": "xin chào"}
+        assert reopened.stats()["disk_hits"] == 1, "Second lookup should come from memory"
+
+    print("✅ Disk tier test passed!")
+
+
+def test_content_key_normalization():
+    """Whitespace and sub idea order do not change the content key."""
+    key = main.content_cache_key("blog", "Sống  xanh\n", ["b", "a"])
+    assert key == main.content_cache_key("blog", "Sống xanh", ["a", "b"])
+    assert key != main.content_cache_key("post", "Sống xanh", ["a", "b"])
+
+    print("✅ Key normalization test passed!")
+
+
+def test_repeated_requests_skip_model():
+    """Repeated idea and content requests are served without calling Gemini."""
+    client = FakeGeminiClient(**INSTANT)
+    original_get_clients = main.get_gemini_clients
+    main.get_gemini_clients = lambda: SimpleNamespace(client=client)
+    paragraph = {'paragraph': 'Một đoạn văn cache', 'timestamp': '0:00-0:30'}
+    moved_paragraph = {'paragraph': 'Một  đoạn văn cache ', 'timestamp': '5:00-5:30'}
+    try:
+        first_idea = asyncio.run(main.generate_ideas_with_ai(paragraph))
+        second_idea = asyncio.run(main.generate_ideas_with_ai(moved_paragraph))
+        first_content = asyncio.run(main.generate_content_with_ai("infographic", "Ý tưởng cache", ["x", "y"]))
+        second_content = asyncio.run(main.generate_content_with_ai("infographic", "Ý tưởng cache", ["y", "x"]))
+    finally:
+        main.get_gemini_clients = original_get_clients
+
+    calls = client.backend.stats()["generate_content"]
+    print(f"Model calls: {calls}")
+    assert calls == 2, f"Expected 2 model calls, got {calls}"
+    assert second_idea['main_idea'] == first_idea['main_idea']
+    assert second_idea['timestamp'] == '5:00-5:30', "Cached idea should keep the request timestamp"
+    assert first_content == second_content and first_content.startswith("## Phần 1")
+
+    print("✅ Repeated request test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing response cache...")
+    print("="*60)
+
+    try:
+        test_lru_and_ttl()
+        test_disk_tier_survives_restart()
+        test_content_key_normalization()
+        test_repeated_requests_skip_model()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for StagePipeline, the staged encode/upload/transcribe/translate runner.
+Runs offline: stages are plain functions that sleep.
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import StagePipeline
+
+STAGE_LATENCY = 0.1
+
+
+def sleep_stage(seconds: float):
+    def stage(item):
+        time.sleep(seconds)
+        return item
+    return stage
+
+
+def test_results_in_source_order():
+    """Items finishing out of order are yielded in source order."""
+    def uneven(item):
+        time.sleep(0.01 * (10 - item))
+        return item * 10
+
+    pipeline = StagePipeline([("double", uneven, 4), ("identity", lambda item: item, 2)], queue_size=2)
+    results = list(pipeline.run(range(10)))
+
+    print(f"Results: {results}")
+    assert results == [item * 10 for item in range(10)]
+
+    print("✅ Source order test passed!")
+
+
+def test_stages_overlap():
+    """With one worker per stage, total time is close to the slowest stage, not the sum."""
+    items = 6
+    pipeline = StagePipeline(
+        [(name, sleep_stage(STAGE_LATENCY), 1) for name in ("upload", "transcribe", "translate")],
+        queue_size=2,
+        source_name="encode"
+    )
+
+    def source():
+        for item in range(items):
+            time.sleep(STAGE_LATENCY)
+            yield item
+
+    start = time.time()
+    assert list(pipeline.run(source())) == list(range(items))
+    elapsed = time.time() - start
+
+    serial_time = items * 4 * STAGE_LATENCY
+    print(f"Pipelined: {elapsed:.2f}s, serial chain would take {serial_time:.2f}s")
+    assert elapsed < serial_time / 2, "Stages should overlap"
+
+    stats = pipeline.stats()
+    print(f"Stats: {stats}")
+    for name in ("encode", "upload", "transcribe", "translate"):
+        assert stats[name]["items"] == items
+        assert abs(stats[name]["mean_ms"] - STAGE_LATENCY * 1000) < 50
+
+    print("✅ Stage overlap test passed!")
+
+
+def test_bounded_queues_backpressure():
+    """The source is not consumed far ahead of a slow stage."""
+    produced = []
+    queue_size = 2
+
+    def source():
+        for item in range(20):
+            produced.append(item)
+            yield item
+
+    pipeline = StagePipeline([("slow", sleep_stage(0.05), 1)], queue_size=queue_size)
+    results = pipeline.run(source())
+    first = next(results)
+    time.sleep(0.02)
+
+    # One item in the stage, queue_size queued, one held by the feeder waiting for room
+    print(f"Produced {len(produced)} items after the first result")
+    assert first == 0
+    assert len(produced) <= queue_size + 3, f"Source ran ahead: {len(produced)} items produced"
+    assert list(results) == list(range(1, 20))
+
+    print("✅ Backpressure test passed!")
+
+
+def test_failure_discards_remaining_items():
+    """A failing stage stops the pipeline, raises, and hands unfinished items to on_discard."""
+    discarded = []
+    lock = threading.Lock()
+
+    def on_discard(item):
+        with lock:
+            discarded.append(item)
+
+    def fail_on_three(item):
+        time.sleep(0.01)
+        if item == 3:
+            raise RuntimeError("upload failed")
+        return item
+
+    pipeline = StagePipeline(
+        [("upload", fail_on_three, 2), ("transcribe", sleep_stage(0.05), 1)],
+        queue_size=2,
+        on_discard=on_discard
+    )
+    produced = []
+
+    def source():
+        for item in range(50):
+            produced.append(item)
+            yield item
+
+    yielded = []
+    try:
+        for item in pipeline.run(source()):
+            yielded.append(item)
+        raise AssertionError("Expected the stage error to be raised")
+    except RuntimeError as e:
+        assert str(e) == "upload failed"
+
+    print(f"Yielded {yielded}, produced {len(produced)}, discarded {sorted(discarded)}")
+    assert 3 not in yielded
+    assert len(produced) < 50, "Feeding should stop after the failure"
+    # Every produced item was either yielded or discarded
+    assert sorted(yielded + discarded) == produced
+
+    print("✅ Failure handling test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing staged pipeline...")
+    print("="*60)
+
+    try:
+        test_results_in_source_order()
+        test_stages_overlap()
+        test_bounded_queues_backpressure()
+        test_failure_discards_remaining_items()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
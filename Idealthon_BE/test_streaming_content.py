@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming /generate-content/stream endpoint.
+Runs offline: the shared Gemini client is replaced with a FakeGeminiClient streaming scripted chunks.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import main
+from fake_gemini import FakeGeminiClient
+from test_fake_gemini import INSTANT
+
+CHUNKS = ["# Tiêu đề\n\n", "Phần mở đầu ", "và nội dung chính."]
+
+
+def streaming_client(texts=CHUNKS, fail: bool = False, chunk_seconds: float = 0.0) -> FakeGeminiClient:
+    """A fake client answering every prompt with texts (as stream chunks), or failing every call with a 400."""
+    settings = {**INSTANT, "chunk_latency": f"fixed:{chunk_seconds}"}
+    if fail:
+        settings.update(error_rate=1.0, error_codes=[400])
+    return FakeGeminiClient(responder=lambda contents: texts, **settings)
+
+
+def parse_sse(body: str):
+    events = []
+    for message in body.strip().split('\n\n'):
+        event = 'message'
+        data = None
+        for line in message.split('\n'):
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+        events.append((event, data))
+    return events
+
+
+async def post(path: str, payload: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(path, json=payload)
+
+
+def run_with_fake_model(path: str, payload: dict, fail: bool = False) -> httpx.Response:
+    original_get_clients = main.get_gemini_clients
+    client = streaming_client(fail=fail)
+    main.get_gemini_clients = lambda: SimpleNamespace(client=client)
+    try:
+        return asyncio.run(post(path, payload))
+    finally:
+        main.get_gemini_clients = original_get_clients
+
+
+def test_stream_forwards_chunks():
+    """Each Gemini chunk becomes one SSE message, followed by a done event with timings."""
+    response = run_with_fake_model("/generate-content/stream", {"format": "blog", "idea_text": "Sống xanh"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    print(f"Received events: {[event for event, _ in events]}")
+
+    texts = [data["text"] for event, data in events if event == "message"]
+    assert texts == CHUNKS, f"Unexpected chunks: {texts}"
+    assert events[-1][0] == "done"
+    assert events[-1][1]["characters"] == len(''.join(CHUNKS))
+    assert "ttfb_ms" in events[-1][1]
+
+    print("✅ Streaming chunks test passed!")
+
+
+def collect_stream(client: FakeGeminiClient, idea_text: str, limit: int = None) -> list:
+    """Consume stream_content_with_ai with client as the shared client, stopping after limit chunks."""
+    async def consume():
+        chunks = []
+        stream = main.stream_content_with_ai("blog", idea_text)
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                if limit is not None and len(chunks) >= limit:
+                    break
+        finally:
+            await stream.aclose()
+        # Give the worker thread time to notice a disconnect
+        await asyncio.sleep(0.3)
+        return chunks
+
+    original_get_clients = main.get_gemini_clients
+    main.get_gemini_clients = lambda: SimpleNamespace(client=client)
+    try:
+        return asyncio.run(consume())
+    finally:
+        main.get_gemini_clients = original_get_clients
+
+
+def test_disconnect_stops_reading_the_stream():
+    """Closing the stream early stops the worker thread and caches nothing."""
+    idea_text = f"Ngắt kết nối {time.time()}"
+    client = streaming_client([f"đoạn {index} " for index in range(50)], chunk_seconds=0.02)
+    chunks = collect_stream(client, idea_text, limit=1)
+
+    produced = client.backend.stats()["stream_chunks"]
+    print(f"Chunks produced after disconnecting at 1: {produced}")
+    assert chunks == ["đoạn 0 "]
+    assert produced < 10, "The worker should stop reading once the client is gone"
+    cache_key = main.content_cache_key("blog", idea_text, None)
+    assert main.content_cache.get(cache_key) is None, "A partial stream should not be cached"
+
+    print("✅ Stream cancellation test passed!")
+
+
+def test_blank_stream_is_not_cached():
+    """A stream that finishes with only whitespace is not cached; a complete one is."""
+    idea_text = f"Trống {time.time()}"
+    assert collect_stream(streaming_client(["  ", "\n"]), idea_text) == ["  ", "\n"]
+    assert main.content_cache.get(main.content_cache_key("blog", idea_text, None)) is None
+
+    collect_stream(streaming_client(), idea_text)
+    assert main.content_cache.get(main.content_cache_key("blog", idea_text, None)) == ''.join(CHUNKS)
+
+    print("✅ Blank stream cache test passed!")
+
+
+def test_stream_uses_fallback_before_first_chunk():
+    """A failure before any chunk is sent falls back to the same content as the JSON endpoint."""
+    response = run_with_fake_model("/generate-content/stream", {"format": "video", "idea_text": "Sống xanh"}, fail=True)
+    events = parse_sse(response.text)
+
+    assert events[0][0] == "message"
+    assert events[0][1]["text"] == main.get_fallback_content("video", "Sống xanh")
+    assert events[-1][0] == "done"
+
+    print("✅ Streaming fallback test passed!")
+
+
+def test_stream_validates_request():
+    """Invalid requests are rejected before streaming starts."""
+    response = run_with_fake_model("/generate-content/stream", {"format": "podcast", "idea_text": "Sống xanh"})
+    assert response.status_code == 400
+
+    print("✅ Streaming validation test passed!")
+
+
+def test_json_endpoint_still_available():
+    """The existing JSON endpoint keeps returning the complete content."""
+    response = run_with_fake_model("/generate-content", {"format": "post", "idea_text": "Sống xanh"})
+    assert response.status_code == 200
+    assert response.json() == {"content": ''.join(CHUNKS)}
+
+    print("✅ JSON endpoint test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing streaming content generation...")
+    print("="*60)
+
+    try:
+        test_stream_forwards_chunks()
+        test_disconnect_stops_reading_the_stream()
+        test_blank_stream_is_not_cached()
+        test_stream_uses_fallback_before_first_chunk()
+        test_stream_validates_request()
+        test_json_endpoint_still_available()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
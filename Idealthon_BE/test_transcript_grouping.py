@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the transcript grouping policies in transcript_grouping.py.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_grouping import (
+    CombinedPolicy, MaxSegments, TimeGapSplit, TokenBudget, group_segments, parse_grouping_policy, timestamp_to_seconds
+)
+from main import TranscriptItem, group_transcript_segments
+
+
+def make_item(timestamp, transcript, original_transcript="", language="vietnamese"):
+    return TranscriptItem(
+        timestamp=timestamp,
+        transcript=transcript,
+        original_transcript=original_transcript,
+        language=language,
+        remove=False
+    )
+
+
+def test_default_character_budget():
+    """The default policy closes a paragraph once its joined text reaches 200 characters."""
+    items = [make_item(f"0:{index * 5:02d}-0:{index * 5 + 5:02d}", "x" * 60, f"word {index}", "english")
+             for index in range(7)]
+    # Out of order input is sorted by start time
+    paragraphs = group_transcript_segments(list(reversed(items)))
+
+    print(f"Paragraphs: {[(p['timestamp'], len(p['paragraph'])) for p in paragraphs]}")
+    # 60 + 61 + 61 = 182 < 200, the fourth segment brings it to 243
+    assert [len(p['items']) for p in paragraphs] == [4, 3]
+    assert paragraphs[0]['timestamp'] == "0:00-0:20"
+    assert paragraphs[1]['timestamp'] == "0:20-0:35"
+    assert paragraphs[0]['paragraph'] == ' '.join(["x" * 60] * 4)
+    assert paragraphs[0]['original_paragraph'] == "word 0 word 1 word 2 word 3"
+    assert paragraphs[0]['language'] == "english"
+
+    assert group_transcript_segments([]) == []
+
+    print("✅ Default character budget test passed!")
+
+
+def test_policies():
+    """Token, time gap and segment count policies split where expected, alone and combined."""
+    items = [
+        make_item("0:00-0:04", "một hai ba"),
+        make_item("0:04-0:08", "bốn năm"),
+        make_item("0:20-0:24", "sáu bảy tám chín"),
+        make_item("0:24-0:28", "mười"),
+        make_item("0:28-0:30", "mười một")
+    ]
+
+    def sizes(policy):
+        return [len(paragraph['items']) for paragraph in group_segments(items, policy)]
+
+    assert sizes(TokenBudget(5)) == [2, 2, 1]
+    assert sizes(TimeGapSplit(5)) == [2, 3]
+    assert sizes(MaxSegments(2)) == [2, 2, 1]
+    assert sizes(CombinedPolicy([TimeGapSplit(5), MaxSegments(2)])) == [2, 2, 1]
+    assert sizes(CombinedPolicy([TokenBudget(100), TimeGapSplit(30)])) == [5]
+
+    paragraphs = group_segments(items, TimeGapSplit(5))
+    assert paragraphs[1]['timestamp'] == "0:20-0:30"
+    assert paragraphs[1]['paragraph'] == "sáu bảy tám chín mười mười một"
+
+    print("✅ Policies test passed!")
+
+
+def test_parse_grouping_policy():
+    """Specs name one or more policies with optional limits; bad specs are rejected."""
+    policy = parse_grouping_policy("chars:500")
+    assert policy.max_characters == 500
+
+    policy = parse_grouping_policy("tokens:80, gap:5 ,segments")
+    assert isinstance(policy, CombinedPolicy)
+    assert [type(p).__name__ for p in policy.policies] == ["TokenBudget", "TimeGapSplit", "MaxSegments"]
+    assert policy.policies[2].max_segments == 10
+    assert policy.counts_tokens and policy.tracks_end_time
+
+    for spec in ("words:10", "chars:many", " , "):
+        try:
+            parse_grouping_policy(spec)
+        except ValueError as e:
+            print(f"Rejected '{spec}': {e}")
+        else:
+            raise AssertionError(f"Spec '{spec}' should be rejected")
+
+    os.environ["TRANSCRIPT_GROUPING"] = "segments:3"
+    try:
+        assert parse_grouping_policy().max_segments == 3
+    finally:
+        del os.environ["TRANSCRIPT_GROUPING"]
+    assert parse_grouping_policy().max_characters == 200
+
+    print("✅ Policy spec test passed!")
+
+
+def test_timestamp_to_seconds():
+    """Timestamps are parsed once into integer seconds."""
+    assert timestamp_to_seconds("1:30-2:45") == (90, 165)
+    assert timestamp_to_seconds("1:02:03-1:02:09") == (3723, 3729)
+    assert timestamp_to_seconds("0:07") == (7, 7)
+    assert timestamp_to_seconds("bad") == (0, 0)
+
+    print("✅ Timestamp parsing test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing transcript grouping policies...")
+    print("="*60)
+
+    try:
+        test_default_character_budget()
+        test_policies()
+        test_parse_grouping_policy()
+        test_timestamp_to_seconds()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
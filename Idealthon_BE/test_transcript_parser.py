@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass transcript parser in transcript_parser.py.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_parser import align_original_text, build_timestamp_map, parse_transcript_entries
+from main import parse_transcription_to_transcript_items
+
+
+def test_current_format_entries():
+    """Segments with <remove> flags are split at each header, with whitespace collapsed."""
+    text = """<remove>false</remove><time>0:05 - 0:17</time> When I got the news,
+   I was super excited.
+<remove>true</remove><time>0:30 - 0:32</time> Ừm, à...
+<remove>false</remove><time>10:34 - 10:45</time>But also a chance to learn."""
+
+    entries = parse_transcript_entries(text)
+    print(f"Entries: {entries}")
+    assert entries == [
+        ("0:05-0:17", False, "When I got the news, I was super excited."),
+        ("0:30-0:32", True, "Ừm, à..."),
+        ("10:34-10:45", False, "But also a chance to learn.")
+    ]
+
+    print("✅ Current format test passed!")
+
+
+def test_old_format_and_fallback():
+    """Old <time>-only transcripts parse with remove=False; headers without text are skipped."""
+    old_text = "<time>0:00 - 0:15</time> Hello everyone.\n<time>0:15 - 0:30</time>\n<time>0:30 - 0:45</time> First results."
+    assert parse_transcript_entries(old_text) == [
+        ("0:00-0:15", False, "Hello everyone."),
+        ("0:30-0:45", False, "First results.")
+    ]
+
+    # A flagged header without any text yields nothing
+    assert parse_transcript_entries("<remove>true</remove><time>0:00 - 0:10</time>   \n") == []
+
+    # In the current format, a stray <time> header without a flag is part of the text
+    mixed = "<remove>false</remove><time>0:00 - 0:10</time> Một <time>0:05 - 0:06</time> hai"
+    assert parse_transcript_entries(mixed) == [("0:00-0:10", False, "Một <time>0:05 - 0:06</time> hai")]
+
+    assert parse_transcript_entries("") == []
+    assert parse_transcript_entries("No tags at all <time>bad</time>") == []
+
+    print("✅ Old format and fallback test passed!")
+
+
+def test_empty_segment_does_not_swallow_the_next():
+    """A header followed directly by the next header yields nothing instead of eating the next segment."""
+    text = "<remove>false</remove><time>0:00 - 0:10</time><remove>false</remove><time>0:10 - 0:20</time> Xin chào"
+    assert parse_transcript_entries(text) == [("0:10-0:20", False, "Xin chào")]
+
+    print("✅ Empty segment test passed!")
+
+
+def test_original_text_joined_by_timestamp():
+    """Original-language text is joined to the Vietnamese items by timestamp."""
+    original = "<remove>false</remove><time>0:00 - 0:10</time> Hello\n<remove>false</remove><time>0:10 - 0:20</time> World"
+    vietnamese = "<remove>false</remove><time>0:00 - 0:10</time> Xin chào\n<remove>true</remove><time>0:10 - 0:20</time> Thế giới"
+
+    assert build_timestamp_map(original) == {"0:00-0:10": "Hello", "0:10-0:20": "World"}
+
+    items = parse_transcription_to_transcript_items(vietnamese, original, "english")
+    assert [(item.timestamp, item.transcript, item.original_transcript, item.remove) for item in items] == [
+        ("0:00-0:10", "Xin chào", "Hello", False),
+        ("0:10-0:20", "Thế giới", "World", True)
+    ]
+    assert all(item.language == "english" for item in items)
+
+    # A translation shifted by a second is still paired
+    drifted = vietnamese.replace("0:10 - 0:20", "0:11 - 0:21")
+    items = parse_transcription_to_transcript_items(drifted, original, "english")
+    assert [item.original_transcript for item in items] == ["Hello", "World"]
+
+    # Vietnamese audio has no separate original transcript
+    items = parse_transcription_to_transcript_items(vietnamese, original, "vietnamese")
+    assert all(item.original_transcript == "" for item in items)
+
+    print("✅ Timestamp join test passed!")
+
+
+def test_alignment_tolerates_drift():
+    """Segments shifted by the translation are paired by overlap, and the drift is reported."""
+    original = parse_transcript_entries(
+        "<remove>false</remove><time>0:00 - 0:10</time> Hello\n"
+        "<remove>false</remove><time>0:10 - 0:20</time> World\n"
+        "<remove>false</remove><time>0:33 - 0:33</time> Okay\n"
+        "<remove>false</remove><time>1:00 - 1:30</time> Goodbye"
+    )
+    translated = parse_transcript_entries(
+        "<remove>false</remove><time>0:00 - 0:10</time> Xin chào\n"
+        "<remove>false</remove><time>0:11 - 0:21</time> Thế giới\n"
+        "<remove>false</remove><time>0:34 - 0:34</time> Được\n"
+        "<remove>false</remove><time>0:45 - 0:50</time> Không có bản gốc\n"
+        "<remove>false</remove><time>1:05 - 1:40</time> Tạm biệt"
+    )
+
+    original_texts, stats = align_original_text(translated, original)
+    print(f"Aligned: {original_texts}, stats: {stats}")
+    assert original_texts == ["Hello", "World", "Okay", "", "Goodbye"]
+    assert stats["exact"] == 1 and stats["shifted"] == 3 and stats["unmatched"] == 1
+    assert stats["max_drift_seconds"] == 5
+
+    print("✅ Drift alignment test passed!")
+
+
+def test_alignment_prefers_largest_overlap():
+    """A segment straddling two originals takes the one it overlaps most; ties go to the closest."""
+    original = parse_transcript_entries(
+        "<time>0:00 - 0:10</time> First\n<time>0:10 - 0:20</time> Second\n<time>0:20 - 0:30</time> Third"
+    )
+    translated = parse_transcript_entries(
+        "<time>0:08 - 0:18</time> Mostly second\n<time>0:05 - 0:15</time> Even split\n<time>0:19 - 0:31</time> Third-ish"
+    )
+
+    original_texts, _ = align_original_text(translated, original)
+    assert original_texts[0] == "Second"
+    assert original_texts[1] in ("First", "Second")
+    assert original_texts[2] == "Third"
+
+    # Out-of-order originals are sorted before the sweep
+    original_texts, stats = align_original_text(translated, list(reversed(original)))
+    assert original_texts[0] == "Second" and original_texts[2] == "Third"
+    assert stats["unmatched"] == 0
+
+    print("✅ Overlap preference test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing single-pass transcript parser...")
+    print("="*60)
+
+    try:
+        test_current_format_entries()
+        test_old_format_and_fallback()
+        test_empty_segment_does_not_swallow_the_next()
+        test_original_text_joined_by_timestamp()
+        test_alignment_tolerates_drift()
+        test_alignment_prefers_largest_overlap()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
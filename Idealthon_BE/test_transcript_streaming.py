@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental transcription: iter_transcribe_file and /video-transcript/stream.
+Runs offline: segment splitting and the Gemini calls are replaced with sleeps.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import main
+from test_concurrent_transcription import SEGMENT_LATENCY, SlowTranscriber
+
+
+class SequentialTranscriber(SlowTranscriber):
+    """Transcriber whose segments take the same time each and run one at a time."""
+
+    def transcribe_uploaded(self, uploaded_file, language='vietnamese'):
+        time.sleep(SEGMENT_LATENCY)
+        return f"<remove>false</remove><time>0:00 - 0:10</time> segment {uploaded_file}"
+
+
+def make_audio_file(directory: str) -> str:
+    path = os.path.join(directory, "talk.mp3")
+    with open(path, "wb") as f:
+        f.write(b"fake audio")
+    return path
+
+
+def test_segments_are_yielded_before_the_file_finishes():
+    """The first segment arrives after one segment's work, not after the whole file."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_file = make_audio_file(work_dir)
+        transcriber = SequentialTranscriber(segment_count=4, max_workers=1)
+
+        start = time.time()
+        arrivals = []
+        segments = []
+        for segment_index, segment_count, result in transcriber.iter_transcribe_file(audio_file, 'vietnamese'):
+            arrivals.append(time.time() - start)
+            segments.append((segment_index, segment_count, result))
+
+        print(f"Arrival times: {', '.join(f'{arrival:.2f}s' for arrival in arrivals)}")
+        assert [segment[:2] for segment in segments] == [(index, 4) for index in range(4)]
+        assert arrivals[0] < 2 * SEGMENT_LATENCY, "The first segment should not wait for the rest"
+        assert arrivals[-1] >= 4 * SEGMENT_LATENCY
+
+        # Timestamps are already relative to the source file
+        assert segments[1][2][1].startswith("<remove>false</remove><time>10:00 - 10:10</time>")
+
+        # transcribe_file returns the same text, joined
+        original, vietnamese = transcriber.transcribe_file(audio_file, 'vietnamese')
+        assert vietnamese == '\n'.join(segment[2][1] for segment in segments)
+
+    print("✅ Incremental segments test passed!")
+
+
+def test_parse_callable_and_early_close():
+    """parse turns each segment into items; closing the generator early stops the pipeline."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        audio_file = make_audio_file(work_dir)
+        transcriber = SequentialTranscriber(segment_count=6, max_workers=1)
+
+        segments = transcriber.iter_transcribe_file(
+            audio_file,
+            'vietnamese',
+            parse=lambda original, vietnamese: main.parse_transcription_to_transcript_items(vietnamese, original, 'vietnamese')
+        )
+        start = time.time()
+        segment_index, segment_count, items = next(segments)
+        segments.close()
+        elapsed = time.time() - start
+
+    assert (segment_index, segment_count) == (0, 6)
+    assert items[0].transcript == "segment 0" and items[0].timestamp == "0:00-0:10"
+    assert elapsed < 4 * SEGMENT_LATENCY, f"Closing early should not wait for every segment ({elapsed:.2f}s)"
+    assert transcriber.last_pipeline_stats["transcribe"]["items"] < 6
+
+    print("✅ Parse and early close test passed!")
+
+
+def post_stream(client: TestClient, headers: dict = None) -> tuple:
+    with client.stream(
+        "POST",
+        "/video-transcript/stream",
+        files={"file": ("talk.mp3", b"fake audio", "audio/mpeg")},
+        data={"language": "vietnamese"},
+        headers=headers or {}
+    ) as response:
+        assert response.status_code == 200, response.read()
+        return response.headers["content-type"], "".join(response.iter_text())
+
+
+def test_streaming_endpoint():
+    """/video-transcript/stream sends one NDJSON record per segment (or SSE on request) and a final record."""
+    original_transcriber = main.AudioSegmentTranscriber
+    main.AudioSegmentTranscriber = lambda: SequentialTranscriber(segment_count=3, max_workers=1)
+    try:
+        with TestClient(main.app) as client:
+            content_type, body = post_stream(client)
+            records = [json.loads(line) for line in body.splitlines()]
+            assert content_type.startswith("application/x-ndjson")
+            assert [record["type"] for record in records] == ["segment", "segment", "segment", "done"]
+            assert [record["data"][0]["transcript"] for record in records[:3]] == ["segment 0", "segment 1", "segment 2"]
+            assert records[2]["data"][0]["timestamp"] == "20:00-20:10"
+            assert records[-1]["segments_total"] == 3 and records[-1]["items"] == 3
+
+            content_type, body = post_stream(client, {"Accept": "text/event-stream"})
+            events = [block for block in body.split("\n\n") if block.strip()]
+            assert content_type.startswith("text/event-stream")
+            assert len(events) == 4
+            assert json.loads(events[0][len("data: "):])["segment_index"] == 0
+            assert events[-1].startswith("event: done")
+    finally:
+        main.AudioSegmentTranscriber = original_transcriber
+
+    print("✅ Streaming endpoint test passed!")
+
+
+def test_streaming_endpoint_reports_errors():
+    """A failing transcription ends the stream with an error record."""
+    class FailingTranscriber(SequentialTranscriber):
+        def transcribe_uploaded(self, uploaded_file, language='vietnamese'):
+            if uploaded_file == 1:
+                raise Exception("Gemini unavailable")
+            return super().transcribe_uploaded(uploaded_file, language)
+
+    original_transcriber = main.AudioSegmentTranscriber
+    main.AudioSegmentTranscriber = lambda: FailingTranscriber(segment_count=3, max_workers=1)
+    try:
+        with TestClient(main.app) as client:
+            _, body = post_stream(client)
+    finally:
+        main.AudioSegmentTranscriber = original_transcriber
+
+    records = [json.loads(line) for line in body.splitlines()]
+    print(f"Records: {[record['type'] for record in records]}")
+    assert records[-1]["type"] == "error" and "Gemini unavailable" in records[-1]["detail"]
+
+    print("✅ Streaming error test passed!")
+
+
+def test_unsent_stream_deletes_upload():
+    """The spooled upload is deleted even if the response body is never iterated."""
+    import asyncio
+    import io
+    from fastapi import UploadFile
+    from starlette.requests import Request
+
+    spooled = []
+    original_spool = main.spool_upload_to_disk
+
+    async def recording_spool(file, suffix=""):
+        path = await original_spool(file, suffix=suffix)
+        spooled.append(path)
+        return path
+
+    async def respond_without_sending():
+        request = Request({"type": "http", "method": "POST", "path": "/video-transcript/stream", "headers": []})
+        upload = UploadFile(io.BytesIO(b"fake audio"), filename="talk.mp3")
+        response = await main.video_transcript_stream(request, upload, "vietnamese")
+        assert os.path.exists(spooled[0])
+        # What Starlette runs after the response, whether or not the body was sent
+        await response.background()
+
+    main.spool_upload_to_disk = recording_spool
+    try:
+        asyncio.run(respond_without_sending())
+    finally:
+        main.spool_upload_to_disk = original_spool
+
+    assert not os.path.exists(spooled[0]), "The unsent upload should be deleted"
+
+    print("✅ Unsent stream cleanup test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing incremental transcription streaming...")
+    print("="*60)
+
+    try:
+        test_segments_are_yielded_before_the_file_finishes()
+        test_parse_callable_and_early_close()
+        test_streaming_endpoint()
+        test_streaming_endpoint_reports_errors()
+        test_unsent_stream_deletes_upload()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
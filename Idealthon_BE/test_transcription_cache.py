@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed transcription cache.
+Runs offline: the Gemini client is replaced with one that counts calls.
+"""
+
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+from cut_audio import AudioSegmentTranscriber, PROMPT_VERSION
+from transcription_cache import TranscriptionCache
+
+
+class CountingClient:
+    """Minimal stand-in for genai.Client that records every call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.files = SimpleNamespace(upload=self.upload, delete=self.delete)
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def upload(self, file, config=None):
+        self.calls += 1
+        return SimpleNamespace(name="files/test")
+
+    def delete(self, name):
+        pass
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        return SimpleNamespace(text="<remove>false</remove><time>0:00 - 0:01</time> Hello")
+
+
+def test_put_get_and_persistence():
+    """Entries survive a new cache instance and keys depend on every component."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TranscriptionCache(cache_dir=cache_dir)
+        key = cache.make_key("abc", "english", 600000, "v1")
+
+        assert cache.get(key) is None
+        cache.put(key, "original", "tiếng Việt")
+        assert cache.get(key) == ("original", "tiếng Việt")
+
+        reopened = TranscriptionCache(cache_dir=cache_dir)
+        assert reopened.get(key) == ("original", "tiếng Việt"), "Entry should persist on disk"
+
+        assert key != cache.make_key("abc", "japanese", 600000, "v1")
+        assert key != cache.make_key("abc", "english", 300000, "v1")
+        assert key != cache.make_key("abc", "english", 600000, "v2")
+
+        stats = cache.stats()
+        print(f"Cache stats: {stats}")
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+    print("✅ Persistence test passed!")
+
+
+def test_lru_eviction_by_size():
+    """The least recently used entry is evicted once the size budget is exceeded."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TranscriptionCache(cache_dir=cache_dir, max_bytes=250)
+        payload = "x" * 30  # ~90 bytes per entry: two fit, three do not
+
+        cache.put("a" * 64, payload, payload)
+        time.sleep(0.01)
+        cache.put("b" * 64, payload, payload)
+        time.sleep(0.01)
+        cache.get("a" * 64)  # "a" is now more recently used than "b"
+        time.sleep(0.01)
+        cache.put("c" * 64, payload, payload)
+
+        assert cache.get("b" * 64) is None, "Least recently used entry should be evicted"
+        assert cache.get("a" * 64) is not None
+        assert cache.get("c" * 64) is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= 250
+
+    print("✅ LRU eviction test passed!")
+
+
+def test_transcriber_skips_gemini_on_hit():
+    """The second transcription of identical audio is served from the cache."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client = CountingClient()
+        transcriber = AudioSegmentTranscriber(client=client, cache=TranscriptionCache(cache_dir=cache_dir))
+
+        segment = Sine(440).to_audio_segment(duration=1000)
+
+        first = transcriber.transcribe_segment(segment, 'english')
+        calls_after_first = client.calls
+        start = time.time()
+        second = transcriber.transcribe_segment(segment, 'english')
+        hit_ms = (time.time() - start) * 1000
+
+        print(f"Gemini calls after first run: {calls_after_first}, cache hit took {hit_ms:.1f}ms")
+        assert first == second
+        assert client.calls == calls_after_first, "Cache hit should not call Gemini"
+        assert calls_after_first == 3, "Miss should upload, transcribe and translate"
+
+        # Different audio is a miss
+        transcriber.transcribe_segment(AudioSegment.silent(duration=1000), 'english')
+        assert client.calls == calls_after_first * 2
+        assert len(PROMPT_VERSION) == 12
+
+    print("✅ Transcriber cache integration test passed!")
+
+
+def test_cache_can_be_disabled():
+    """cache=False turns caching off and nothing is written to the working directory."""
+    import transcription_cache
+
+    assert os.path.dirname(transcription_cache.DEFAULT_CACHE_DIR) == os.path.dirname(os.path.abspath(transcription_cache.__file__))
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            client = CountingClient()
+            transcriber = AudioSegmentTranscriber(client=client, cache=False)
+            assert transcriber.cache is None
+            segment = Sine(440).to_audio_segment(duration=1000)
+            transcriber.transcribe_segment(segment, 'english')
+            calls_after_first = client.calls
+            transcriber.transcribe_segment(segment, 'english')
+            assert client.calls > calls_after_first, "Without a cache every transcription calls Gemini"
+            assert os.listdir(work_dir) == []
+        finally:
+            os.chdir(previous_dir)
+
+    print("✅ Disabled cache test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing transcription cache...")
+    print("="*60)
+
+    try:
+        test_put_get_and_persistence()
+        test_lru_eviction_by_size()
+        test_transcriber_skips_gemini_on_hit()
+        test_cache_can_be_disabled()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
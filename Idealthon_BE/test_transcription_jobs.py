@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Test script for the transcription job queue and the /video-transcript/jobs endpoints.
+Runs offline: transcription is replaced with a function that reports fake segments.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import main
+from jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, TranscriptionJobQueue
+
+SEGMENT_LATENCY = 0.1
+
+
+class FakeTranscription:
+    """Transcribes every file into a fixed number of segments, reporting each one."""
+
+    def __init__(self, segment_count: int = 3, fail: bool = False):
+        self.segment_count = segment_count
+        self.fail = fail
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, file_path, language, on_segment):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            originals, vietnamese = [], []
+            for index in range(self.segment_count):
+                time.sleep(SEGMENT_LATENCY)
+                if self.fail and index == 1:
+                    raise Exception("Gemini unavailable")
+                originals.append(f"<remove>false</remove><time>{index}:00 - {index}:30</time> segment {index}")
+                vietnamese.append(f"<remove>false</remove><time>{index}:00 - {index}:30</time> đoạn {index}")
+                on_segment(index, self.segment_count, originals[-1], vietnamese[-1])
+            return '\n'.join(originals), '\n'.join(vietnamese)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def make_upload(directory: str, name: str = "talk.mp3") -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"fake audio")
+    return path
+
+
+def wait_for_status(queue: TranscriptionJobQueue, job_id: str, statuses, timeout: float = 5.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+
+def test_job_reports_partial_segments():
+    """A job exposes each finished segment while later ones are still running, then the full result."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        queue = TranscriptionJobQueue(FakeTranscription(segment_count=4), db_path=os.path.join(work_dir, "jobs.sqlite3"), workers=1)
+        queue.start()
+        upload = make_upload(work_dir)
+        job_id = queue.submit(upload, "talk.mp3", "english")
+
+        partial = None
+        deadline = time.time() + 5
+        while time.time() < deadline and partial is None:
+            job = queue.get(job_id)
+            if job["status"] == JOB_RUNNING and 0 < job["segments_done"] < 4:
+                partial = job
+            time.sleep(0.01)
+        assert partial is not None, "Progress should be visible before the job finishes"
+        assert partial["segments_total"] == 4
+        assert len(partial["segments"]) == partial["segments_done"]
+
+        job = wait_for_status(queue, job_id, (JOB_COMPLETED,))
+        original, vietnamese = queue.get_result(job_id)
+        assert job["segments_done"] == 4 and len(job["segments"]) == 4
+        assert vietnamese.count("đoạn") == 4 and original.count("segment") == 4
+        assert not os.path.exists(upload), "The upload should be deleted once the job finishes"
+        queue.close()
+
+    print("✅ Partial progress test passed!")
+
+
+def test_worker_pool_is_bounded():
+    """No more jobs run at once than there are workers; the rest wait in the queue."""
+    transcription = FakeTranscription(segment_count=2)
+    with tempfile.TemporaryDirectory() as work_dir:
+        queue = TranscriptionJobQueue(transcription, db_path=os.path.join(work_dir, "jobs.sqlite3"), workers=2)
+        queue.start()
+        job_ids = [queue.submit(make_upload(work_dir, f"talk{index}.mp3"), f"talk{index}.mp3", "english") for index in range(5)]
+        time.sleep(SEGMENT_LATENCY)
+        assert queue.stats()[JOB_QUEUED] >= 2, "Jobs beyond the worker count should wait"
+        for job_id in job_ids:
+            wait_for_status(queue, job_id, (JOB_COMPLETED,))
+        queue.close()
+
+    print(f"Max concurrent jobs: {transcription.max_running}")
+    assert transcription.max_running == 2
+
+    print("✅ Bounded worker pool test passed!")
+
+
+def test_jobs_share_the_transcription_limit():
+    """Jobs run on transcription_executor, so MAX_CONCURRENT_TRANSCRIPTIONS also caps them."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    transcription = FakeTranscription(segment_count=2)
+    original_executor = main.transcription_executor
+    original_run = main.run_transcription
+    original_queue = main._transcription_jobs
+    original_db = os.environ.get("TRANSCRIPTION_JOB_DB")
+    with tempfile.TemporaryDirectory() as work_dir:
+        main.transcription_executor = ThreadPoolExecutor(max_workers=1)
+        main.run_transcription = transcription
+        main._transcription_jobs = None
+        os.environ["TRANSCRIPTION_JOB_DB"] = os.path.join(work_dir, "jobs.sqlite3")
+        try:
+            queue = main.get_transcription_jobs()
+            queue.workers = 3
+            queue.start()
+            job_ids = [queue.submit(make_upload(work_dir, f"talk{index}.mp3"), f"talk{index}.mp3", "english") for index in range(3)]
+            for job_id in job_ids:
+                wait_for_status(queue, job_id, (JOB_COMPLETED,))
+            queue.close()
+        finally:
+            main.transcription_executor.shutdown()
+            main.transcription_executor = original_executor
+            main.run_transcription = original_run
+            main._transcription_jobs = original_queue
+            if original_db is None:
+                os.environ.pop("TRANSCRIPTION_JOB_DB", None)
+            else:
+                os.environ["TRANSCRIPTION_JOB_DB"] = original_db
+
+    print(f"Max concurrent job transcriptions: {transcription.max_running}")
+    assert transcription.max_running == 1, "Three job workers should still share the one executor thread"
+
+    print("✅ Shared transcription limit test passed!")
+
+
+def test_failed_job_keeps_error_and_partial_results():
+    """A failing transcription marks the job failed with the error and keeps finished segments."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        queue = TranscriptionJobQueue(FakeTranscription(fail=True), db_path=os.path.join(work_dir, "jobs.sqlite3"), workers=1)
+        queue.start()
+        job_id = queue.submit(make_upload(work_dir), "talk.mp3", "english")
+        job = wait_for_status(queue, job_id, (JOB_FAILED,))
+        assert queue.get_result(job_id) is None
+        queue.close()
+
+    assert job["error"] == "Gemini unavailable"
+    assert len(job["segments"]) == 1
+
+    print("✅ Failed job test passed!")
+
+
+def test_interrupted_jobs_are_requeued_on_start():
+    """Jobs left running by a stopped process run again when the queue starts."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "jobs.sqlite3")
+        first = TranscriptionJobQueue(FakeTranscription(), db_path=db_path, workers=1)
+        job_id = first.submit(make_upload(work_dir), "talk.mp3", "english")
+        lost_id = first.submit(os.path.join(work_dir, "missing.mp3"), "missing.mp3", "english")
+        # Simulate a crash while both jobs were running
+        first._db.execute("UPDATE jobs SET status = ?", (JOB_RUNNING,))
+        first._db.commit()
+        first.close()
+
+        second = TranscriptionJobQueue(FakeTranscription(), db_path=db_path, workers=1)
+        second.start()
+        assert wait_for_status(second, job_id, (JOB_COMPLETED,))["segments_done"] == 3
+        assert second.get(lost_id)["status"] == JOB_FAILED, "Jobs whose upload is gone cannot be resumed"
+        second.close()
+
+    print("✅ Job recovery test passed!")
+
+
+def test_queues_sharing_a_database_run_each_job_once():
+    """Two queues on one database (as two processes would) never claim the same job."""
+    transcription = FakeTranscription(segment_count=1)
+    runs = []
+    runs_lock = threading.Lock()
+
+    def counting_transcription(file_path, language, on_segment):
+        with runs_lock:
+            runs.append(file_path)
+        return transcription(file_path, language, on_segment)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "jobs.sqlite3")
+        queues = [TranscriptionJobQueue(counting_transcription, db_path=db_path, workers=3) for _ in range(2)]
+        job_ids = [queues[0].submit(make_upload(work_dir, f"talk{index}.mp3"), f"talk{index}.mp3", "english") for index in range(12)]
+        for queue in queues:
+            queue.start()
+        for job_id in job_ids:
+            wait_for_status(queues[1], job_id, (JOB_COMPLETED,))
+        for queue in queues:
+            queue.close()
+
+    print(f"Runs: {len(runs)} for {len(job_ids)} jobs")
+    assert len(runs) == len(set(runs)) == len(job_ids), "Every job should run exactly once"
+
+    print("✅ Shared database claim test passed!")
+
+
+def test_only_stale_running_jobs_are_requeued():
+    """A job another process is still running is left alone; one whose heartbeat stopped is queued again."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "jobs.sqlite3")
+        other = TranscriptionJobQueue(FakeTranscription(), db_path=db_path, workers=1)
+        live_id = other.submit(make_upload(work_dir, "live.mp3"), "live.mp3", "english")
+        stale_id = other.submit(make_upload(work_dir, "stale.mp3"), "stale.mp3", "english")
+        # Another process claimed both jobs; only one of them still sends heartbeats
+        other._db.execute("UPDATE jobs SET status = ?, owner = 'other', heartbeat_at = ?", (JOB_RUNNING, time.time()))
+        other._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 60, stale_id))
+        other._db.commit()
+
+        queue = TranscriptionJobQueue(FakeTranscription(), db_path=db_path, workers=1, heartbeat_seconds=0.1)
+        # Long enough for the stale job to finish before the live one goes stale as well
+        queue.stale_seconds = 1.0
+        queue.start()
+        wait_for_status(queue, stale_id, (JOB_COMPLETED,))
+        assert queue.get(live_id)["status"] == JOB_RUNNING, "A job with a fresh heartbeat should not be requeued"
+
+        # Once the other process stops sending heartbeats, the running queue picks its job up too
+        assert wait_for_status(queue, live_id, (JOB_COMPLETED,))["segments_done"] == 3
+        queue.close()
+        other.close()
+
+    print("✅ Stale job recovery test passed!")
+
+
+def test_database_without_claim_columns_is_migrated():
+    """Databases created before jobs had an owner and heartbeat gain the columns on open."""
+    import sqlite3
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "jobs.sqlite3")
+        db = sqlite3.connect(db_path)
+        db.execute(
+            """CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL,
+               language TEXT NOT NULL, file_path TEXT NOT NULL, segments_total INTEGER,
+               segments_done INTEGER NOT NULL DEFAULT 0, original_transcription TEXT,
+               vietnamese_transcription TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL,
+               finished_at REAL)"""
+        )
+        db.commit()
+        db.close()
+
+        queue = TranscriptionJobQueue(FakeTranscription(segment_count=1), db_path=db_path, workers=1)
+        queue.start()
+        job_id = queue.submit(make_upload(work_dir), "talk.mp3", "english")
+        assert wait_for_status(queue, job_id, (JOB_COMPLETED,))["segments_done"] == 1
+        queue.close()
+
+    print("✅ Schema migration test passed!")
+
+
+def test_job_endpoints():
+    """POST returns a job id immediately; status and SSE endpoints report segments and completion."""
+    original_get_jobs = main.get_transcription_jobs
+    with tempfile.TemporaryDirectory() as work_dir:
+        queue = TranscriptionJobQueue(
+            FakeTranscription(segment_count=3), db_path=os.path.join(work_dir, "jobs.sqlite3"), workers=1
+        )
+        main.get_transcription_jobs = lambda: queue
+        try:
+            with TestClient(main.app) as client:
+                start = time.time()
+                response = client.post(
+                    "/video-transcript/jobs",
+                    files={"file": ("talk.mp3", b"fake audio", "audio/mpeg")},
+                    data={"language": "english"}
+                )
+                submit_seconds = time.time() - start
+                assert response.status_code == 202, response.text
+                job_id = response.json()["job_id"]
+                assert submit_seconds < 3 * SEGMENT_LATENCY, "Submitting should not wait for the transcription"
+
+                with client.stream("GET", f"/video-transcript/jobs/{job_id}/events") as stream:
+                    body = "".join(stream.iter_text())
+                events = [block for block in body.split("\n\n") if block.strip()]
+                segment_events = [json.loads(block[len("data: "):]) for block in events if block.startswith("data: ")]
+                assert [event["segment_index"] for event in segment_events] == [0, 1, 2]
+                assert segment_events[1]["data"][0]["transcript"] == "đoạn 1"
+                assert segment_events[1]["data"][0]["original_transcript"] == "segment 1"
+                assert events[-1].startswith("event: done")
+
+                status = client.get(f"/video-transcript/jobs/{job_id}").json()
+                assert status["status"] == "completed" and status["segments_done"] == 3
+                assert [item["transcript"] for item in status["data"]] == ["đoạn 0", "đoạn 1", "đoạn 2"]
+
+                assert client.get("/video-transcript/jobs/unknown").status_code == 404
+                invalid = client.post("/video-transcript/jobs", files={"file": ("notes.txt", b"text", "text/plain")})
+                assert invalid.status_code == 400
+        finally:
+            queue.close()
+            main.get_transcription_jobs = original_get_jobs
+
+    print(f"Submit time: {submit_seconds * 1000:.0f}ms")
+    print("✅ Job endpoints test passed!")
+
+
+def test_failed_submit_deletes_upload():
+    """If the job cannot be queued, the spooled upload is deleted instead of leaking."""
+    import sqlite3
+
+    class LockedQueue(TranscriptionJobQueue):
+        def submit(self, file_path, filename, language):
+            raise sqlite3.OperationalError("database is locked")
+
+    spooled = []
+    original_spool = main.spool_upload_to_disk
+
+    async def recording_spool(file, suffix=""):
+        path = await original_spool(file, suffix=suffix)
+        spooled.append(path)
+        return path
+
+    original_get_jobs = main.get_transcription_jobs
+    with tempfile.TemporaryDirectory() as work_dir:
+        queue = LockedQueue(FakeTranscription(), db_path=os.path.join(work_dir, "jobs.sqlite3"), workers=1)
+        main.get_transcription_jobs = lambda: queue
+        main.spool_upload_to_disk = recording_spool
+        try:
+            with TestClient(main.app, raise_server_exceptions=False) as client:
+                response = client.post(
+                    "/video-transcript/jobs",
+                    files={"file": ("talk.mp3", b"fake audio", "audio/mpeg")},
+                    data={"language": "english"}
+                )
+        finally:
+            queue.close()
+            main.get_transcription_jobs = original_get_jobs
+            main.spool_upload_to_disk = original_spool
+
+    assert response.status_code == 500
+    assert len(spooled) == 1 and not os.path.exists(spooled[0]), "The upload of a job that was never queued should be deleted"
+
+    print("✅ Failed submit cleanup test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing transcription jobs...")
+    print("="*60)
+
+    try:
+        test_job_reports_partial_segments()
+        test_worker_pool_is_bounded()
+        test_jobs_share_the_transcription_limit()
+        test_failed_job_keeps_error_and_partial_results()
+        test_interrupted_jobs_are_requeued_on_start()
+        test_queues_sharing_a_database_run_each_job_once()
+        test_only_stale_running_jobs_are_requeued()
+        test_database_without_claim_columns_is_migrated()
+        test_job_endpoints()
+        test_failed_submit_deletes_upload()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for chunked upload spooling in /video-transcript.
+"""
+
+import sys
+import os
+import io
+import asyncio
+import glob
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+import main
+from main import spool_upload_to_disk
+
+
+def test_spool_copies_upload_in_chunks():
+    """The spooled file matches the upload byte for byte."""
+    data = os.urandom(3 * 1024 + 17)
+    upload = UploadFile(file=io.BytesIO(data), filename="clip.mp3")
+
+    path = asyncio.run(spool_upload_to_disk(upload, suffix=".mp3", chunk_size=1024))
+    try:
+        assert path.endswith(".mp3")
+        with open(path, "rb") as f:
+            assert f.read() == data
+    finally:
+        os.unlink(path)
+
+    print("✅ Chunked spool test passed!")
+
+
+def test_spool_rejects_oversized_upload():
+    """Uploads over the limit are rejected with 413 and leave no temporary file behind."""
+    upload = UploadFile(file=io.BytesIO(b"x" * 5000), filename="big.mp4")
+    before = set(glob.glob(os.path.join(tempfile.gettempdir(), "*.mp4")))
+
+    try:
+        asyncio.run(spool_upload_to_disk(upload, suffix=".mp4", max_bytes=4096, chunk_size=1024))
+        raise AssertionError("Expected HTTPException for oversized upload")
+    except HTTPException as e:
+        assert e.status_code == 413
+
+    after = set(glob.glob(os.path.join(tempfile.gettempdir(), "*.mp4")))
+    assert after == before, "Rejected upload should not leave a temporary file"
+
+    print("✅ Upload size limit test passed!")
+
+
+def test_oversized_request_rejected_before_parsing():
+    """Bodies over the limit get 413 from the middleware before the form is parsed and spooled."""
+    boundary = "testboundary"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.mp4\"\r\n"
+            "Content-Type: video/mp4\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+    def body_chunks(size):
+        yield head
+        for _ in range(size // 1024):
+            yield b"x" * 1024
+        yield tail
+
+    original_limit, original_spool = main.MAX_UPLOAD_BYTES, main.spool_upload_to_disk
+    spooled = []
+
+    async def recording_spool(*args, **kwargs):
+        spooled.append(args)
+        return await original_spool(*args, **kwargs)
+
+    main.MAX_UPLOAD_BYTES = 4096
+    main.spool_upload_to_disk = recording_spool
+    try:
+        client = TestClient(main.app)
+        limit = main.MAX_UPLOAD_BYTES + main.UPLOAD_FORM_OVERHEAD_BYTES
+
+        # Declared size over the limit
+        response = client.post("/video-transcript", content=b"".join(body_chunks(limit + 1024)), headers=headers)
+        assert response.status_code == 413, response.text
+
+        # Chunked body without a Content-Length, counted as it streams in
+        response = client.post("/video-transcript", content=body_chunks(limit + 1024), headers=headers)
+        assert response.status_code == 413, response.text
+        assert "File too large" in response.json()["detail"]
+        assert spooled == [], "Oversized bodies should not reach the endpoint"
+    finally:
+        main.MAX_UPLOAD_BYTES, main.spool_upload_to_disk = original_limit, original_spool
+
+    print("✅ Request size middleware test passed!")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing upload spooling...")
+    print("="*60)
+
+    try:
+        test_spool_copies_upload_in_chunks()
+        test_spool_rejects_oversized_upload()
+        test_oversized_request_rejected_before_parsing()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,259 @@
+import os
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Paragraphs close once their text reaches 200 characters, as they always have
+DEFAULT_GROUPING_SPEC = "chars:200"
+
+
+def time_to_seconds(time_text: str) -> int:
+    """
+    Convert "m:ss" or "h:mm:ss" to seconds; text that cannot be parsed counts as 0.
+    """
+    minutes, separator, seconds = time_text.partition(':')
+    try:
+        if separator and ':' not in seconds:
+            return int(minutes) * 60 + int(seconds)
+        total = 0
+        for part in time_text.split(':'):
+            total = total * 60 + int(part)
+        return total
+    except ValueError:
+        return 0
+
+
+def timestamp_to_seconds(timestamp: str) -> Tuple[int, int]:
+    """
+    Convert a transcript timestamp, a "m:ss-m:ss" range or a single time, to (start_seconds, end_seconds).
+    """
+    start_text, _, end_text = timestamp.partition('-')
+    start = time_to_seconds(start_text)
+    return start, time_to_seconds(end_text) if end_text else start
+
+
+class GroupState:
+    """
+    Running counters of the paragraph being built, updated in O(1) per item by group_segments.
+    """
+
+    __slots__ = ("segments", "characters", "tokens", "start", "end")
+
+    def __init__(self):
+        self.segments = 0
+        self.characters = 0  # Length of the texts joined with single spaces
+        self.tokens = 0
+        self.start = 0
+        self.end = 0
+
+
+class GroupingPolicy:
+    """
+    Decides where transcript paragraphs are split. Policies only read the running
+    GroupState, so they hold no per-call state and can be shared.
+    """
+
+    # Which GroupState counters the policy reads beyond segments and characters; the others
+    # are not computed
+    counts_tokens = False
+    tracks_end_time = False
+
+    def splits_before(self, state: GroupState, start: int) -> bool:
+        """
+        Whether to close the current paragraph before adding a segment starting at start.
+        """
+        return False
+
+    def is_full(self, state: GroupState) -> bool:
+        """
+        Whether to close the current paragraph after the segment just added.
+        """
+        return False
+
+
+class CharacterBudget(GroupingPolicy):
+    """Close a paragraph once its joined text reaches max_characters."""
+
+    def __init__(self, max_characters: int = 200):
+        self.max_characters = max_characters
+
+    def is_full(self, state: GroupState) -> bool:
+        return state.characters >= self.max_characters
+
+
+class TokenBudget(GroupingPolicy):
+    """
+    Close a paragraph once it reaches max_tokens, counting whitespace-separated words as tokens.
+    """
+
+    counts_tokens = True
+
+    def __init__(self, max_tokens: int = 50):
+        self.max_tokens = max_tokens
+
+    def is_full(self, state: GroupState) -> bool:
+        return state.tokens >= self.max_tokens
+
+
+class TimeGapSplit(GroupingPolicy):
+    """Start a new paragraph when a segment begins more than max_gap_seconds after the previous one ended."""
+
+    tracks_end_time = True
+
+    def __init__(self, max_gap_seconds: int = 5):
+        self.max_gap_seconds = max_gap_seconds
+
+    def splits_before(self, state: GroupState, start: int) -> bool:
+        return start - state.end > self.max_gap_seconds
+
+
+class MaxSegments(GroupingPolicy):
+    """Close a paragraph once it holds max_segments segments."""
+
+    def __init__(self, max_segments: int = 10):
+        self.max_segments = max_segments
+
+    def is_full(self, state: GroupState) -> bool:
+        return state.segments >= self.max_segments
+
+
+class CombinedPolicy(GroupingPolicy):
+    """Split wherever any of the policies would."""
+
+    def __init__(self, policies: Sequence[GroupingPolicy]):
+        self.policies = list(policies)
+        self.counts_tokens = any(policy.counts_tokens for policy in self.policies)
+        self.tracks_end_time = any(policy.tracks_end_time for policy in self.policies)
+
+    def splits_before(self, state: GroupState, start: int) -> bool:
+        return any(policy.splits_before(state, start) for policy in self.policies)
+
+    def is_full(self, state: GroupState) -> bool:
+        return any(policy.is_full(state) for policy in self.policies)
+
+
+POLICY_TYPES = {
+    "chars": CharacterBudget,
+    "tokens": TokenBudget,
+    "gap": TimeGapSplit,
+    "segments": MaxSegments
+}
+
+
+def parse_grouping_policy(spec: Optional[str] = None) -> GroupingPolicy:
+    """
+    Build a grouping policy from a spec such as "chars:200" or "tokens:80,gap:5,segments:12".
+
+    Args:
+        spec: Comma-separated name:limit pairs (chars, tokens, gap in seconds, segments). If None,
+              will use TRANSCRIPT_GROUPING from environment (default "chars:200").
+
+    Returns:
+        The policy, combined when the spec lists several
+
+    Raises:
+        ValueError: If the spec names an unknown policy or has a non-integer limit
+    """
+    spec = spec or os.getenv("TRANSCRIPT_GROUPING") or DEFAULT_GROUPING_SPEC
+    policies = []
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, limit = part.partition(':')
+        name = name.strip().lower()
+        if name not in POLICY_TYPES:
+            raise ValueError(f"Unknown grouping policy '{name}'. Supported: {', '.join(POLICY_TYPES)}")
+        try:
+            policies.append(POLICY_TYPES[name](int(limit)) if limit.strip() else POLICY_TYPES[name]())
+        except ValueError:
+            raise ValueError(f"Invalid limit '{limit}' for grouping policy '{name}'")
+    if not policies:
+        raise ValueError(f"Empty grouping policy spec '{spec}'")
+    return policies[0] if len(policies) == 1 else CombinedPolicy(policies)
+
+
+def group_segments(transcript_items: List, policy: GroupingPolicy) -> List[Dict]:
+    """
+    Group transcript items into paragraphs, splitting where the policy says so.
+
+    Timestamps are parsed once, items are sorted by start time, and each paragraph's
+    length, token and time counters are kept as it grows, so grouping is linear after
+    the sort.
+
+    Args:
+        transcript_items: Items with timestamp, transcript and optionally original_transcript
+                          and language attributes (e.g. TranscriptItem)
+        policy: Where to split paragraphs
+
+    Returns:
+        List of paragraph dicts with 'paragraph', 'original_paragraph', 'language',
+        'timestamp' and 'items'
+    """
+    if not transcript_items:
+        return []
+
+    # Sort by timestamp to ensure proper ordering (stable, so equal starts keep their order)
+    if policy.tracks_end_time:
+        parsed = [(*timestamp_to_seconds(item.timestamp), item) for item in transcript_items]
+    else:
+        parsed = [(time_to_seconds(item.timestamp.partition('-')[0]), 0, item) for item in transcript_items]
+    parsed.sort(key=itemgetter(0))
+    counts_tokens = policy.counts_tokens
+
+    grouped_paragraphs = []
+    current_group = []
+    state = GroupState()
+
+    def close_group():
+        start_timestamp = current_group[0].timestamp.split('-')[0] if '-' in current_group[0].timestamp else current_group[0].timestamp
+        end_timestamp = current_group[-1].timestamp.split('-')[1] if '-' in current_group[-1].timestamp else current_group[-1].timestamp
+
+        # Collect original text and determine language
+        current_original_text = []
+        language = "vietnamese"  # Default
+        for group_item in current_group:
+            if getattr(group_item, 'original_transcript', ""):
+                current_original_text.append(group_item.original_transcript)
+                language = getattr(group_item, 'language', language)
+
+        grouped_paragraphs.append({
+            'paragraph': ' '.join(group_item.transcript for group_item in current_group),
+            'original_paragraph': ' '.join(current_original_text) if current_original_text else "",
+            'language': language,
+            'timestamp': f"{start_timestamp}-{end_timestamp}",
+            'items': list(current_group)
+        })
+
+    for start, end, item in parsed:
+        if current_group and policy.splits_before(state, start):
+            close_group()
+            current_group = []
+            state = GroupState()
+
+        current_group.append(item)
+        text = item.transcript
+        # Update the running counters in place; this runs once per item
+        if state.segments:
+            state.characters += len(text) + 1  # Joining space
+            if end > state.end:
+                state.end = end
+        else:
+            state.characters = len(text)
+            state.start = start
+            state.end = end
+        state.segments += 1
+        if counts_tokens:
+            state.tokens += len(text.split())
+
+        if policy.is_full(state):
+            close_group()
+            current_group = []
+            state = GroupState()
+
+    if current_group:
+        close_group()
+
+    return grouped_paragraphs
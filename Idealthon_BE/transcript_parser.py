@@ -0,0 +1,190 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Segment header in either format:
+#   <remove>true|false</remove><time>0:00 - 0:15</time>   (current)
+#   <time>0:00 - 0:15</time>                              (old, no remove flag)
+# Headers are found by scanning for the literal "<time>" with str.find and matching the
+# tag in place; the text of a segment is everything up to the next header. Nothing scans
+# ahead for the end of a segment, so each character is examined a constant number of times.
+TIME_TAG = "<time>"
+TIME_PATTERN = re.compile(r'<time>(\d+:\d+)\s*-\s*(\d+:\d+)</time>')
+REMOVE_TAGS = (("true", "<remove>true</remove>"), ("false", "<remove>false</remove>"))
+
+# (timestamp_key, remove, text)
+TranscriptEntry = Tuple[str, bool, str]
+
+
+def _collect_entries(text: str, headers: List[Tuple[int, int, Optional[str], str]], use_flags: bool) -> List[TranscriptEntry]:
+    entries = []
+    for index, (_, body_start, remove_flag, timestamp_key) in enumerate(headers):
+        body_end = headers[index + 1][0] if index + 1 < len(headers) else len(text)
+        # Clean up the text (remove extra whitespace and newlines)
+        cleaned_text = ' '.join(text[body_start:body_end].split())
+        if cleaned_text:  # Only keep non-empty transcriptions
+            entries.append((timestamp_key, use_flags and remove_flag == "true", cleaned_text))
+    return entries
+
+
+def parse_transcript_entries(text: str) -> List[TranscriptEntry]:
+    """
+    Split a transcription into its segments in a single pass over the text.
+
+    Headers with a <remove> flag start segments when the text has any; otherwise (old
+    format) every <time> header does and segments are never marked for removal.
+
+    Args:
+        text: Transcription text as produced by cut_audio.py
+
+    Returns:
+        List of (timestamp_key, remove, text) tuples in order, where timestamp_key is
+        "start-end" (e.g. "0:00-0:15") and text has its whitespace collapsed
+    """
+    if not text:
+        return []
+
+    # (header_start, body_start, remove_flag, timestamp_key)
+    headers = []
+    flagged = []
+    position = text.find(TIME_TAG)
+    while position != -1:
+        match = TIME_PATTERN.match(text, position)
+        if match is None:
+            position = text.find(TIME_TAG, position + len(TIME_TAG))
+            continue
+
+        header_start, remove_flag = position, None
+        for flag, remove_tag in REMOVE_TAGS:
+            if position >= len(remove_tag) and text.startswith(remove_tag, position - len(remove_tag)):
+                header_start, remove_flag = position - len(remove_tag), flag
+                break
+
+        header = (header_start, match.end(), remove_flag, f"{match.group(1)}-{match.group(2)}")
+        headers.append(header)
+        if remove_flag is not None:
+            flagged.append(header)
+        position = text.find(TIME_TAG, match.end())
+
+    if flagged:
+        entries = _collect_entries(text, flagged, use_flags=True)
+        if entries:
+            return entries
+    # Fallback: old format without <remove> tags for backward compatibility
+    return _collect_entries(text, headers, use_flags=False)
+
+
+def build_timestamp_map(text: str) -> Dict[str, str]:
+    """
+    Map each segment's timestamp key to its text, e.g. to join an original-language
+    transcription to its Vietnamese translation.
+
+    Args:
+        text: Transcription text as produced by cut_audio.py
+
+    Returns:
+        Dict of timestamp_key -> text; a repeated timestamp keeps its last text
+    """
+    return {timestamp_key: segment_text for timestamp_key, _, segment_text in parse_transcript_entries(text)}
+
+
+# Original segments whose interval misses a translated segment by at most this many seconds
+# (e.g. a zero-length "0:33 - 0:33" segment shifted by a second) can still be paired with it
+ALIGNMENT_TOLERANCE_SECONDS = 2
+
+
+def timestamp_key_to_seconds(timestamp_key: str) -> Tuple[int, int]:
+    """
+    Convert a timestamp key such as "1:30-2:45" to (start_seconds, end_seconds).
+    """
+    start_time, end_time = timestamp_key.split('-')
+    start_minutes, start_seconds = start_time.split(':')
+    end_minutes, end_seconds = end_time.split(':')
+    return int(start_minutes) * 60 + int(start_seconds), int(end_minutes) * 60 + int(end_seconds)
+
+
+def align_original_text(entries: List[TranscriptEntry], original_entries: List[TranscriptEntry],
+                        tolerance_seconds: int = ALIGNMENT_TOLERANCE_SECONDS) -> Tuple[List[str], Dict]:
+    """
+    Pair each translated segment with the original-language segment it overlaps most.
+
+    Timestamps of a translation can drift from the original by a second or two, so segments
+    are matched by interval overlap rather than by identical keys. Ties go to the original
+    whose start and end are closest. The originals are sorted by start once; for each
+    segment without an identically timed original, the candidates are found by binary search
+    on their starts and on the running maximum of their ends, so aligning n segments costs
+    O(n log n) for ordinary transcripts.
+
+    Args:
+        entries: Translated segments from parse_transcript_entries
+        original_entries: Original-language segments from parse_transcript_entries
+        tolerance_seconds: Largest gap between two intervals that still counts as a match
+
+    Returns:
+        Tuple of (original_texts, stats). original_texts holds the matched original text for
+        each entry ("" when nothing matches). stats counts segments matched on identical
+        timestamps ("exact"), matched despite drift ("shifted") and "unmatched", with the
+        mean and maximum start drift of the matches in seconds.
+    """
+    # An original with identical timestamps always has the largest overlap and closest
+    # boundaries, so those are looked up directly; the interval search runs only for the rest
+    exact_texts = {timestamp_key: original_text for timestamp_key, _, original_text in original_entries}
+    originals = None
+
+    original_texts = []
+    exact = shifted = unmatched = 0
+    drifts = []
+    for timestamp_key, _, _ in entries:
+        if timestamp_key in exact_texts:
+            exact += 1
+            drifts.append(0)
+            original_texts.append(exact_texts[timestamp_key])
+            continue
+
+        if originals is None:
+            originals = sorted(
+                (*timestamp_key_to_seconds(original_key), original_text)
+                for original_key, _, original_text in original_entries
+            )
+            original_starts = [start for start, _, _ in originals]
+            # Running maximum of the ends: every original before the first index whose value
+            # reaches a segment's start - tolerance ends too early to match it
+            running_max_ends = []
+            latest_end = float("-inf")
+            for _, end, _ in originals:
+                latest_end = max(latest_end, end)
+                running_max_ends.append(latest_end)
+
+        start, end = timestamp_key_to_seconds(timestamp_key)
+        low = bisect.bisect_left(running_max_ends, start - tolerance_seconds)
+        high = bisect.bisect_right(original_starts, end + tolerance_seconds)
+
+        best = None
+        best_score = None
+        for original_start, original_end, original_text in originals[low:high]:
+            overlap = min(end, original_end) - max(start, original_start)
+            if overlap < -tolerance_seconds:
+                continue
+            # Larger overlap first, then the closest boundaries
+            score = (overlap, -(abs(original_start - start) + abs(original_end - end)))
+            if best_score is None or score > best_score:
+                best, best_score = (original_start, original_end, original_text), score
+
+        if best is None:
+            unmatched += 1
+            original_texts.append("")
+            continue
+        shifted += 1
+        drifts.append(abs(best[0] - start))
+        original_texts.append(best[2])
+
+    stats = {
+        "segments": len(entries),
+        "original_segments": len(original_entries),
+        "exact": exact,
+        "shifted": shifted,
+        "unmatched": unmatched,
+        "mean_drift_seconds": round(sum(drifts) / len(drifts), 2) if drifts else 0.0,
+        "max_drift_seconds": max(drifts) if drifts else 0
+    }
+    return original_texts, stats
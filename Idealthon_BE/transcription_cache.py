@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Next to the backend code rather than the working directory, so tools run from elsewhere share it
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".transcription_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+class TranscriptionCache:
+    """
+    Persistent, content-addressed cache of per-segment transcriptions.
+
+    Entries are stored as JSON blob files and indexed in SQLite. Keys are derived from a
+    hash of the segment audio, the language, the segment duration and the prompt version,
+    so the same recording is never sent to Gemini twice. When the blobs exceed max_bytes,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache, creating the directory and index if needed.
+
+        Args:
+            cache_dir: Directory for the index and blobs. If None, will use TRANSCRIPTION_CACHE_DIR
+                       from environment (default .transcription_cache in the backend directory).
+            max_bytes: Maximum total size of cached blobs. If None, will use
+                       TRANSCRIPTION_CACHE_MAX_BYTES from environment (default 512 MB).
+        """
+        self.cache_dir = cache_dir or os.getenv("TRANSCRIPTION_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes or int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+        self.blob_dir = os.path.join(self.cache_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # One connection shared by all transcription threads; access is serialized by _lock
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(audio_hash: str, language: str, segment_duration_ms: int, prompt_version: str) -> str:
+        """
+        Build the cache key for one segment.
+
+        Args:
+            audio_hash: Hex digest of the segment audio
+            language: Transcription language
+            segment_duration_ms: Segment duration used when splitting the file
+            prompt_version: Version of the transcription and translation prompts
+
+        Returns:
+            Hex SHA-256 key
+        """
+        key_source = f"{audio_hash}|{language}|{segment_duration_ms}|{prompt_version}"
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.blob_dir, key[:2], f"{key}.json")
+
+    def _get_entry(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._blob_path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                # Blob is missing or corrupt; drop the index entry and treat as a miss
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return entry
+
+    def _put_entry(self, key: str, entry: Dict) -> None:
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        blob_path = self._blob_path(key)
+
+        with self._lock:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, blob_path)
+
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, len(data), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up a cached segment transcription.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Tuple of (original_transcript, vietnamese_transcript), or None on a miss
+        """
+        entry = self._get_entry(key)
+        if entry is None or "original" not in entry:
+            return None
+        return entry["original"], entry["vietnamese"]
+
+    def put(self, key: str, original_transcript: str, vietnamese_transcript: str) -> None:
+        """
+        Store a segment transcription and evict old entries if the cache is over budget.
+
+        Args:
+            key: Key from make_key
+            original_transcript: Transcript in the original language
+            vietnamese_transcript: Vietnamese transcript
+        """
+        self._put_entry(key, {"original": original_transcript, "vietnamese": vietnamese_transcript})
+
+    def get_segments(self, key: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Look up the cached transcription of a whole file.
+
+        Args:
+            key: File key, e.g. from AudioSegmentTranscriber.file_cache_key
+
+        Returns:
+            List of (original_transcript, vietnamese_transcript) per segment, or None on a miss
+        """
+        entry = self._get_entry(key)
+        if entry is None or "segments" not in entry:
+            return None
+        return [(original, vietnamese) for original, vietnamese in entry["segments"]]
+
+    def put_segments(self, key: str, segments: List[Tuple[str, str]]) -> None:
+        """
+        Store the transcription of a whole file, one (original, vietnamese) pair per segment.
+
+        Args:
+            key: File key, e.g. from AudioSegmentTranscriber.file_cache_key
+            segments: Segment transcriptions in order, with source-relative timestamps
+        """
+        self._put_entry(key, {"segments": [[original, vietnamese] for original, vietnamese in segments]})
+
+    def _evict(self) -> None:
+        total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.unlink(self._blob_path(key))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        """
+        Return hit/miss counters and the current cache size.
+        """
+        with self._lock:
+            entries, total_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def clear(self) -> None:
+        """
+        Remove every cached entry.
+        """
+        with self._lock:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.unlink(self._blob_path(key))
+                except FileNotFoundError:
+                    pass
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+
+_default_cache: Optional[TranscriptionCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_transcription_cache() -> Optional[TranscriptionCache]:
+    """
+    Return the process-wide transcription cache, or None if caching is disabled.
+
+    Set TRANSCRIPTION_CACHE_ENABLED=false in the environment to disable the cache.
+    """
+    global _default_cache
+    if os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptionCache()
+        return _default_cache